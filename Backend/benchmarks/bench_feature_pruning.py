@@ -0,0 +1,71 @@
+"""
+Correlation-based feature pruning: the original DataFrame.corr() + per-column loop (plus a second
+corr() of the kept columns for the reduced heatmap) vs CorrelationPruner (one float32 GEMM,
+vectorized selection, reduced matrix sliced from the full one).
+
+Synthetic data with groups of correlated columns, so both paths have something to drop.
+
+    python benchmarks/bench_feature_pruning.py --rows 50000 --features 80 500 2000
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from data_preprocessing.feature_pruning import CorrelationPruner  # noqa: E402
+
+
+def synthetic(rows: int, features: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    latent = rng.standard_normal((rows, max(1, features // 4)))
+    # Every column is a noisy copy of one latent factor: ~4 columns per correlated group
+    source = rng.integers(0, latent.shape[1], features)
+    noise = rng.uniform(0.1, 1.5, features)
+    X = latent[:, source] + noise * rng.standard_normal((rows, features))
+    return pd.DataFrame(X, columns=[f'f{i}' for i in range(features)])
+
+
+def original(df: pd.DataFrame, threshold: float):
+    corr = df.corr()
+    upper = corr.where(np.triu(np.ones(corr.shape), k=1).astype(bool))
+    to_drop = [col for col in upper.columns if any(upper[col] > threshold)]
+    reduced = df.drop(columns=to_drop).corr()
+    return to_drop, reduced
+
+
+def pruned(df: pd.DataFrame, threshold: float):
+    pruner = CorrelationPruner(threshold).fit(df)
+    return pruner.to_drop, pruner.reduced_corr_frame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--features', type=int, nargs='+', default=[80, 500, 2000])
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--skip-original-above', type=int, default=1000,
+                        help='Only time the new path for wider data (DataFrame.corr() takes minutes)')
+    args = parser.parse_args()
+
+    print(f"{'features':>8} {'original s':>11} {'pruner s':>9} {'speedup':>8} {'dropped':>8} {'same selection':>15}")
+    for k in args.features:
+        df = synthetic(args.rows, k)
+        start = time.perf_counter()
+        new_drop, _ = pruned(df, args.threshold)
+        new_s = time.perf_counter() - start
+        if k <= args.skip_original_above:
+            start = time.perf_counter()
+            old_drop, _ = original(df, args.threshold)
+            old_s = time.perf_counter() - start
+            print(f"{k:>8} {old_s:>11.2f} {new_s:>9.2f} {old_s / new_s:>7.1f}x {len(new_drop):>8} {str(old_drop == new_drop):>15}")
+        else:
+            print(f"{k:>8} {'-':>11} {new_s:>9.2f} {'-':>8} {len(new_drop):>8} {'-':>15}")
+
+
+if __name__ == '__main__':
+    main()
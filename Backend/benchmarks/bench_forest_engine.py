@@ -0,0 +1,74 @@
+"""
+Latency of sklearn's RandomForestClassifier.predict_proba vs the CompiledForest engine.
+
+Uses cache/models/random_forest.joblib (or MODEL_DIR); if it is missing, a forest with the
+train.py settings is fitted on data_preprocessing/output/processed_data first.
+Also checks that the compiled probabilities are bit-identical to sklearn's.
+
+    python benchmarks/bench_forest_engine.py --batch-sizes 1 32 4096
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_model_dir  # noqa: E402
+from utils.dataset import load_dataset  # noqa: E402
+from utils.forest_engine import CompiledForest  # noqa: E402
+from utils.model_io import load_model  # noqa: E402
+
+
+def load_forest(X_train, y_train):
+    try:
+        return load_model('random_forest', out_dir=get_model_dir())
+    except FileNotFoundError:
+        from sklearn.ensemble import RandomForestClassifier
+        print("random_forest not cached, fitting one with the train.py settings...")
+        return RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=-1,
+                                      class_weight='balanced').fit(X_train, y_train)
+
+
+def latency_ms(fn, X, repeats: int) -> float:
+    fn(X)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='data_preprocessing/output/processed_data')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 4096])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    data = load_dataset(args.data)
+    forest = load_forest(data['X_train'], data['y_train'])
+    start = time.perf_counter()
+    compiled = CompiledForest.from_sklearn(forest)
+    print(f"compiled {compiled.n_estimators} trees / {len(compiled.feature)} nodes in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    X_test = data['X_test']
+    n_jobs = forest.n_jobs
+    forest.set_params(n_jobs=1)  # sequential accumulation is the reference order
+    identical = np.array_equal(forest.predict_proba(X_test), compiled.predict_proba(X_test))
+    forest.set_params(n_jobs=n_jobs)
+    print(f"bit-identical probabilities on X_test ({len(X_test)} rows): {identical}")
+
+    print(f"{'batch':>6} {'sklearn ms':>11} {'compiled ms':>12} {'speedup':>8}")
+    for batch in args.batch_sizes:
+        X = np.resize(X_test, (batch, X_test.shape[1]))
+        repeats = args.repeats if batch < 1000 else max(3, args.repeats // 4)
+        sk = latency_ms(forest.predict_proba, X, repeats)
+        cf = latency_ms(compiled.predict_proba, X, repeats)
+        print(f"{batch:>6} {sk:>11.2f} {cf:>12.2f} {sk / cf:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
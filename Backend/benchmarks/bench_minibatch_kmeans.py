@@ -0,0 +1,59 @@
+"""
+KMeans(n_init=20) on the whole training set vs MiniBatchKMeans trained with partial_fit over chunks
+(train.fit_in_chunks), compared on fit time and on the evaluate_clustering metrics of the test set.
+
+Uses the processed dataset; --repeat N stacks N jittered copies of X_train_unSMOTE to see how the
+two fits scale with the number of rows.
+
+    python benchmarks/bench_minibatch_kmeans.py --repeat 1 10
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+from evaluation.calc_eval_metrics import evaluate_clustering  # noqa: E402
+from main import load_dataset, load_feature_metadata  # noqa: E402
+from train import build_model, fit_in_chunks  # noqa: E402
+
+METRICS = ['silhouette', 'calinski_harabasz', 'davies_bouldin', 'accuracy', 'f1_weighted']
+
+
+def stacked(X: np.ndarray, repeat: int, seed: int = 0) -> np.ndarray:
+    if repeat == 1:
+        return X
+    rng = np.random.default_rng(seed)
+    return np.concatenate([X] + [X + 0.01 * rng.standard_normal(X.shape) for _ in range(repeat - 1)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, nargs='+', default=[1, 10])
+    args = parser.parse_args()
+
+    dataset = load_dataset()
+    X_test, y_test = np.asarray(dataset['X_test']), np.asarray(dataset['y_test'])
+    n_classes = len(load_feature_metadata()['label_encoder'].classes_)
+
+    print(f"{'rows':>8} {'model':>17} {'fit s':>7} " + ' '.join(f'{m:>17}' for m in METRICS))
+    for repeat in args.repeat:
+        X_train = stacked(np.asarray(dataset['X_train_unSMOTE']), repeat)
+        for name in ('kmeans', 'minibatch_kmeans'):
+            model = build_model(name, n_classes)
+            start = time.perf_counter()
+            if name == 'minibatch_kmeans':
+                fit_in_chunks(model, X_train)
+            else:
+                model.fit(X_train)
+            fit_s = time.perf_counter() - start
+            metrics = evaluate_clustering(model, X_test, y_test)
+            print(f"{len(X_train):>8} {name:>17} {fit_s:>7.2f} " + ' '.join(f'{metrics[m]:>17.4f}' for m in METRICS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Latency of sklearn's MLPClassifier.predict_proba vs the exported NumPy forward pass, plus the
+cost of getting each ready to serve (import + load in a fresh interpreter).
+
+Uses cache/models/mlp.joblib (or MODEL_DIR) and checks parity on X_test before timing.
+
+    python benchmarks/bench_mlp_engine.py --batch-sizes 1 32 4096
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from config import get_model_dir  # noqa: E402
+from utils.dataset import load_dataset  # noqa: E402
+from utils.mlp_engine import NumpyMLP, check_parity  # noqa: E402
+from utils.model_io import load_model  # noqa: E402
+
+# Run in a fresh interpreter so module import time is included
+_COLD_LOAD = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {backend!r})
+{load}
+model.predict_proba([[0.0] * model.n_features_in_])
+print((time.perf_counter() - start) * 1000.0)
+"""
+_LOAD_SKLEARN = "from utils.model_io import load_model; model = load_model('mlp', out_dir={model_dir!r})"
+_LOAD_NUMPY = "from utils.mlp_engine import NumpyMLP; model = NumpyMLP.load({path!r})"
+
+
+def latency_ms(fn, X, repeats: int) -> float:
+    fn(X)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000.0
+
+
+def cold_start_ms(load: str) -> float:
+    code = _COLD_LOAD.format(backend=BACKEND_DIR, load=load)
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='data_preprocessing/output/processed_data')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 4096])
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    data = load_dataset(args.data)
+    model_dir = get_model_dir()
+    mlp = load_model('mlp', out_dir=model_dir)
+    engine = NumpyMLP.from_sklearn(mlp)
+    X_test = data['X_test']
+    report = check_parity(mlp, engine, X_test)
+    print(f"parity on X_test ({len(X_test)} rows): max |proba diff| {report['max_abs_diff']:.2e}, "
+          f"prediction agreement {report['prediction_agreement']:.4%}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'mlp.mlp.npz')
+        engine.save(path)
+        sk_cold = cold_start_ms(_LOAD_SKLEARN.format(model_dir=os.path.abspath(model_dir)))
+        np_cold = cold_start_ms(_LOAD_NUMPY.format(path=path))
+    print(f"import + load + first prediction: sklearn {sk_cold:.0f} ms, numpy {np_cold:.0f} ms")
+
+    print(f"{'batch':>6} {'sklearn ms':>11} {'numpy ms':>9} {'speedup':>8}")
+    for batch in args.batch_sizes:
+        X = np.resize(X_test, (batch, X_test.shape[1]))
+        repeats = args.repeats if batch < 1000 else max(3, args.repeats // 5)
+        sk = latency_ms(mlp.predict_proba, X, repeats)
+        nm = latency_ms(engine.predict_proba, X, repeats)
+        print(f"{batch:>6} {sk:>11.3f} {nm:>9.3f} {sk / nm:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare JSON and binary encodings on /api/v1/predict.
+
+Runs the FastAPI app in-process (no network) and times the full round trip: client-side encoding,
+request parsing, prediction, response encoding and client-side decoding.
+
+    python benchmarks/bench_predict_encoding.py --model mlp --rows 1 1000 100000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+import serve  # noqa: E402
+
+
+def _time(fn, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def bench(client: TestClient, model: str, n_rows: int, n_features: int, repeats: int) -> dict:
+    X = np.random.RandomState(0).standard_normal((n_rows, n_features))
+
+    def json_path():
+        r = client.post('/api/v1/predict', json={'model': model, 'instances': X.tolist()})
+        r.raise_for_status()
+        body = r.json()
+        np.asarray(body['predictions']), np.asarray(body['probabilities'])
+
+    def raw_path():
+        r = client.post(f'/api/v1/predict?model={model}', content=X.astype('<f4').tobytes(),
+                        headers={'content-type': 'application/octet-stream', 'x-shape': f'{n_rows},{n_features}', 'x-dtype': 'float32'})
+        r.raise_for_status()
+        preds = np.frombuffer(r.content, dtype='<i8', count=n_rows)
+        np.frombuffer(r.content, dtype='<f4', offset=preds.nbytes)
+
+    def npy_path():
+        buf = io.BytesIO()
+        np.save(buf, X)
+        r = client.post(f'/api/v1/predict?model={model}', content=buf.getvalue(), headers={'content-type': 'application/x-npy'})
+        r.raise_for_status()
+        out = np.load(io.BytesIO(r.content))
+        out['predictions'], out['probabilities']
+
+    return {
+        'json_ms': _time(json_path, repeats),
+        'raw_f32_ms': _time(raw_path, repeats),
+        'npy_f64_ms': _time(npy_path, repeats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='mlp')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 1000, 100000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    with TestClient(serve.app) as client:
+        entry = serve.registry.get(args.model)
+        if entry is None:
+            raise SystemExit(f"Model '{args.model}' not found in {serve.registry.model_dir}")
+        n_features = int(entry.model.n_features_in_)
+        print(f"model={args.model} features={n_features} (best of {args.repeats})")
+        print(f"{'rows':>8} {'json ms':>10} {'raw f32 ms':>11} {'npy f64 ms':>11} {'speedup':>8}")
+        for n_rows in args.rows:
+            res = bench(client, args.model, n_rows, n_features, repeats=args.repeats if n_rows < 100000 else 1)
+            speedup = res['json_ms'] / min(res['raw_f32_ms'], res['npy_f64_ms'])
+            print(f"{n_rows:>8} {res['json_ms']:>10.2f} {res['raw_f32_ms']:>11.2f} {res['npy_f64_ms']:>11.2f} {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Startup cost and memory of N server workers serving the Random Forest.
+
+Every worker is a fresh interpreter that imports serve.py, loads the model through the registry
+(as a uvicorn worker does) and makes one prediction. Reported per configuration and worker count:
+time to first prediction, and per-worker RSS / PSS read from /proc/self/smaps_rollup once all
+workers are up. PSS splits shared pages between the processes mapping them, so it shows how much
+of the model each worker really owns.
+
+    python benchmarks/bench_worker_startup.py --workers 1 4 16
+
+Configurations: the pickled sklearn forest (private copy), the same pickle loaded with joblib
+mmap_mode='r' (sklearn trees copy their nodes on unpickling, so this barely helps), and the
+memory-mapped compiled forest (random_forest.forest.flat).
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from config import get_model_dir  # noqa: E402
+from utils.engines import artifact_path  # noqa: E402
+from utils.forest_engine import CompiledForest  # noqa: E402
+from utils.model_io import load_model  # noqa: E402
+
+_WORKER = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {backend!r})
+import numpy as np
+import serve
+from utils.predict import predict_arrays
+serve.registry.refresh()
+model = serve.registry.get({model!r}).model
+predict_arrays(model, np.zeros((1, model.n_features_in_)))
+print(json.dumps({{'ttfp_ms': (time.perf_counter() - start) * 1000.0}}), flush=True)
+sys.stdin.readline()  # measure memory only once every worker has loaded the model
+memory = {{}}
+try:
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                memory[key.lower() + '_mb'] = int(value.split()[0]) / 1024.0
+except OSError:
+    import resource
+    memory['rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+print(json.dumps(memory), flush=True)
+sys.stdin.readline()
+"""
+
+CONFIGS = {
+    'sklearn': {'MODEL_ENGINES': 'random_forest=sklearn', 'MODEL_MMAP': '0'},
+    'sklearn+mmap': {'MODEL_ENGINES': 'random_forest=sklearn', 'MODEL_MMAP': '1'},
+    'compiled_forest+mmap': {'MODEL_ENGINES': 'random_forest=compiled_forest', 'MODEL_MMAP': '1'},
+}
+
+
+def run_workers(model_dir: str, config: dict, n_workers: int) -> dict:
+    env = dict(os.environ, MODEL_DIR=model_dir, MODEL_RELOAD_INTERVAL='0',
+               FEATURE_METADATA_PATH=os.path.join(model_dir, 'none.pkl'), **config)
+    code = _WORKER.format(backend=BACKEND_DIR, model='random_forest')
+    procs = [subprocess.Popen([sys.executable, '-W', 'ignore', '-c', code], cwd=BACKEND_DIR, env=env,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(n_workers)]
+    try:
+        ttfp = [json.loads(p.stdout.readline())['ttfp_ms'] for p in procs]
+        for p in procs:
+            p.stdin.write('\n')
+            p.stdin.flush()
+        memory = [json.loads(p.stdout.readline()) for p in procs]
+        for p in procs:
+            p.stdin.write('\n')
+            p.stdin.flush()
+    finally:
+        for p in procs:
+            p.wait(timeout=60)
+    rss = [m['rss_mb'] for m in memory]
+    pss = [m['pss_mb'] for m in memory if 'pss_mb' in m]
+    return {
+        'ttfp_mean_ms': float(np.mean(ttfp)),
+        'ttfp_max_ms': float(np.max(ttfp)),
+        'rss_mb': float(np.mean(rss)),
+        'pss_mb': float(np.mean(pss)) if pss else float('nan'),
+        'total_pss_mb': float(np.sum(pss)) if pss else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--configs', nargs='+', default=list(CONFIGS), choices=list(CONFIGS))
+    args = parser.parse_args()
+
+    source_dir = get_model_dir()
+    with tempfile.TemporaryDirectory() as model_dir:
+        # Only the forest, so the workers measure its footprint and nothing else
+        shutil.copy(os.path.join(source_dir, 'random_forest.joblib'), model_dir)
+        forest_path = artifact_path(source_dir, 'random_forest', 'compiled_forest')
+        if os.path.exists(forest_path):
+            shutil.copy(forest_path, model_dir)
+        else:
+            CompiledForest.from_sklearn(load_model('random_forest', out_dir=source_dir)).save(
+                artifact_path(model_dir, 'random_forest', 'compiled_forest'))
+
+        print(f"{'config':>22} {'workers':>7} {'ttfp mean ms':>13} {'ttfp max ms':>12} "
+              f"{'RSS/worker MB':>14} {'PSS/worker MB':>14} {'total PSS MB':>13}")
+        for name in args.configs:
+            for n in args.workers:
+                r = run_workers(model_dir, CONFIGS[name], n)
+                print(f"{name:>22} {n:>7} {r['ttfp_mean_ms']:>13.0f} {r['ttfp_max_ms']:>12.0f} "
+                      f"{r['rss_mb']:>14.1f} {r['pss_mb']:>14.1f} {r['total_pss_mb']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,96 @@
 import os
+from typing import Dict, List
 
 
 def get_model_dir() -> str:
 	return os.getenv('MODEL_DIR', 'cache/models')
 
 
+def get_model_reload_interval() -> float:
+	"""Seconds between checks of the model directory for changed .joblib files (0 disables)."""
+	return float(os.getenv('MODEL_RELOAD_INTERVAL', '2.0'))
+
+
+def get_batch_window_ms() -> float:
+	"""How long /predict waits to collect concurrent requests for one model into a batch (0 disables batching)."""
+	return float(os.getenv('BATCH_WINDOW_MS', '2.0'))
+
+
+def get_batch_max_rows() -> int:
+	"""Flush a batch early once it holds this many rows."""
+	return int(os.getenv('BATCH_MAX_ROWS', '256'))
+
+
+def get_feature_metadata_path() -> str:
+	"""Pickle written by data_cleaning.py (label encoder, fitted preprocessor, selected features)."""
+	return os.getenv('FEATURE_METADATA_PATH', 'data_preprocessing/output/feature_metadata.pkl')
+
+
+def get_stream_chunk_size() -> int:
+	"""Rows parsed and scored at a time by /predict/stream and score.py."""
+	return int(os.getenv('STREAM_CHUNK_SIZE', '10000'))
+
+
+def get_model_engines() -> Dict[str, str]:
+	"""Per-model inference engine, e.g. MODEL_ENGINES="random_forest=compiled_forest" (default: sklearn)."""
+	engines = {}
+	for item in os.getenv('MODEL_ENGINES', '').split(','):
+		if '=' in item:
+			name, engine = item.split('=', 1)
+			engines[name.strip()] = engine.strip()
+	return engines
+
+
+def get_online_models() -> List[str]:
+	"""Models that POST /api/v1/models/{name}/partial_fit may update from scored traffic (ONLINE_MODELS, comma-separated)."""
+	return [name.strip() for name in os.getenv('ONLINE_MODELS', 'minibatch_kmeans').split(',') if name.strip()]
+
+
+def get_train_workers() -> int:
+	"""Models trained concurrently by train.py (0 = one per model, capped by the core budget)."""
+	return int(os.getenv('TRAIN_WORKERS', '0'))
+
+
+def get_train_cores() -> int:
+	"""Total cores train.py may use; split evenly between concurrent fits (default: all cores)."""
+	return int(os.getenv('TRAIN_CORES', str(os.cpu_count() or 1)))
+
+
+def get_model_cache_max_entries() -> int:
+	"""Trained models kept in cache/models/store before least-recently-used ones are evicted."""
+	return int(os.getenv('MODEL_CACHE_MAX_ENTRIES', '16'))
+
+
+def get_model_cache_max_bytes() -> int:
+	"""Size budget of cache/models/store in bytes (default 2 GiB)."""
+	return int(os.getenv('MODEL_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+
+
+def get_model_mmap() -> bool:
+	"""Memory-map the arrays of .joblib models so server workers share them (MODEL_MMAP=0 loads private copies)."""
+	return os.getenv('MODEL_MMAP', '1').lower() not in ('0', 'false', 'no')
+
+
+def get_report_workers() -> int:
+	"""Processes rendering evaluation report figures (0 = one per core, at most one per stale figure)."""
+	return int(os.getenv('REPORT_WORKERS', '0'))
+
+
+def get_cluster_metrics_sample_size() -> int:
+	"""Rows per silhouette subsample; test sets up to this size get the exact silhouette."""
+	return int(os.getenv('CLUSTER_METRICS_SAMPLE_SIZE', '20000'))
+
+
+def get_cluster_metrics_seed() -> int:
+	"""Seed of the silhouette subsamples and bootstrap."""
+	return int(os.getenv('CLUSTER_METRICS_SEED', '42'))
+
+
+def get_cluster_metrics_rounds() -> int:
+	"""Silhouette subsamples averaged when the test set is larger than the sample size."""
+	return int(os.getenv('CLUSTER_METRICS_ROUNDS', '5'))
+
+
+def get_cluster_metrics_time_budget() -> float:
+	"""Seconds the silhouette rounds may take per model (0 = no limit; the first round always runs)."""
+	return float(os.getenv('CLUSTER_METRICS_TIME_BUDGET', '60'))
@@ -2,12 +2,21 @@
 """
 Extract 1000 samples for each 'Traffic Type'
 - Shuffle and save as `data_preprocessing/input/data.csv`
+- `--streaming` samples in one chunked pass (optionally on several processes) for raw captures larger than RAM
 """
 
 import pandas as pd
 import numpy as np
+import argparse
 import os
+import sys
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_preprocessing.streaming import StratifiedReservoir, csv_blocks, infer_dtypes, iter_block_chunks  # noqa: E402
+
+TARGET_COLUMN = 'Traffic Type'
 
 
 def filter_n_samples(data_path: str, traffic_type_n_samples: int = 1000, random_state: int = 42):
@@ -26,6 +35,56 @@ def filter_n_samples(data_path: str, traffic_type_n_samples: int = 1000, random_
     
     return df
 
+
+def _sample_block(args):
+    """Per-class sample of one byte range of the raw CSV (runs in a worker process)."""
+    data_path, header, start, end, block_index, traffic_type_n_samples, random_state, chunk_size, dtypes = args
+    # Keys only depend on the seed and the block, so the sample is the same for any worker count or chunk size
+    rng = np.random.default_rng([random_state, block_index])
+    sample = StratifiedReservoir(traffic_type_n_samples, TARGET_COLUMN)
+    for chunk in iter_block_chunks(data_path, header, start, end, chunk_size, dtype=dtypes, index_col=False):
+        sample.add(chunk, rng.random(len(chunk)))
+    return sample
+
+
+def _integer_columns_to_int(df: pd.DataFrame) -> pd.DataFrame:
+    """Float columns of the sample that only hold whole numbers go back to (nullable) ints for data.csv."""
+    for col in df.select_dtypes(include='float').columns:
+        values = df[col].dropna()
+        if np.isfinite(values).all() and (values == np.round(values)).all():
+            df[col] = df[col].astype('Int64')
+    return df
+
+
+def stream_n_samples(data_path: str, traffic_type_n_samples: int = 1000, random_state: int = 42,
+                     chunk_size: int = 100000, workers: int = 1, block_size: int = 64 * 2**20):
+    """
+    Streaming filter_n_samples: up to N REAL samples per class, uniformly at random, from a single
+    chunked pass over the raw CSV. The file is split into blocks of block_size bytes that are
+    parsed by `workers` processes; each keeps at most N rows per class plus the chunk being parsed,
+    and the block samples are merged as they finish. Reproducible for a given random_state and block_size.
+    """
+    header, blocks = csv_blocks(data_path, block_size)
+    # Same dtypes for every block (numeric columns as float64, whatever later rows hold)
+    dtypes = infer_dtypes(data_path)
+    jobs = [(data_path, header, start, end, i, traffic_type_n_samples, random_state, chunk_size, dtypes)
+            for i, (start, end) in enumerate(blocks)]
+
+    sample = StratifiedReservoir(traffic_type_n_samples, TARGET_COLUMN)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in as_completed([pool.submit(_sample_block, job) for job in jobs]):
+                sample.merge(future.result())
+    else:
+        for job in jobs:
+            sample.merge(_sample_block(job))
+
+    print(f"Rows read per class: {dict(sorted(sample.seen.items()))}")
+    df = sample.to_frame().sample(frac=1, random_state=random_state).reset_index(drop=True)
+    # Dtypes re-inferred on the sample, so integer columns stay integers in data.csv
+    return _integer_columns_to_int(df)
+
+
 def create_visualization(df):
     """Create visualization of the balanced dataset"""
     import matplotlib.pyplot as plt
@@ -60,13 +119,26 @@ def main():
     """Main function"""
     # Path to the raw dataset
     raw_data_path = r"C:\Users\User\OneDrive - Swinburne University\COS30049-Computing Technology Innovation Project\data.csv"
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data_path', nargs='?', default=raw_data_path, help='Raw dataset CSV')
+    parser.add_argument('--n-samples', type=int, default=1000, help='Samples per traffic type')
+    parser.add_argument('--streaming', action='store_true', help='Sample in one chunked pass instead of loading the CSV')
+    parser.add_argument('--workers', type=int, default=1, help='Processes parsing the CSV in streaming mode')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per parsed chunk in streaming mode')
+    args = parser.parse_args()
+    raw_data_path = args.data_path
     
     if not os.path.exists(raw_data_path):
         print(f"Dataset not found at: {raw_data_path}")
         return
     
     # Create balanced dataset with up to 1000 real samples per class
-    df = filter_n_samples(raw_data_path, traffic_type_n_samples=1000)
+    if args.streaming:
+        df = stream_n_samples(raw_data_path, traffic_type_n_samples=args.n_samples,
+                              chunk_size=args.chunk_size, workers=args.workers)
+    else:
+        df = filter_n_samples(raw_data_path, traffic_type_n_samples=args.n_samples)
     
     if df is not None:
         # Create visualization
@@ -78,7 +150,7 @@ def main():
 
         # Save balanced dataset
         df.to_csv(output_dir + '/data.csv', index=False)
-        print(f"Balanced 1000-sample dataset saved to: {output_dir}")
+        print(f"Balanced {args.n_samples}-sample dataset saved to: {output_dir}")
         
         print(f"\nBalanced dataset creation complete!")
         print(f"Total samples: {len(df):,}")
@@ -1,97 +1,48 @@
+"""
+Preprocessing pipeline: raw flow CSV -> processed dataset + feature metadata for main.py / serve.py.
+
+    python data_preprocessing/data_cleaning.py                # in memory (the sampled input/data.csv)
+    python data_preprocessing/data_cleaning.py --streaming    # chunked, for full-size captures
+
+Steps: drop correlated features (r > 0.8 with an earlier column, feature_pruning.py) -> drop
+5-tuple/timestamp -> round and drop duplicates -> label-encode the target -> train/test split ->
+mean-impute, drop constant columns and standardize numeric features, one-hot categorical ones ->
+feature ranking (feature_selection.py) and top-15 selection -> SMOTE on the training set
+(utils/resampling.py; materialized, or with --smote-lazy drawn per training batch).
+
+The streaming mode does the same in three passes over the CSV, read in chunks with explicit dtypes:
+  1. label counts and an incremental correlation matrix -> correlated columns to drop
+  2. clean, dedupe through a hash set of the rounded rows, split, accumulate the training
+     mean/variance/category statistics and keep a reservoir sample of training rows
+  3. transform chunk by chunk with the compiled transform, written straight into memory-mapped .npy files
+The preprocessing constants are computed from the statistics instead of fitting a sklearn
+ColumnTransformer, and are stored as metadata['transform_spec'] (what the serving path uses).
+Differences from the in-memory mode: the train/test split is by row hash (about 20% test, stable
+across runs, not stratified), and the feature ranking is fitted on the reservoir sample.
+"""
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import argparse
+import json
 import os
+import sys
 import pickle
+import time
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.dataset import MANIFEST, save_dataset, write_manifest  # noqa: E402
+from utils.features import CompiledRecordTransformer, compile_transform_spec  # noqa: E402
+from utils.resampling import SMOTESampler  # noqa: E402
+from data_preprocessing.feature_pruning import CorrelationPruner  # noqa: E402
+from data_preprocessing.feature_selection import STRATEGIES, rank_features, select_top_features  # noqa: E402
+from data_preprocessing.streaming import (  # noqa: E402
+    ColumnMoments, HashDeduplicator, ReservoirSample, hash_split, infer_dtypes, iter_csv_chunks, row_hashes,
+)
 
-# Create directory
-output_dir = 'data_preprocessing/output'
-eda_dir = 'data_preprocessing/EDA'
-
-os.makedirs(output_dir, exist_ok=True)
-os.makedirs(eda_dir, exist_ok=True)
-
-# ---------------------------------------------------------- #
-# Read data
-df = pd.read_csv('data_preprocessing/input/data.csv', index_col=False)
-og_shape = df.shape
-
-# ---------------------------------------------------------- #
-# Plot distribution of labels
-plt.figure(figsize=(10, 6))
-ax = sns.countplot(x='Label', data=df)
-plt.title('Distribution of Labels')
-plt.xlabel('Label')
-plt.ylabel('Count')
-plt.xticks(rotation=45, ha='right')
-
-# Add count numbers on top of the bars
-for p in ax.patches:
-    ax.annotate(f'{p.get_height()}', (p.get_x() + p.get_width() / 2., p.get_height()),
-                ha='center', va='center', fontsize=10, color='black', xytext=(0, 5),
-                textcoords='offset points')
-
-plt.tight_layout()
-# plt.show()
-
-# =========================================================== #
-# Drop the unnecessary columns for correlation analysis
-corr_df= df.drop(columns=['Flow ID', 'Src IP', 'Dst IP', 'Src Port', 'Dst Port', 'Timestamp', 'Label', 'Traffic Type', 'Traffic Subtype'])
-
-# Calculate the correlation matrix
-corr_df1 = corr_df.corr()
-
-# Plot correlation matrix
-plt.figure(figsize=(20, 15))
-sns.heatmap(corr_df1, annot=False, fmt=".2f", cmap='coolwarm', vmin=-1, vmax=1, linewidths=0.5)
-plt.title('Correlation Matrix Heatmap - Original Features')
-plt.tight_layout()
-plt.savefig(f'{eda_dir}/correlation_matrix_original.png', dpi=300, bbox_inches='tight')
-# plt.show()
-
-corr_matrix = corr_df1.abs()
-
-# Create triangle matrix
-# i.e:
-#        f1    f2    f3
-# f1    NaN  0.95  0.20
-# f2    NaN   NaN  0.30
-# f3    NaN   NaN   NaN
-upper = corr_df1.where(np.triu(np.ones(corr_matrix.shape), k=1).astype(bool))
-
-to_drop = [col for col in upper.columns if any(upper[col] > 0.8)]
-df_reduced = df.drop(columns=to_drop)
-
-# Plot correlation matrix after removing redundant features
-corr_df_reduced = corr_df.drop(columns=to_drop).corr()
-
-plt.figure(figsize=(20, 15))
-sns.heatmap(corr_df_reduced, annot=False, fmt=".2f", cmap='coolwarm', vmin=-1, vmax=1, linewidths=0.5)
-plt.title('Correlation Matrix Heatmap - After Removing Redundant Features')
-plt.tight_layout()
-plt.savefig(f'{eda_dir}/correlation_matrix_reduced.png', dpi=300, bbox_inches='tight')
-# plt.show()
-
-# =========================================================== #
-TARGET_VARIABLE = 'Traffic Type'
-DROP_COLUMNS = ['Flow ID', 'Src IP', 'Src Port', 'Dst IP', 'Dst Port', 'Timestamp']
-TARGET_TO_DROP = {'Label': ['Traffic Type', 'Traffic Subtype'],
-                  'Traffic Type': ['Label', 'Traffic Subtype'],
-                  'Traffic Subtype': ['Label', 'Traffic Type']}
-
-# Drop 5-tuple collumns and timestamp
-df = df_reduced.drop(columns=DROP_COLUMNS)
-
-# Filter out duplicates within the same target
-df = df.round(3)
-df = df.drop_duplicates()
-df = df.drop(columns=TARGET_TO_DROP[TARGET_VARIABLE])
-
-df.head()
-
-# =========================================================== #
 from sklearn.preprocessing import LabelEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import StandardScaler
@@ -101,233 +52,542 @@ from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.feature_selection import VarianceThreshold
 
-X = df.drop(TARGET_VARIABLE, axis=1)
-y = df[TARGET_VARIABLE]
-
-# Encode target
-le = LabelEncoder()
-y = le.fit_transform(y)
-
-# Compute train and test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, test_size=0.2, random_state=42)
-
-# Identifying Numerical and Categorical columns
-numerical_cols = X_train.select_dtypes(include=[np.number]).columns.to_list()
-categorical_cols = X_train.select_dtypes(include=[object]).columns.to_list()
-
-# Pipelines for Numerical and Categorical Data Transformations
-numerical_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='mean')),  # Impute missing values with mean
-    ('var', VarianceThreshold(threshold=0.0)),    # removes all-constant cols
-    ('scaler', StandardScaler())  # Scale numerical features
-])
-
-categorical_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='most_frequent')),  # Impute missing values with mode
-    ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))  # One-hot encode categorical features
-])
-
-# Column Transformer combining both pipelines
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', numerical_transformer, numerical_cols),
-        ('cat', categorical_transformer, categorical_cols)
-    ]
-)
-
-# Apply preprocessor to train and test data
-preprocessor.fit(X_train)
-X_train = preprocessor.transform(X_train)
-X_test = preprocessor.transform(X_test)
-
-feat_names = preprocessor.get_feature_names_out()
+INPUT_PATH = 'data_preprocessing/input/data.csv'
+OUTPUT_DIR = 'data_preprocessing/output'
+EDA_DIR = 'data_preprocessing/EDA'
 
-# =========================================================== #
-# Select top features importance using Random Forest
-from sklearn.ensemble import RandomForestClassifier
-rf_selector = RandomForestClassifier(n_estimators=100, class_weight="balanced", random_state=42)
-rf_selector.fit(X_train, y_train)
-
-importance_df = (
-    pd.DataFrame({"feature_name": feat_names, "importance": rf_selector.feature_importances_})
-        .sort_values("importance", ascending=False)
-        .reset_index(drop=True)
-)
-
-top_feature_indices = importance_df.index[:15].to_list()            # transformed-space indices
-top_feature_names   = importance_df["feature_name"].head(15).to_list()
-
-# Save feature importance analysis to CSV
-importance_df.to_csv(f'{output_dir}/feature_importance_analysis.csv', index=False)
-
-# Select features using indices (works with NumPy arrays)
-X_train = X_train[:, top_feature_indices]
-X_test = X_test[:, top_feature_indices]
-
-# ---------------------------------------------------------- #
-# Create feature importance visualization
-top_15_importance = importance_df.head(15)
-plt.figure(figsize=(12, 8))
-plt.barh(range(len(top_15_importance)), top_15_importance['importance'])
-plt.yticks(range(len(top_15_importance)), top_15_importance['feature_name'])
-plt.xlabel('Feature Importance')
-plt.title('Top 15 Most Important Features')
-plt.gca().invert_yaxis()
-plt.tight_layout()
-plt.savefig(f'{output_dir}/feature_importance_top15.png', dpi=300, bbox_inches='tight')
-# plt.show()
-
-# ---------------------------------------------------------- #
-num_top = [n for n in top_feature_names if n.startswith("num__")]
-plot_cols = []
-for n in num_top:
-    base = n.split("__", 1)[1]  # strip 'num__'
-    if base in df.columns and pd.api.types.is_numeric_dtype(df[base]) and df[base].nunique() > 1:
-        plot_cols.append(base)
-
-n = len(plot_cols)
-rows = max(1, int(np.ceil(n / 3)))
-fig, axes = plt.subplots(rows, 3, figsize=(18, 5 * rows))
-axes = np.array(axes).ravel()
-
-for i, col in enumerate(plot_cols):
-    sns.boxplot(data=df, x="Traffic Type", y=col, showfliers=False, ax=axes[i])
-    axes[i].set_title(col)
-    axes[i].tick_params(axis="x", rotation=45)
-
-for ax in axes[len(plot_cols):]:
-    ax.set_visible(False)
-
-plt.tight_layout()
-plt.savefig(f"{output_dir}/feature_boxplots_top15.png", dpi=300, bbox_inches="tight")
+TARGET_VARIABLE = 'Traffic Type'
+# Identifiers and labels left out of the correlation analysis
+NON_FEATURE_COLUMNS = ['Flow ID', 'Src IP', 'Dst IP', 'Src Port', 'Dst Port', 'Timestamp', 'Label', 'Traffic Type', 'Traffic Subtype']
+DROP_COLUMNS = ['Flow ID', 'Src IP', 'Src Port', 'Dst IP', 'Dst Port', 'Timestamp']
+TARGET_TO_DROP = {'Label': ['Traffic Type', 'Traffic Subtype'],
+                  'Traffic Type': ['Label', 'Traffic Subtype'],
+                  'Traffic Subtype': ['Label', 'Traffic Type']}
+CORRELATION_THRESHOLD = 0.8
+ROUND_DECIMALS = 3
+N_TOP_FEATURES = 15
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
 
 
 # =========================================================== #
-# Apply SMOTE
-from imblearn.over_sampling import SMOTE
-# Save original data before SMOTE for unsupervised learning
-X_train_unSMOTE = X_train.copy()
-
-# Check class distribution before SMOTE
-unique_labels, label_counts = np.unique(y_train, return_counts=True)
-
-try:
-    # Equalize target class size with maximum class size (e.g: 800 samples each class type)
-    target_size = int(max(label_counts))
-    target_counts = {int(i): target_size for i in range(len(le.classes_))}
-
-    # Apply SMOTE with equal target per class
-    smote = SMOTE(
-        sampling_strategy=target_counts,
-        random_state=42,
-        k_neighbors=max(1, min(5, int(min(label_counts)) - 1))  # Ensure k_neighbors is valid
+# Shared steps
+
+def plot_label_distribution(label_counts: pd.Series):
+    plt.figure(figsize=(10, 6))
+    ax = plt.gca()
+    ax.bar(label_counts.index.astype(str), label_counts.values)
+    plt.title('Distribution of Labels')
+    plt.xlabel('Label')
+    plt.ylabel('Count')
+    plt.xticks(rotation=45, ha='right')
+
+    # Add count numbers on top of the bars
+    for p in ax.patches:
+        ax.annotate(f'{p.get_height()}', (p.get_x() + p.get_width() / 2., p.get_height()),
+                    ha='center', va='center', fontsize=10, color='black', xytext=(0, 5),
+                    textcoords='offset points')
+
+    plt.tight_layout()
+    # plt.show()
+
+
+def plot_correlation_heatmaps(pruner: CorrelationPruner, eda_dir: str):
+    """Heatmaps before and after pruning, both drawn from the pruner's correlation matrix."""
+    for corr, title, name in ((pruner.corr_frame(), 'Original Features', 'original'),
+                              (pruner.reduced_corr_frame(), 'After Removing Redundant Features', 'reduced')):
+        plt.figure(figsize=(20, 15))
+        sns.heatmap(corr, annot=False, fmt=".2f", cmap='coolwarm', vmin=-1, vmax=1, linewidths=0.5)
+        plt.title(f'Correlation Matrix Heatmap - {title}')
+        plt.tight_layout()
+        plt.savefig(f'{eda_dir}/correlation_matrix_{name}.png', dpi=300, bbox_inches='tight')
+        # plt.show()
+
+
+def reduce_columns(df: pd.DataFrame, to_drop: List[str]) -> pd.DataFrame:
+    """Drop correlated features, 5-tuple columns and timestamp, then round (before deduplication)."""
+    return df.drop(columns=to_drop).drop(columns=DROP_COLUMNS).round(ROUND_DECIMALS)
+
+
+def build_preprocessor(numerical_cols: List[str], categorical_cols: List[str]) -> ColumnTransformer:
+    # Pipelines for Numerical and Categorical Data Transformations
+    numerical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='mean')),  # Impute missing values with mean
+        ('var', VarianceThreshold(threshold=0.0)),    # removes all-constant cols
+        ('scaler', StandardScaler())  # Scale numerical features
+    ])
+
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),  # Impute missing values with mode
+        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))  # One-hot encode categorical features
+    ])
+
+    # Column Transformer combining both pipelines
+    return ColumnTransformer(
+        transformers=[
+            ('num', numerical_transformer, numerical_cols),
+            ('cat', categorical_transformer, categorical_cols)
+        ]
     )
-    X_train, y_train = smote.fit_resample(X_train, y_train)
-
-except Exception as e:
-    print(f"SMOTE failed: {e}")
-    print("Using original data with class_weight='balanced' in models.")
-
-# Class distribution after SMOTE
-unique_labels, counts_after = np.unique(y_train, return_counts=True)
-
-# ---------------------------------------------------------- #
-# Plotting SMOTE before and after
-plt.figure(figsize=(15, 5))
-
-# Before SMOTE
-plt.subplot(1, 3, 1)
-plt.bar(range(len(label_counts)), label_counts)
-plt.title('Class Distribution Before SMOTE')
-plt.xlabel('Class')
-plt.ylabel('Count')
-plt.xticks(range(len(le.classes_)), le.classes_, rotation=45)
-
-# After SMOTE
-plt.subplot(1, 3, 2)
-plt.bar(range(len(counts_after)), counts_after)
-plt.title('Class Distribution After SMOTE')
-plt.xlabel('Class')
-plt.ylabel('Count')
-plt.xticks(range(len(le.classes_)), le.classes_, rotation=45)
-
-# Comparison
-plt.subplot(1, 3, 3)
-x = np.arange(len(le.classes_))
-width = 0.35
-plt.bar(x - width/2, label_counts, width, label='Before SMOTE', alpha=0.7)
-plt.bar(x + width/2, counts_after, width, label='After SMOTE', alpha=0.7)
-plt.title('Class Distribution Comparison')
-plt.xlabel('Class')
-plt.ylabel('Count')
-plt.xticks(x, le.classes_, rotation=45)
-plt.legend()
-
-plt.tight_layout()
-plt.savefig(f'{output_dir}/class_distribution_comparison.png', dpi=300, bbox_inches='tight')
-# plt.show()
 
-# =========================================================== #
-# Log to save data for main pipeline
-log_data = {
-    'timestamp': datetime.now().isoformat(),
-    'dataset_info': {
-        'original_shape': list(og_shape),
-        'after_correlation_cleanup': list(df_reduced.shape),
-        'final_shape after target drop': list(df.shape),
-        'dropped_correlation_features': to_drop,
-        'dropped_columns': DROP_COLUMNS + TARGET_TO_DROP[TARGET_VARIABLE]
-    },
-    'feature_selection': {
-        'total_features_analyzed': int(len(importance_df)),
-        'selected_features_count': int(len(top_feature_names)),
-        'top_features': top_feature_names,
-        'feature_importance_scores': importance_df.head(15).to_dict('records')
-    },
-    'class_distribution': {
-        'before_smote': {str(label): int(count) for label, count in zip(le.classes_, label_counts)},
-        'after_smote': {str(label): int(count) for label, count in zip(le.classes_, counts_after)},
-        'smote_improvements': {
-            str(label): f"{int(before)} → {int(after)} samples ({((after - before) / before * 100) if before > 0 else 0:+.1f}%)"
-            for label, before, after in zip(le.classes_, label_counts, counts_after)
-        }
-    },
-    'data_quality': {
-        'target_variable': TARGET_VARIABLE,
-        'classes': [str(label) for label in le.classes_],
-        'train_test_split': {
-            'train_samples': int(X_train.shape[0]),
-            'test_samples': int(X_test.shape[0]),
-            'train_features': int(X_train.shape[1]),
-            'test_features': int(X_test.shape[1])
+
+def select_features(X_train: np.ndarray, y_train: np.ndarray, feat_names, output_dir: str, strategy: str,
+                    use_cache: bool) -> Tuple[pd.DataFrame, List[int], List[str], Dict[str, object]]:
+    """Rank the transformed features and pick the top N_TOP_FEATURES (see feature_selection.py)."""
+    cache_path = f'{output_dir}/feature_ranking_cache.json' if use_cache else None
+    importance_df, report = rank_features(X_train, y_train, feat_names, strategy=strategy, cache_path=cache_path,
+                                          random_state=RANDOM_STATE)
+    top_feature_indices, top_feature_names = select_top_features(importance_df, feat_names, N_TOP_FEATURES)
+    source = 'reused from cache' if report['cached'] else f"{report['wall_time_s']:.1f}s, peak {report['peak_memory_mb']:.0f} MB traced"
+    print(f"Feature ranking ({strategy}, {report['n_samples']:,} rows x {report['n_features']} features): {source}")
+    importance_df.to_csv(f'{output_dir}/feature_importance_analysis.csv', index=False)
+    return importance_df, top_feature_indices, top_feature_names, report
+
+
+def plot_feature_importance(importance_df: pd.DataFrame, output_dir: str):
+    top_15_importance = importance_df.head(N_TOP_FEATURES)
+    plt.figure(figsize=(12, 8))
+    plt.barh(range(len(top_15_importance)), top_15_importance['importance'])
+    plt.yticks(range(len(top_15_importance)), top_15_importance['feature_name'])
+    plt.xlabel('Feature Importance')
+    plt.title('Top 15 Most Important Features')
+    plt.gca().invert_yaxis()
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/feature_importance_top15.png', dpi=300, bbox_inches='tight')
+    # plt.show()
+
+
+def plot_feature_boxplots(df: pd.DataFrame, top_feature_names: List[str], output_dir: str):
+    num_top = [n for n in top_feature_names if n.startswith("num__")]
+    plot_cols = []
+    for n in num_top:
+        base = n.split("__", 1)[1]  # strip 'num__'
+        if base in df.columns and pd.api.types.is_numeric_dtype(df[base]) and df[base].nunique() > 1:
+            plot_cols.append(base)
+
+    n = len(plot_cols)
+    rows = max(1, int(np.ceil(n / 3)))
+    fig, axes = plt.subplots(rows, 3, figsize=(18, 5 * rows))
+    axes = np.array(axes).ravel()
+
+    for i, col in enumerate(plot_cols):
+        sns.boxplot(data=df, x=TARGET_VARIABLE, y=col, showfliers=False, ax=axes[i])
+        axes[i].set_title(col)
+        axes[i].tick_params(axis="x", rotation=45)
+
+    for ax in axes[len(plot_cols):]:
+        ax.set_visible(False)
+
+    plt.tight_layout()
+    plt.savefig(f"{output_dir}/feature_boxplots_top15.png", dpi=300, bbox_inches="tight")
+
+
+def apply_smote(X_train: np.ndarray, y_train: np.ndarray, max_synthetic_per_class: Optional[int] = None,
+                lazy: bool = False):
+    """
+    Oversample every class towards the majority class size with SMOTESampler (utils/resampling.py),
+    at most max_synthetic_per_class synthetic rows per class. Returns (training arrays to save,
+    counts before, counts after, memory report). Materialized: X_train / y_train with the synthetic
+    rows appended. Lazy: only the real labels and the sampler state are saved and LazySMOTE draws
+    synthetic rows per training batch.
+    """
+    # Check class distribution before SMOTE
+    unique_labels, label_counts = np.unique(y_train, return_counts=True)
+
+    try:
+        sampler = SMOTESampler(
+            k_neighbors=max(1, min(5, int(min(label_counts)) - 1)),  # Ensure k_neighbors is valid
+            max_synthetic_per_class=max_synthetic_per_class,
+            n_jobs=-1,
+            random_state=RANDOM_STATE
+        ).fit(X_train, y_train)
+    except ValueError as e:
+        print(f"SMOTE failed: {e}")
+        print("Using original data with class_weight='balanced' in models.")
+        return {'X_train': X_train, 'y_train': y_train}, label_counts, label_counts, None
+
+    report = dict(sampler.memory_report(X_train, y_train), mode='lazy' if lazy else 'materialized')
+    if lazy:
+        arrays = {'y_train_unSMOTE': y_train, **sampler.to_arrays()}
+        print(f"SMOTE (lazy): {report['lazy_state_mb']:.1f} MB sampler state saved instead of a "
+              f"{report['resampled_mb']:.1f} MB X_train ({report['uncapped_mb']:.1f} MB uncapped)")
+    else:
+        X_res, y_res = sampler.resample(X_train, y_train)
+        arrays = {'X_train': X_res, 'y_train': y_res}
+        print(f"SMOTE: {report['resampled_rows']:,} training rows, {report['resampled_mb']:.1f} MB "
+              f"({report['uncapped_mb']:.1f} MB uncapped)")
+
+    # Class distribution after SMOTE
+    counts_after = label_counts + sampler.synthetic_counts_
+    return arrays, label_counts, counts_after, report
+
+
+def reset_dataset_dir(data_dir: str):
+    """Remove the manifest and arrays of a previous run (the set of arrays depends on the SMOTE mode)."""
+    os.makedirs(data_dir, exist_ok=True)
+    for fname in os.listdir(data_dir):
+        if fname == MANIFEST or fname.endswith('.npy'):
+            os.remove(os.path.join(data_dir, fname))
+
+
+def plot_class_distribution(classes, label_counts, counts_after, output_dir: str):
+    plt.figure(figsize=(15, 5))
+
+    # Before SMOTE
+    plt.subplot(1, 3, 1)
+    plt.bar(range(len(label_counts)), label_counts)
+    plt.title('Class Distribution Before SMOTE')
+    plt.xlabel('Class')
+    plt.ylabel('Count')
+    plt.xticks(range(len(classes)), classes, rotation=45)
+
+    # After SMOTE
+    plt.subplot(1, 3, 2)
+    plt.bar(range(len(counts_after)), counts_after)
+    plt.title('Class Distribution After SMOTE')
+    plt.xlabel('Class')
+    plt.ylabel('Count')
+    plt.xticks(range(len(classes)), classes, rotation=45)
+
+    # Comparison
+    plt.subplot(1, 3, 3)
+    x = np.arange(len(classes))
+    width = 0.35
+    plt.bar(x - width/2, label_counts, width, label='Before SMOTE', alpha=0.7)
+    plt.bar(x + width/2, counts_after, width, label='After SMOTE', alpha=0.7)
+    plt.title('Class Distribution Comparison')
+    plt.xlabel('Class')
+    plt.ylabel('Count')
+    plt.xticks(x, classes, rotation=45)
+    plt.legend()
+
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/class_distribution_comparison.png', dpi=300, bbox_inches='tight')
+    # plt.show()
+
+
+def build_log(og_shape, reduced_shape, final_shape, to_drop, importance_df, top_feature_names,
+              classes, label_counts, counts_after, train_shape, test_shape, mode: str) -> Dict[str, object]:
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'mode': mode,
+        'dataset_info': {
+            'original_shape': list(og_shape),
+            'after_correlation_cleanup': list(reduced_shape),
+            'final_shape after target drop': list(final_shape),
+            'dropped_correlation_features': to_drop,
+            'dropped_columns': DROP_COLUMNS + TARGET_TO_DROP[TARGET_VARIABLE]
+        },
+        'feature_selection': {
+            'total_features_analyzed': int(len(importance_df)),
+            'selected_features_count': int(len(top_feature_names)),
+            'top_features': top_feature_names,
+            'feature_importance_scores': importance_df.head(N_TOP_FEATURES).to_dict('records')
+        },
+        'class_distribution': {
+            'before_smote': {str(label): int(count) for label, count in zip(classes, label_counts)},
+            'after_smote': {str(label): int(count) for label, count in zip(classes, counts_after)},
+            'smote_improvements': {
+                str(label): f"{int(before)} → {int(after)} samples ({((after - before) / before * 100) if before > 0 else 0:+.1f}%)"
+                for label, before, after in zip(classes, label_counts, counts_after)
+            }
+        },
+        'data_quality': {
+            'target_variable': TARGET_VARIABLE,
+            'classes': [str(label) for label in classes],
+            'train_test_split': {
+                'train_samples': int(train_shape[0]),
+                'test_samples': int(test_shape[0]),
+                'train_features': int(train_shape[1]),
+                'test_features': int(test_shape[1])
+            }
         }
     }
-}
 
-# Save log
-import json
-with open(f'{output_dir}/data_preprocessing_log.json', 'w') as f:
-    json.dump(log_data, f, indent=2)
 
-print(f"Preprocessing log saved to: {output_dir}/data_preprocessing_log.json")
+def save_log_and_metadata(output_dir: str, log_data: Dict[str, object], metadata: Dict[str, object]):
+    # Save log
+    with open(f'{output_dir}/data_preprocessing_log.json', 'w') as f:
+        json.dump(log_data, f, indent=2)
+    print(f"Preprocessing log saved to: {output_dir}/data_preprocessing_log.json")
 
-# =========================================================== #
-# Save processed data
-np.savez_compressed(
-    f'{output_dir}/processed_data.npz',
-    X_train_unSMOTE=X_train_unSMOTE,  # Original X_train before SMOTE for unsupervised learning
-    X_train=X_train,
-    X_test=X_test,
-    y_train=y_train,
-    y_test=y_test
-)
+    # Save metadata (including label encoder, feature names, and preprocessing constants)
+    with open(f'{output_dir}/feature_metadata.pkl', 'wb') as f:
+        pickle.dump(metadata, f)
 
-# Save metadata (including label encoder, feature names, and preprocessor)
-with open(f'{output_dir}/feature_metadata.pkl', 'wb') as f:
-    pickle.dump({
+
+# =========================================================== #
+# In-memory pipeline
+
+def run_in_memory(input_path: str, output_dir: str, eda_dir: str, strategy: str = 'rf', use_cache: bool = True,
+                  smote_cap: Optional[int] = None, smote_lazy: bool = False):
+    # Read data
+    df = pd.read_csv(input_path, index_col=False)
+    og_shape = df.shape
+    plot_label_distribution(df['Label'].value_counts(sort=False))
+
+    # Correlation analysis without the identifier/label columns
+    pruner = CorrelationPruner(CORRELATION_THRESHOLD).fit(df.drop(columns=NON_FEATURE_COLUMNS))
+    to_drop = pruner.to_drop
+    df_reduced_shape = (df.shape[0], df.shape[1] - len(to_drop))
+    plot_correlation_heatmaps(pruner, eda_dir)
+
+    # Filter out duplicates within the same target
+    df = reduce_columns(df, to_drop)
+    df = df.drop_duplicates()
+    df = df.drop(columns=TARGET_TO_DROP[TARGET_VARIABLE])
+
+    X = df.drop(TARGET_VARIABLE, axis=1)
+    y = df[TARGET_VARIABLE]
+
+    # Encode target
+    le = LabelEncoder()
+    y = le.fit_transform(y)
+
+    # Compute train and test split
+    X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    # Identifying Numerical and Categorical columns
+    numerical_cols = X_train.select_dtypes(include=[np.number]).columns.to_list()
+    categorical_cols = X_train.select_dtypes(include=[object]).columns.to_list()
+
+    # Apply preprocessor to train and test data
+    preprocessor = build_preprocessor(numerical_cols, categorical_cols)
+    preprocessor.fit(X_train)
+    X_train = preprocessor.transform(X_train)
+    X_test = preprocessor.transform(X_test)
+
+    # Select top features by importance
+    importance_df, top_feature_indices, top_feature_names, ranking_report = select_features(
+        X_train, y_train, preprocessor.get_feature_names_out(), output_dir, strategy, use_cache)
+
+    # Select features using indices (works with NumPy arrays)
+    X_train = X_train[:, top_feature_indices]
+    X_test = X_test[:, top_feature_indices]
+
+    plot_feature_importance(importance_df, output_dir)
+    plot_feature_boxplots(df, top_feature_names, output_dir)
+
+    resampled, label_counts, counts_after, resampling_report = apply_smote(X_train, y_train, smote_cap, smote_lazy)
+    plot_class_distribution(le.classes_, label_counts, counts_after, output_dir)
+
+    log_data = build_log(og_shape, df_reduced_shape, df.shape, to_drop, importance_df, top_feature_names,
+                         le.classes_, label_counts, counts_after, (int(counts_after.sum()), X_train.shape[1]),
+                         X_test.shape, mode='in_memory')
+    log_data['feature_selection']['ranking'] = ranking_report
+    log_data['resampling'] = resampling_report
+
+    # Save processed data (one uncompressed .npy per array + manifest, memory-mapped by main.load_dataset)
+    reset_dataset_dir(f'{output_dir}/processed_data')
+    save_dataset(f'{output_dir}/processed_data', {
+        'X_train_unSMOTE': X_train,  # Original X_train before SMOTE for unsupervised learning
+        **resampled,  # X_train / y_train after SMOTE, or the lazy SMOTE state
+        'X_test': X_test,
+        'y_test': y_test,
+    })
+    save_log_and_metadata(output_dir, log_data, {
         'label_encoder': le,  # LabelEncoder
         'feature_names': top_feature_names,  # Top 15 features (optimized)
-        'target_variable': 'Traffic Type',
-    }, f)
+        'target_variable': TARGET_VARIABLE,
+        'preprocessor': preprocessor,  # Fitted ColumnTransformer (raw columns -> transformed space)
+        'top_feature_indices': top_feature_indices,  # Transformed-space indices of the top 15 features
+        'transform_spec': compile_transform_spec(preprocessor, top_feature_indices),  # Constants of the top 15 features
+        'round_decimals': ROUND_DECIMALS,  # Raw values are rounded before fitting/transforming
+    })
 
-print(f"\nData saved successfully! See log and output at {output_dir}")
+
+# =========================================================== #
+# Streaming pipeline
+
+def _clean_chunks(input_path: str, dtypes: Dict[str, str], chunk_size: int, to_drop: List[str]):
+    """
+    Yields (cleaned chunk, test mask) for passes 2 and 3: reduced, rounded, deduplicated across
+    the whole file and without the other target columns. Both passes see identical rows.
+    """
+    dedup = HashDeduplicator()
+    for chunk in iter_csv_chunks(input_path, chunk_size, dtypes):
+        chunk = reduce_columns(chunk, to_drop)
+        hashes = row_hashes(chunk)
+        keep = dedup.first_occurrences(hashes)
+        chunk = chunk[keep].drop(columns=TARGET_TO_DROP[TARGET_VARIABLE]).reset_index(drop=True)
+        yield chunk, hash_split(hashes[keep], TEST_SIZE)
+
+
+def build_transform_spec(moments: ColumnMoments, categorical_counts: Dict[str, pd.Series]) -> Tuple[Dict[str, list], List[str]]:
+    """
+    Constants of build_preprocessor() fitted on the training set, from streamed statistics:
+    mean imputation, variance > 0 filter and standardization (variance over all rows, imputed ones
+    included, as StandardScaler sees them), then most-frequent imputation and one-hot categories.
+    Returns (spec over every transformed feature, feature names).
+    """
+    spec = {key: [] for key in ('column', 'fill', 'mean', 'scale', 'category')}
+    names = []
+    mean = moments.mean
+    var = moments.m2 / max(moments.rows, 1)
+    for col, m, v, count in zip(moments.columns, mean, var, moments.count):
+        if count == 0 or not v > 0:  # dropped by SimpleImputer / VarianceThreshold
+            continue
+        for key, value in (('column', col), ('fill', float(m)), ('mean', float(m)), ('scale', float(np.sqrt(v))), ('category', None)):
+            spec[key].append(value)
+        names.append(f'num__{col}')
+    for col, counts in categorical_counts.items():
+        if counts.empty:
+            continue
+        # Ties go to the smallest value, as in SimpleImputer(strategy='most_frequent')
+        fill = sorted(counts.index[counts == counts.max()])[0]
+        for category in sorted(counts.index):
+            for key, value in (('column', col), ('fill', fill), ('mean', 0.0), ('scale', 1.0), ('category', category)):
+                spec[key].append(value)
+            names.append(f'cat__{col}_{category}')
+    return spec, names
+
+
+def select_spec(spec: Dict[str, list], indices: List[int]) -> Dict[str, list]:
+    return {key: [values[i] for i in indices] for key, values in spec.items()}
+
+
+def run_streaming(input_path: str, output_dir: str, eda_dir: str, chunk_size: int, sample_size: int,
+                  strategy: str = 'rf', use_cache: bool = True, smote_cap: Optional[int] = None, smote_lazy: bool = False):
+    dtypes = infer_dtypes(input_path)
+    corr_cols = [c for c, dtype in dtypes.items() if c not in NON_FEATURE_COLUMNS and dtype != 'str']
+
+    # Pass 1: label counts and correlation matrix
+    start = time.perf_counter()
+    n_rows = 0
+    label_counts_raw = pd.Series(dtype='int64')
+    pruner = CorrelationPruner(CORRELATION_THRESHOLD)
+    for chunk in iter_csv_chunks(input_path, chunk_size, dtypes):
+        n_rows += len(chunk)
+        label_counts_raw = label_counts_raw.add(chunk['Label'].value_counts(sort=False), fill_value=0)
+        pruner.partial_fit(chunk[corr_cols])
+    og_shape = (n_rows, len(dtypes))
+    plot_label_distribution(label_counts_raw.astype('int64'))
+
+    to_drop = pruner.to_drop
+    plot_correlation_heatmaps(pruner, eda_dir)
+    print(f"[pass 1] {n_rows:,} rows, {len(to_drop)} correlated features dropped ({time.perf_counter() - start:.1f}s)")
+
+    # Pass 2: dedupe, split and training-set statistics
+    start = time.perf_counter()
+    feature_cols = [c for c in dtypes if c not in to_drop + DROP_COLUMNS + TARGET_TO_DROP[TARGET_VARIABLE] + [TARGET_VARIABLE]]
+    numerical_cols = [c for c in feature_cols if dtypes[c] != 'str']
+    categorical_cols = [c for c in feature_cols if dtypes[c] == 'str']
+    moments = ColumnMoments(numerical_cols)
+    categorical_counts = {col: pd.Series(dtype='int64') for col in categorical_cols}
+    train_classes = pd.Series(dtype='int64')
+    test_classes = pd.Series(dtype='int64')
+    sample = ReservoirSample(sample_size, random_state=RANDOM_STATE)
+    n_train = n_test = 0
+    for chunk, is_test in _clean_chunks(input_path, dtypes, chunk_size, to_drop):
+        train = chunk[~is_test]
+        n_train += len(train)
+        n_test += int(is_test.sum())
+        moments.update(train[numerical_cols].to_numpy(dtype=float))
+        for col in categorical_cols:
+            categorical_counts[col] = categorical_counts[col].add(train[col].value_counts(), fill_value=0)
+        train_classes = train_classes.add(train[TARGET_VARIABLE].value_counts(), fill_value=0)
+        test_classes = test_classes.add(chunk.loc[is_test, TARGET_VARIABLE].value_counts(), fill_value=0)
+        sample.add(train)
+    n_unique = n_train + n_test
+    print(f"[pass 2] {n_unique:,} unique rows ({n_train:,} train / {n_test:,} test) ({time.perf_counter() - start:.1f}s)")
+
+    # Encode target (LabelEncoder sorts the classes)
+    le = LabelEncoder().fit(np.array(sorted(train_classes.index.union(test_classes.index))))
+
+    # Rank features on the reservoir sample of training rows
+    spec, feat_names = build_transform_spec(moments, categorical_counts)
+    sample_df = sample.to_frame()
+    X_sample = CompiledRecordTransformer({'transform_spec': spec, 'round_decimals': ROUND_DECIMALS}).transform(sample_df)
+    importance_df, top_feature_indices, top_feature_names, ranking_report = select_features(
+        X_sample, le.transform(sample_df[TARGET_VARIABLE]), feat_names, output_dir, strategy, use_cache)
+    plot_feature_importance(importance_df, output_dir)
+    plot_feature_boxplots(sample_df, top_feature_names, output_dir)
+    del X_sample, sample
+
+    # Pass 3: transform chunk by chunk into memory-mapped outputs
+    start = time.perf_counter()
+    metadata = {
+        'label_encoder': le,  # LabelEncoder
+        'feature_names': top_feature_names,  # Top 15 features (optimized)
+        'target_variable': TARGET_VARIABLE,
+        'top_feature_indices': top_feature_indices,  # Transformed-space indices of the top 15 features
+        'transform_spec': select_spec(spec, top_feature_indices),  # Constants of the top 15 features
+        'round_decimals': ROUND_DECIMALS,  # Raw values are rounded before fitting/transforming
+    }
+    transformer = CompiledRecordTransformer(metadata)
+    data_dir = f'{output_dir}/processed_data'
+    reset_dataset_dir(data_dir)  # incomplete until the manifest is rewritten below
+    n_features = len(top_feature_indices)
+    X_train_unSMOTE = np.lib.format.open_memmap(f'{data_dir}/X_train_unSMOTE.npy', mode='w+', dtype=np.float64, shape=(n_train, n_features))
+    X_test = np.lib.format.open_memmap(f'{data_dir}/X_test.npy', mode='w+', dtype=np.float64, shape=(n_test, n_features))
+    y_test = np.lib.format.open_memmap(f'{data_dir}/y_test.npy', mode='w+', dtype=np.int64, shape=(n_test,))
+    y_train = np.empty(n_train, dtype=np.int64)
+    train_pos = test_pos = 0
+    for chunk, is_test in _clean_chunks(input_path, dtypes, chunk_size, to_drop):
+        X = transformer.transform(chunk)
+        y = le.transform(chunk[TARGET_VARIABLE])
+        n_chunk_train = int((~is_test).sum())
+        X_train_unSMOTE[train_pos:train_pos + n_chunk_train] = X[~is_test]
+        y_train[train_pos:train_pos + n_chunk_train] = y[~is_test]
+        X_test[test_pos:test_pos + len(X) - n_chunk_train] = X[is_test]
+        y_test[test_pos:test_pos + len(X) - n_chunk_train] = y[is_test]
+        train_pos += n_chunk_train
+        test_pos += len(X) - n_chunk_train
+    if (train_pos, test_pos) != (n_train, n_test):
+        raise RuntimeError(f"Pass 3 saw {train_pos}/{test_pos} train/test rows, pass 2 saw {n_train}/{n_test}; the input changed")
+    X_train_unSMOTE.flush()
+    X_test.flush()
+    y_test.flush()
+    print(f"[pass 3] transformed into {data_dir} ({time.perf_counter() - start:.1f}s)")
+
+    # The neighbour search needs the (selected-feature) training set in memory; --smote-lazy avoids storing the result
+    resampled, label_counts, counts_after, resampling_report = apply_smote(np.asarray(X_train_unSMOTE), y_train, smote_cap, smote_lazy)
+    plot_class_distribution(le.classes_, label_counts, counts_after, output_dir)
+    for name, arr in resampled.items():
+        np.save(f'{data_dir}/{name}.npy', arr, allow_pickle=False)
+    write_manifest(data_dir, ['X_train_unSMOTE', *resampled, 'X_test', 'y_test'])
+
+    log_data = build_log(og_shape, (n_rows, len(dtypes) - len(to_drop)), (n_unique, len(feature_cols) + 1), to_drop,
+                         importance_df, top_feature_names, le.classes_, label_counts, counts_after,
+                         (int(counts_after.sum()), n_features), X_test.shape, mode='streaming')
+    log_data['feature_selection']['ranking'] = ranking_report
+    log_data['resampling'] = resampling_report
+    log_data['streaming'] = {'chunk_size': chunk_size, 'feature_ranking_sample': int(len(sample_df)),
+                             'test_classes': {str(k): int(v) for k, v in test_classes.items()}}
+    save_log_and_metadata(output_dir, log_data, metadata)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', default=INPUT_PATH)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--eda-dir', default=EDA_DIR)
+    parser.add_argument('--streaming', action='store_true', help='Process the CSV in chunks (out of core)')
+    parser.add_argument('--chunk-size', type=int, default=200000, help='Rows per chunk in streaming mode')
+    parser.add_argument('--sample-size', type=int, default=200000,
+                        help='Training rows kept for the feature ranking in streaming mode')
+    parser.add_argument('--selection-strategy', choices=STRATEGIES, default='rf',
+                        help='Feature ranking used to pick the top features (see feature_selection.py)')
+    parser.add_argument('--no-selection-cache', action='store_true',
+                        help='Always recompute the feature ranking, even for unchanged data and config')
+    parser.add_argument('--smote-max-per-class', type=int, default=None,
+                        help='Cap on the synthetic rows added per class (default: up to the largest class)')
+    parser.add_argument('--smote-lazy', action='store_true',
+                        help='Save the SMOTE neighbour table instead of X_train; synthetic rows are drawn per training batch')
+    args = parser.parse_args()
+
+    # Create directory
+    os.makedirs(args.output_dir, exist_ok=True)
+    os.makedirs(args.eda_dir, exist_ok=True)
+
+    if args.streaming:
+        run_streaming(args.input, args.output_dir, args.eda_dir, args.chunk_size, args.sample_size,
+                      args.selection_strategy, not args.no_selection_cache, args.smote_max_per_class, args.smote_lazy)
+    else:
+        run_in_memory(args.input, args.output_dir, args.eda_dir, args.selection_strategy, not args.no_selection_cache,
+                      args.smote_max_per_class, args.smote_lazy)
+    print(f"\nData saved successfully! See log and output at {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Correlation-based feature pruning: drop every column correlated above a threshold with an earlier one.
+
+The correlation matrix is one GEMM on standardized float32 data (Z.T @ Z / n), or is accumulated
+chunk by chunk with partial_fit (StreamingCorrelation, pairwise-complete like DataFrame.corr()).
+Selection is a vectorized max over the upper triangle, and the matrix is kept so the heatmaps of
+the original and pruned features are slices of it instead of recomputations.
+"""
+from typing import Iterable, List, Optional
+import numpy as np
+import pandas as pd
+
+from data_preprocessing.streaming import StreamingCorrelation
+
+
+def correlation_matrix(X: np.ndarray, dtype=np.float32) -> np.ndarray:
+    """
+    Pearson correlation of the columns of X. Without missing values this is a single GEMM on the
+    standardized data in `dtype`; columns with missing values use pairwise-complete statistics.
+    Constant columns get NaN, as in DataFrame.corr().
+    """
+    X = np.asarray(X)
+    if np.isnan(X).any():
+        stream = StreamingCorrelation(list(range(X.shape[1])))
+        stream.update(X)
+        return stream.corr().to_numpy()
+    # Moments in float64, the (n x k) copy and the product in `dtype`
+    mean = X.mean(axis=0, dtype=np.float64)
+    std = X.std(axis=0, dtype=np.float64)
+    constant = std == 0
+    Z = ((X - mean) / np.where(constant, 1.0, std)).astype(dtype, copy=False)
+    corr = (Z.T @ Z).astype(np.float64) / len(Z)
+    np.clip(corr, -1.0, 1.0, out=corr)
+    np.fill_diagonal(corr, 1.0)
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+    return corr
+
+
+def correlated_columns(corr: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Boolean mask of the columns whose correlation with any earlier column exceeds the threshold
+    (signed, like the original `any(upper[col] > 0.8)` selection: strong negative correlations are kept).
+    """
+    upper = np.nan_to_num(corr, nan=-np.inf)
+    upper[np.tril_indices_from(upper)] = -np.inf  # keep only the strict upper triangle
+    return upper.max(axis=0, initial=-np.inf) > threshold
+
+
+class CorrelationPruner:
+    """
+    Fit on the numeric feature columns (fit for in-memory data, partial_fit per chunk), then:
+    to_drop (column names), corr_frame() / reduced_corr_frame() for the heatmaps, transform(df).
+    """
+
+    def __init__(self, threshold: float = 0.8, dtype=np.float32):
+        self.threshold = threshold
+        self.dtype = dtype
+        self.columns: Optional[List[str]] = None
+        self.corr_: Optional[np.ndarray] = None
+        self.drop_mask_: Optional[np.ndarray] = None
+        self._stream: Optional[StreamingCorrelation] = None
+
+    def fit(self, df: pd.DataFrame) -> 'CorrelationPruner':
+        numeric = df.select_dtypes(include=[np.number])
+        self.columns = numeric.columns.to_list()
+        self._set_corr(correlation_matrix(numeric.to_numpy(), dtype=self.dtype))
+        return self
+
+    def partial_fit(self, chunk: pd.DataFrame) -> 'CorrelationPruner':
+        if self._stream is None:
+            self.columns = chunk.select_dtypes(include=[np.number]).columns.to_list()
+            self._stream = StreamingCorrelation(self.columns)
+        self._stream.update(chunk[self.columns].to_numpy(dtype=float))
+        self.corr_ = None
+        return self
+
+    def fit_chunks(self, chunks: Iterable[pd.DataFrame]) -> 'CorrelationPruner':
+        for chunk in chunks:
+            self.partial_fit(chunk)
+        return self
+
+    def _set_corr(self, corr: np.ndarray) -> None:
+        self.corr_ = corr
+        self.drop_mask_ = correlated_columns(corr, self.threshold)
+
+    def _fitted(self) -> None:
+        if self.corr_ is None:
+            if self._stream is None:
+                raise ValueError("CorrelationPruner is not fitted")
+            self._set_corr(self._stream.corr().to_numpy())
+
+    @property
+    def to_drop(self) -> List[str]:
+        self._fitted()
+        return [col for col, drop in zip(self.columns, self.drop_mask_) if drop]
+
+    def corr_frame(self) -> pd.DataFrame:
+        self._fitted()
+        return pd.DataFrame(self.corr_, index=self.columns, columns=self.columns)
+
+    def reduced_corr_frame(self) -> pd.DataFrame:
+        """Correlation of the kept columns: pairwise values do not depend on the other columns, so a sub-matrix."""
+        self._fitted()
+        keep = ~self.drop_mask_
+        kept = [col for col, k in zip(self.columns, keep) if k]
+        return pd.DataFrame(self.corr_[np.ix_(keep, keep)], index=kept, columns=kept)
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.drop(columns=self.to_drop)
@@ -0,0 +1,157 @@
+"""
+Feature-importance ranking used to pick the top features in data_cleaning.py.
+
+Strategies (all rank every transformed feature, most important first):
+    rf            100-tree balanced Random Forest on all training rows, on every core (the original selector)
+    rf_subsample  same forest, each tree fitted on a bootstrap of at most `subsample` rows
+    mutual_info   mutual information with the target, on a stratified subsample of `subsample` rows
+    permutation   forest fitted on part of the training set, permutation importance on a stratified holdout
+
+Every ranking comes with a report of wall time and peak traced memory (tracemalloc sees numpy
+buffers, but not the memory of joblib worker processes). Rankings are cached by a hash of the
+input arrays, feature names, strategy config and sklearn version, so re-running preprocessing on
+unchanged data does not refit the selector.
+"""
+import hashlib
+import json
+import os
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_selection import mutual_info_classif
+from sklearn.inspection import permutation_importance
+from sklearn.model_selection import train_test_split
+
+from utils.dataset import array_digest
+
+STRATEGIES = ('rf', 'rf_subsample', 'mutual_info', 'permutation')
+DEFAULT_CONFIG = {
+    'random_state': 42,
+    'n_jobs': -1,
+    'subsample': 20000,   # rows for rf_subsample (per tree) and mutual_info
+    'holdout': 0.25,      # share of the training rows held out for permutation importance
+    'n_repeats': 5,       # permutation rounds per feature
+}
+CACHE_MAX_ENTRIES = 8
+
+
+def _forest(config: Dict[str, object], max_samples=None) -> RandomForestClassifier:
+    # n_jobs does not change the fitted trees, so 'rf' matches the original single-core selector
+    return RandomForestClassifier(n_estimators=100, class_weight="balanced", random_state=config['random_state'],
+                                  n_jobs=config['n_jobs'], max_samples=max_samples)
+
+
+def _stratified_subsample(X: np.ndarray, y: np.ndarray, n: int, random_state: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(X) <= n:
+        return X, y
+    X_sub, _, y_sub, _ = train_test_split(X, y, train_size=n, stratify=y, random_state=random_state)
+    return X_sub, y_sub
+
+
+def _importances(X: np.ndarray, y: np.ndarray, strategy: str, config: Dict[str, object]) -> np.ndarray:
+    if strategy == 'rf':
+        return _forest(config).fit(X, y).feature_importances_
+    if strategy == 'rf_subsample':
+        max_samples = min(len(X), config['subsample'])
+        return _forest(config, max_samples=max_samples).fit(X, y).feature_importances_
+    if strategy == 'mutual_info':
+        X_sub, y_sub = _stratified_subsample(X, y, config['subsample'], config['random_state'])
+        return mutual_info_classif(X_sub, y_sub, random_state=config['random_state'], n_jobs=config['n_jobs'])
+    if strategy == 'permutation':
+        X_fit, X_hold, y_fit, y_hold = train_test_split(X, y, test_size=config['holdout'], stratify=y,
+                                                        random_state=config['random_state'])
+        forest = _forest(config).fit(X_fit, y_fit)
+        result = permutation_importance(forest, X_hold, y_hold, scoring='f1_weighted', n_repeats=config['n_repeats'],
+                                        random_state=config['random_state'], n_jobs=config['n_jobs'])
+        return result.importances_mean
+    raise ValueError(f"Unknown feature selection strategy '{strategy}' (available: {list(STRATEGIES)})")
+
+
+def ranking_key(X: np.ndarray, y: np.ndarray, feat_names: Sequence[str], strategy: str, config: Dict[str, object]) -> str:
+    payload = json.dumps({
+        'X': array_digest(np.asarray(X)), 'y': array_digest(np.asarray(y)), 'features': [str(n) for n in feat_names],
+        'strategy': strategy, 'config': config, 'sklearn': sklearn.__version__,
+    }, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _load_cache(cache_path: str) -> Dict[str, object]:
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'entries': {}}
+
+
+def _store_cache(cache_path: str, cache: Dict[str, object]) -> None:
+    entries = cache['entries']
+    # Oldest entries go first beyond the cap
+    for key in sorted(entries, key=lambda k: entries[k]['report']['timestamp'])[:-CACHE_MAX_ENTRIES]:
+        del entries[key]
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+def rank_features(X: np.ndarray, y: np.ndarray, feat_names: Sequence[str], strategy: str = 'rf',
+                  cache_path: Optional[str] = None, **config) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    """
+    Importance of every feature, sorted most important first (columns feature_name, importance),
+    and a report {strategy, config, wall_time_s, peak_memory_mb, n_samples, n_features, cached}.
+    With cache_path, a ranking computed earlier for the same data and config is returned as is.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown feature selection strategy '{strategy}' (available: {list(STRATEGIES)})")
+    config = dict(DEFAULT_CONFIG, **config)
+    key = ranking_key(X, y, feat_names, strategy, config) if cache_path else None
+    if cache_path:
+        entry = _load_cache(cache_path)['entries'].get(key)
+        if entry is not None:
+            return pd.DataFrame(entry['ranking']), dict(entry['report'], cached=True)
+
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    try:
+        importances = _importances(np.asarray(X), np.asarray(y), strategy, config)
+    finally:
+        wall_time = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+
+    importance_df = (
+        pd.DataFrame({"feature_name": list(feat_names), "importance": importances})
+            .sort_values("importance", ascending=False, kind='stable')
+            .reset_index(drop=True)
+    )
+    report = {
+        'strategy': strategy,
+        'config': config,
+        'wall_time_s': round(wall_time, 3),
+        'peak_memory_mb': round((peak - base) / 2**20, 1),
+        'n_samples': int(len(X)),
+        'n_features': int(len(feat_names)),
+        'timestamp': time.time(),
+        'cached': False,
+    }
+    if cache_path:
+        cache = _load_cache(cache_path)
+        cache['entries'][key] = {'ranking': importance_df.to_dict('list'), 'report': report}
+        _store_cache(cache_path, cache)
+    return importance_df, report
+
+
+def select_top_features(importance_df: pd.DataFrame, feat_names: Sequence[str], k: int) -> Tuple[List[int], List[str]]:
+    """Transformed-space column indices and names of the k most important features."""
+    position = {str(name): i for i, name in enumerate(feat_names)}
+    top_feature_names = importance_df["feature_name"].head(k).to_list()
+    return [position[str(name)] for name in top_feature_names], top_feature_names
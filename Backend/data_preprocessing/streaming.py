@@ -0,0 +1,312 @@
+"""
+Building blocks for processing flow CSVs that do not fit in memory (used by data_cleaning.py --streaming).
+
+Every accumulator is fed one chunk at a time and only keeps per-column (or per-column-pair)
+statistics, so memory is bounded by the chunk size and the number of columns, not the file size.
+The exceptions are HashDeduplicator (8-byte hash per unique row) and the fixed-size samples.
+"""
+import io
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+def infer_dtypes(path: str, sample_rows: int = 10000) -> Dict[str, str]:
+    """
+    Column dtypes from the first rows of the CSV: numeric columns become float64 (so a missing,
+    fractional or infinite value in a later chunk cannot break an int column), everything else str.
+    """
+    sample = pd.read_csv(path, nrows=sample_rows, index_col=False)
+    dtypes = {}
+    for col in sample.columns:
+        if pd.api.types.is_numeric_dtype(sample[col]):
+            dtypes[col] = 'float64'
+        else:
+            dtypes[col] = 'str'
+    return dtypes
+
+
+def iter_csv_chunks(path: str, chunk_size: int, dtypes: Dict[str, str],
+                    usecols: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Read the CSV in chunks of chunk_size rows with enforced dtypes."""
+    if usecols is not None:
+        dtypes = {col: dtype for col, dtype in dtypes.items() if col in usecols}
+    yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtypes, usecols=usecols, index_col=False)
+
+
+def csv_blocks(path: str, block_size: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Split a CSV into byte ranges of about block_size that start and end on line boundaries, so
+    each can be parsed independently (e.g. by different processes). Assumes no newlines inside
+    quoted fields. Returns (header line, [(start, end), ...]).
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        starts = [f.tell()]
+        while starts[-1] + block_size < size:
+            # The line containing byte (start + block_size - 1) still belongs to the current block
+            f.seek(starts[-1] + block_size - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            starts.append(f.tell())
+    return header, list(zip(starts, starts[1:] + [size]))
+
+
+class _FileRange(io.RawIOBase):
+    """Readable view of bytes [start, end) of a file, preceded by `prefix` (the CSV header)."""
+
+    def __init__(self, path: str, start: int, end: int, prefix: bytes = b''):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+        self._prefix = prefix
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._file.read(min(len(buffer), self._remaining))
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def iter_block_chunks(path: str, header: bytes, start: int, end: int, chunk_size: int, **read_csv_kwargs) -> Iterator[pd.DataFrame]:
+    """Parse one csv_blocks() range in chunks, without reading the rest of the file."""
+    with io.BufferedReader(_FileRange(path, start, end, prefix=header)) as f:
+        yield from pd.read_csv(f, chunksize=chunk_size, **read_csv_kwargs)
+
+
+def _first_valid(X: np.ndarray) -> np.ndarray:
+    """First non-NaN value of every column (0 for all-NaN columns); used to shift sums for precision."""
+    valid = ~np.isnan(X)
+    rows = np.where(valid.any(axis=0), valid.argmax(axis=0), -1)
+    return np.where(rows >= 0, X[np.maximum(rows, 0), np.arange(X.shape[1])], 0.0)
+
+
+class StreamingCorrelation:
+    """
+    Pairwise Pearson correlation accumulated over chunks, with the semantics of DataFrame.corr():
+    each pair only uses the rows where both values are present.
+
+    Per pair it keeps the co-observed count, sums, sums of squares and cross products of the values
+    shifted by the first observed value of each column (which keeps the one-pass formulas well
+    conditioned). Each update is a handful of (k x rows) @ (rows x k) products.
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.shift: Optional[np.ndarray] = None
+        self.n = np.zeros((k, k))
+        self.s = np.zeros((k, k))  # s[i, j]: sum of column i over rows where j is present
+        self.q = np.zeros((k, k))  # same for the squares
+        self.p = np.zeros((k, k))  # cross products over rows where both are present
+
+    def update(self, values: np.ndarray) -> None:
+        X = np.asarray(values, dtype=float)
+        if len(X) == 0:
+            return
+        if self.shift is None:
+            self.shift = _first_valid(X)
+        D = X - self.shift
+        present = ~np.isnan(D)
+        if present.all():
+            col_sum = D.sum(axis=0)
+            self.n += len(D)
+            self.s += col_sum[:, None]
+            self.q += (D * D).sum(axis=0)[:, None]
+            self.p += D.T @ D
+        else:
+            M = present.astype(float)
+            D = np.where(present, D, 0.0)
+            self.n += M.T @ M
+            self.s += D.T @ M
+            self.q += (D * D).T @ M
+            self.p += D.T @ D
+
+    def corr(self) -> pd.DataFrame:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self.p - self.s * self.s.T / self.n
+            var = self.q - self.s ** 2 / self.n  # var[i, j]: variance of i over rows where j is present
+            r = cov / np.sqrt(var * var.T)
+        r[(self.n < 1) | (var <= 0) | (var.T <= 0)] = np.nan
+        return pd.DataFrame(np.clip(r, -1.0, 1.0), index=self.columns, columns=self.columns)
+
+
+class ColumnMoments:
+    """Per-column count, mean and sum of squared deviations of the non-missing values, over chunks."""
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        self.rows = 0
+        self.shift: Optional[np.ndarray] = None
+        self.count = np.zeros(len(self.columns))
+        self._sum = np.zeros(len(self.columns))
+        self._sum_sq = np.zeros(len(self.columns))
+
+    def update(self, values: np.ndarray) -> None:
+        X = np.asarray(values, dtype=float)
+        if len(X) == 0:
+            return
+        if self.shift is None:
+            self.shift = _first_valid(X)
+        D = X - self.shift
+        self.rows += len(D)
+        self.count += (~np.isnan(D)).sum(axis=0)
+        self._sum += np.nansum(D, axis=0)
+        self._sum_sq += np.nansum(D * D, axis=0)
+
+    @property
+    def mean(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count > 0, self.shift + self._sum / self.count, np.nan)
+
+    @property
+    def m2(self) -> np.ndarray:
+        """Sum of squared deviations from the mean (the variance numerator)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            m2 = self._sum_sq - np.where(self.count > 0, self._sum ** 2 / self.count, 0.0)
+        return np.maximum(m2, 0.0)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of every row's values (index ignored); -0.0 and 0.0 hash alike, as in drop_duplicates."""
+    floats = df.select_dtypes(include=[np.floating]).columns
+    if len(floats):
+        df = df.assign(**{col: df[col] + 0.0 for col in floats})
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+class HashDeduplicator:
+    """
+    Streaming drop_duplicates(): remembers the hash of every row kept so far and keeps only
+    first occurrences. Costs one Python int per unique row (~70 bytes), independent of row width.
+    """
+
+    def __init__(self):
+        self.seen = set()
+
+    def first_occurrences(self, hashes: np.ndarray) -> np.ndarray:
+        """Boolean mask of the rows not seen before (in this chunk or an earlier one)."""
+        _, first = np.unique(hashes, return_index=True)
+        first.sort()
+        seen = self.seen
+        candidates = hashes[first].tolist()
+        fresh = np.fromiter((h not in seen for h in candidates), dtype=bool, count=len(candidates))
+        seen.update(h for h, new in zip(candidates, fresh) if new)
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first[fresh]] = True
+        return mask
+
+
+def hash_split(hashes: np.ndarray, test_size: float) -> np.ndarray:
+    """
+    Boolean test-set mask from row hashes: a row always lands on the same side, whatever the
+    chunking or row order, and about test_size of the rows are selected.
+    """
+    buckets = (hashes >> np.uint64(11)) % np.uint64(1000000)
+    return buckets < np.uint64(int(round(test_size * 1000000)))
+
+
+class ReservoirSample:
+    """
+    Uniform random sample of up to `size` rows from a stream of DataFrame chunks (Algorithm R),
+    stored as one preallocated array per column.
+    """
+
+    def __init__(self, size: int, random_state: int = 42):
+        self.size = size
+        self.rng = np.random.default_rng(random_state)
+        self.seen = 0
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._dtypes: Dict[str, object] = {}
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        n = len(chunk)
+        if n == 0:
+            return
+        if self._columns is None:
+            self._dtypes = dict(chunk.dtypes)
+            self._columns = {col: np.empty(self.size, dtype=chunk[col].to_numpy().dtype) for col in chunk.columns}
+        positions = np.arange(self.seen, self.seen + n)
+        slots = positions.copy()
+        filling = positions < self.size
+        # Row t past the fill phase replaces a random slot with probability size / (t + 1)
+        slots[~filling] = self.rng.integers(0, positions[~filling] + 1)
+        rows = np.flatnonzero(slots < self.size)
+        slots = slots[rows]
+        # A later row drawing the same slot overwrites an earlier one: keep the last per slot
+        slots, last = np.unique(slots[::-1], return_index=True)
+        rows = rows[::-1][last]
+        for col, store in self._columns.items():
+            store[slots] = chunk[col].to_numpy()[rows]
+        self.seen += n
+
+    def to_frame(self) -> pd.DataFrame:
+        if self._columns is None:
+            return pd.DataFrame()
+        filled = min(self.seen, self.size)
+        return pd.DataFrame({col: pd.Series(store[:filled]).astype(self._dtypes[col])
+                             for col, store in self._columns.items()})
+
+
+class StratifiedReservoir:
+    """
+    Up to `size` rows per class, sampled uniformly without replacement from a stream of chunks.
+
+    Every row comes with a uniform random key and each class keeps the `size` rows with the
+    smallest keys, so a row only costs a comparison once its class is full, and two samples of
+    disjoint parts of the stream merge into the sample of their union. The result does not
+    depend on chunking or merge order, only on the keys.
+    """
+
+    def __init__(self, size: int, column: str):
+        self.size = size
+        self.column = column
+        self.rows: Dict[str, pd.DataFrame] = {}
+        self.keys: Dict[str, np.ndarray] = {}
+        self.seen: Dict[str, int] = {}
+
+    def add(self, chunk: pd.DataFrame, keys: np.ndarray) -> None:
+        for cls, idx in chunk.groupby(self.column, sort=False).indices.items():
+            self.seen[cls] = self.seen.get(cls, 0) + len(idx)
+            class_keys = keys[idx]
+            if len(self.keys.get(cls, ())) >= self.size:
+                below = class_keys < self.keys[cls].max()
+                idx, class_keys = idx[below], class_keys[below]
+                if len(idx) == 0:
+                    continue
+            self._keep_smallest(cls, chunk.iloc[idx], class_keys)
+
+    def merge(self, other: 'StratifiedReservoir') -> None:
+        for cls, rows in other.rows.items():
+            self.seen[cls] = self.seen.get(cls, 0) + other.seen[cls]
+            self._keep_smallest(cls, rows, other.keys[cls])
+
+    def _keep_smallest(self, cls: str, rows: pd.DataFrame, keys: np.ndarray) -> None:
+        if cls in self.rows:
+            rows = pd.concat([self.rows[cls], rows], ignore_index=True)
+            keys = np.concatenate([self.keys[cls], keys])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size - 1)[:self.size]
+            rows, keys = rows.iloc[keep], keys[keep]
+        self.rows[cls] = rows.reset_index(drop=True)
+        self.keys[cls] = keys
+
+    def to_frame(self) -> pd.DataFrame:
+        """All sampled rows, classes in sorted order and rows in key order (deterministic)."""
+        frames = [self.rows[cls].iloc[np.argsort(self.keys[cls], kind='stable')] for cls in sorted(self.rows)]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
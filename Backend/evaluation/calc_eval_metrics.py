@@ -3,189 +3,215 @@ Multiclass Network Traffic Classification Evaluation
 Evaluates models for multiclass threat type classification
 """
 
-from typing import Dict
+from typing import Dict, NamedTuple, Optional
 import numpy as np
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score, 
-    roc_auc_score, confusion_matrix, classification_report,
-    precision_recall_fscore_support
-)
-from sklearn.cluster import KMeans, DBSCAN
-from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
+from sklearn.metrics import roc_auc_score
+from sklearn.base import ClusterMixin
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.pipeline import Pipeline
+from utils.dbscan_engine import as_dbscan_predictor
+from utils.predict import predict_arrays
+from evaluation.context import EvaluationContext
+from evaluation.cluster_metrics import clustering_quality
+from evaluation.metrics_engine import ConfusionMatrix, confusion_counts, iter_chunks
 
-def kmeans_eval(km_model, X, y_true):
+def is_clustering_model(model) -> bool:
+    """KMeans / DBSCAN (or a Pipeline ending in one) vs. a supervised classifier"""
+    if isinstance(model, Pipeline):
+        model = model.steps[-1][1]
+    return isinstance(model, ClusterMixin)
+
+class ClusterContingency(NamedTuple):
+    """Cluster x true-class counts with the majority-vote mapping derived from them"""
+    cluster_ids: np.ndarray   # row ids, every id from min(clusters.min(), 0) to clusters.max()
+    counts: np.ndarray        # (len(cluster_ids), n_classes) sample counts; rows of unseen ids are 0
+    mapping: Dict[int, int]   # observed cluster id -> majority class
+    y_pred: np.ndarray        # majority class of each sample's cluster
+
+def cluster_contingency(clusters, y_true, n_classes: Optional[int] = None) -> ClusterContingency:
+    """
+        Contingency table of cluster ids (DBSCAN noise -1 included) vs. class indices in O(n):
+        one np.bincount over cluster*n_classes + label. Majority class per cluster is the row argmax
+        (ties -> lowest class, as np.unique + argmax); samples get it through an array lookup
+    """
+    clusters = np.asarray(clusters).astype(np.int64)
+    y_true = np.asarray(y_true).astype(np.int64)
+    if n_classes is None:
+        n_classes = int(y_true.max()) + 1 if y_true.size else 1
+    low = min(int(clusters.min()), 0) if clusters.size else 0
+    n_rows = int(clusters.max()) - low + 1 if clusters.size else 0
+    rows = clusters - low
+
+    counts = np.bincount(rows * n_classes + y_true, minlength=n_rows * n_classes).reshape(n_rows, n_classes)
+    # Fallback for empty clusters → use overall majority class
+    default_label = int(np.argmax(counts.sum(axis=0)))
+    observed = counts.any(axis=1)
+    majority = np.where(observed, counts.argmax(axis=1), default_label)
+
+    cluster_ids = np.arange(low, low + n_rows)
+    mapping = {int(c): int(m) for c, m in zip(cluster_ids[observed], majority[observed])}
+    return ClusterContingency(cluster_ids, counts, mapping, majority[rows].astype(int))
+
+def kmeans_eval(km_model, X, y_true, clusters: Optional[np.ndarray] = None):
     """
         Evaluate K-means clustering for multiclass using majority vote
-        Uses the already trained K-means model
+        Uses the already trained K-means model (or precomputed cluster assignments)
     """
-    if isinstance(km_model, KMeans):
-        clusters = km_model.predict(X)
-    else:
+    if clusters is None:
         # DBSCAN labels may include -1 for noise
-        clusters = km_model.fit_predict(X)
+        clusters = as_dbscan_predictor(km_model).predict(X)
 
     # Majority vote: for each observed cluster label, pick the most frequent y_true
-    mapping = {}
-    # Fallback for noise (-1) or empty clusters → use overall majority class
-    overall_vals, overall_counts = np.unique(y_true, return_counts=True)
-    default_label = int(overall_vals[np.argmax(overall_counts)])
-
-    unique_clusters = np.unique(clusters)
-    for c in unique_clusters:
-        idx = np.where(clusters == c)[0]
-        if len(idx) == 0:
-            mapping[c] = default_label
-            continue
-        vals, counts = np.unique(y_true[idx], return_counts=True)
-        mapping[c] = int(vals[np.argmax(counts)]) if len(vals) else default_label
-
-    # convert clusters -> predicted labels (handle unseen labels like -1)
-    y_pred = np.array([mapping.get(c, default_label) for c in clusters], dtype=int)
-
-    return y_pred, mapping
-
-def evaluate_clustering(model, X_test, y_test):
-    """Evaluate clustering model: clustering metrics + majority-vote multiclass metrics."""
+    table = cluster_contingency(clusters, y_true)
+    return table.y_pred, table.mapping
+
+def evaluate_clustering(model, X_test, y_test, clusters: Optional[np.ndarray] = None, majority_vote=None,
+                        **silhouette_options):
+    """
+        Evaluate clustering model: clustering metrics + majority-vote multiclass metrics.
+        clusters / majority_vote: precomputed assignments and kmeans_eval result (see EvaluationContext)
+        silhouette_options: sample_size, random_state, time_budget_s, n_rounds of the subsampled
+        silhouette with bootstrap confidence interval (see evaluation/cluster_metrics.py)
+    """
     # Cluster assignments
-    if isinstance(model, KMeans):
-        y_pred_clusters = model.predict(X_test)
-    else:
-        y_pred_clusters = model.fit_predict(X_test)
+    y_pred_clusters = as_dbscan_predictor(model).predict(X_test) if clusters is None else clusters
 
     # Clustering metrics
-    # KMeans exposes inertia_; DBSCAN doesn't → use NaN when unavailable
-    if isinstance(model, KMeans):
+    # KMeans / MiniBatchKMeans expose inertia_; DBSCAN doesn't → use NaN when unavailable
+    if isinstance(model, (KMeans, MiniBatchKMeans)):
         inertia_val = float(getattr(model, 'inertia_', float('nan')))
     elif isinstance(model, Pipeline) and 'kmeans' in model.named_steps and isinstance(model.named_steps['kmeans'], KMeans):
         inertia_val = float(getattr(model.named_steps['kmeans'], 'inertia_', float('nan')))
     else:
         inertia_val = float('nan')
     clustering_metrics = {
-        'silhouette': float(silhouette_score(X_test, y_pred_clusters)),
-        'calinski_harabasz': float(calinski_harabasz_score(X_test, y_pred_clusters)),
-        'davies_bouldin': float(davies_bouldin_score(X_test, y_pred_clusters)),
+        **clustering_quality(X_test, y_pred_clusters, **silhouette_options),
         'inertia': inertia_val,
     }
 
     # Majority vote mapping → class indices
-    y_pred_class, mapping = kmeans_eval(model, X_test, y_test)
-
-    precision_per_class, recall_per_class, f1_per_class, support_per_class = precision_recall_fscore_support(
-        y_test, y_pred_class, average=None, zero_division=0
-    )
+    if majority_vote is None:
+        majority_vote = kmeans_eval(model, X_test, y_test, clusters=y_pred_clusters)
+    y_pred_class, mapping = majority_vote
 
+    # Every classification metric comes from one confusion matrix
     return {
         **clustering_metrics,
-        'accuracy': float(accuracy_score(y_test, y_pred_class)),
-        'precision_weighted': float(precision_score(y_test, y_pred_class, average='weighted', zero_division=0)),
-        'recall_weighted': float(recall_score(y_test, y_pred_class, average='weighted', zero_division=0)),
-        'f1_weighted': float(f1_score(y_test, y_pred_class, average='weighted', zero_division=0)),
+        **ConfusionMatrix.from_labels(y_test, y_pred_class).metrics(),
         'roc_auc_ovr': float('nan'),
-        'confusion_matrix': confusion_matrix(y_test, y_pred_class),
         'cluster_label_map': mapping,
-        'precision_per_class': precision_per_class.tolist(),
-        'recall_per_class': recall_per_class.tolist(),
-        'f1_per_class': f1_per_class.tolist(),
-        'support_per_class': support_per_class.tolist(),
     }
 
-def evaluate_classifier(model, X_test, y_test):
+def evaluate_classifier(model, X_test, y_test, predictions=None):
     """
         Evaluate supervised classifier with standard multiclass metrics.
+        predictions: precomputed (y_pred, y_proba) pair (see EvaluationContext)
     """
-    y_pred = model.predict(X_test)
+    y_pred, y_proba = predictions if predictions is not None else predict_arrays(model, X_test)
     # AUC requires class probabilities; compute only if the model supports it
-    if hasattr(model, 'predict_proba'):
-        y_proba = model.predict_proba(X_test)
+    if y_proba is not None:
         roc_auc_ovr = roc_auc_score(y_test, y_proba, multi_class='ovr', average='macro')
     else:
         roc_auc_ovr = float('nan')
 
-    precision_per_class, recall_per_class, f1_per_class, support_per_class = precision_recall_fscore_support(
-        y_test, y_pred, average=None, zero_division=0
-    )
-
+    # Every classification metric comes from one confusion matrix
     return {
-        'accuracy': float(accuracy_score(y_test, y_pred)),
-        'precision_weighted': float(precision_score(y_test, y_pred, average='weighted', zero_division=0)),
-        'recall_weighted': float(recall_score(y_test, y_pred, average='weighted', zero_division=0)),
-        'f1_weighted': float(f1_score(y_test, y_pred, average='weighted', zero_division=0)),
+        **ConfusionMatrix.from_labels(y_test, y_pred).metrics(),
         'roc_auc_ovr': float(roc_auc_ovr),
-        'confusion_matrix': confusion_matrix(y_test, y_pred),
-        'precision_per_class': precision_per_class.tolist(),
-        'recall_per_class': recall_per_class.tolist(),
-        'f1_per_class': f1_per_class.tolist(),
-        'support_per_class': support_per_class.tolist(),
     }
 
-def evaluate_models(models: Dict[str, object], X_test, y_test, n_classes: int) -> Dict[str, Dict[str, object]]:
+def evaluate_classifier_chunks(model, X_test, y_test, n_classes: int, chunk_rows: int = 65536) -> Dict[str, object]:
+    """
+        evaluate_classifier for test sets larger than memory: predictions are made chunk by chunk
+        (e.g. over memory-mapped arrays) and only the confusion matrix is kept. ROC AUC needs every
+        probability at once, so it is NaN here
+    """
+    cm = ConfusionMatrix(n_classes)
+    for X_chunk, y_chunk in iter_chunks(X_test, y_test, chunk_rows):
+        cm.update(y_chunk, predict_arrays(model, X_chunk)[0])
+    return {**cm.metrics(), 'roc_auc_ovr': float('nan')}
+
+def majority_vote(context: EvaluationContext, name: str, model, X_test, y_test):
+    """kmeans_eval on the context's cluster assignments, computed once per (model, X, y)"""
+    return context.cluster_classes(name, model, X_test, y_test,
+                                   lambda clusters: kmeans_eval(model, X_test, y_test, clusters=clusters))
+
+def evaluate_models(models: Dict[str, object], X_test, y_test, n_classes: int,
+                    context: Optional[EvaluationContext] = None) -> Dict[str, Dict[str, object]]:
     """
     Evaluate multiclass models and return comprehensive metrics
+    context: shares model outputs with calculate_label_metrics / export_reports (a private one is used if omitted)
     """
     results: Dict[str, Dict[str, object]] = {}
+    context = context or EvaluationContext()
     
     for name, model in models.items():
         print(f"Evaluating {name}...")
         
         # Detect clustering vs. classifier path (metrics differ)
-        is_kmeans = isinstance(model, KMeans) or (isinstance(model, Pipeline) and 'kmeans' in getattr(model, 'named_steps', {}))
-        is_dbscan = isinstance(model, DBSCAN) or (isinstance(model, Pipeline) and 'dbscan' in getattr(model, 'named_steps', {}))
-
-        if is_kmeans or is_dbscan:
-            metrics = evaluate_clustering(model, X_test, y_test)
+        if is_clustering_model(model):
+            metrics = evaluate_clustering(model, X_test, y_test, clusters=context.clusters(name, model, X_test),
+                                          majority_vote=majority_vote(context, name, model, X_test, y_test))
         else:
-            metrics = evaluate_classifier(model, X_test, y_test)
+            metrics = evaluate_classifier(model, X_test, y_test, predictions=context.predict(name, model, X_test))
 
         results[name] = metrics
 
     return results
 
-def calculate_label_metrics(models: Dict[str, object], X_test, y_test, traffic_types: list) -> Dict[str, Dict[str, float]]:
+# Traffic Type -> Label (0 benign, 1 malicious); names are matched with spaces as underscores
+TRAFFIC_TYPE_TO_LABEL = {
+    'Audio': 0, 'Background': 0, 'Text': 0, 'Video': 0,  # Benign types
+    'Bruteforce': 1, 'DoS': 1, 'Information_Gathering': 1, 'Mirai': 1  # Malicious types
+}
+
+def label_lookup(traffic_types) -> np.ndarray:
+    """Binary label per class id (indexed like label_encoder.classes_); unknown types default to benign"""
+    return np.array([TRAFFIC_TYPE_TO_LABEL.get(str(name).replace(' ', '_'), 0) for name in traffic_types], dtype=np.int64)
+
+def binary_confusion_matrix(y_true, y_pred) -> np.ndarray:
+    """2x2 confusion matrix [[tn, fp], [fn, tp]] of 0/1 labels from one np.bincount"""
+    return confusion_counts(y_true, y_pred, 2)
+
+def binary_metrics(cm: np.ndarray) -> Dict[str, float]:
+    """Accuracy / precision / recall / F1 of the positive class (zero_division=0, as sklearn)"""
+    (tn, fp), (fn, tp) = cm.astype(np.float64)
+    total = tn + fp + fn + tp
+    return {
+        'accuracy': float((tp + tn) / total) if total else 0.0,
+        'precision': float(tp / (tp + fp)) if tp + fp else 0.0,
+        'recall': float(tp / (tp + fn)) if tp + fn else 0.0,
+        'f1': float(2 * tp / (2 * tp + fp + fn)) if tp else 0.0,
+    }
+
+def calculate_label_metrics(models: Dict[str, object], X_test, y_test, traffic_types: list,
+                            context: Optional[EvaluationContext] = None) -> Dict[str, Dict[str, float]]:
     """
         Calculate Label metrics from Traffic Type predictions for all models
+        Class ids map to binary labels through one lookup array; metrics come from a 2x2 confusion matrix
     """
-    traffic_type_to_label_map = {
-        'Audio': 0, 'Background': 0, 'Text': 0, 'Video': 0,  # Benign types
-        'Bruteforce': 1, 'DoS': 1, 'Information_Gathering': 1, 'Mirai': 1  # Malicious types
-    }
-    
-    def to_label(name: str) -> int:
-        return traffic_type_to_label_map.get(name, 0)  # Default to benign if unknown
+    context = context or EvaluationContext()
+    to_label = label_lookup(traffic_types)
     
     # Calculate Label metrics for all models
     all_label_metrics = {}
-    classes = traffic_types
     
     # Get true labels once
-    y_true_names = [classes[i] for i in y_test]
-    y_true_label = [to_label(n) for n in y_true_names]
+    y_true_label = to_label[np.asarray(y_test, dtype=np.int64)]
     
     for model_name, model in models.items():
         # Predict Traffic Type for this model
-        is_kmeans = isinstance(model, KMeans) or (isinstance(model, Pipeline) and 'kmeans' in getattr(model, 'named_steps', {}))
-        is_dbscan = isinstance(model, DBSCAN) or (isinstance(model, Pipeline) and 'dbscan' in getattr(model, 'named_steps', {}))
-        if is_kmeans or is_dbscan:
+        if is_clustering_model(model):
             # Map clusters to class indices using majority vote (handles DBSCAN noise as well)
-            y_pred_type, _ = kmeans_eval(model, X_test, y_test)
+            y_pred_type, _ = majority_vote(context, model_name, model, X_test, y_test)
         else:
-            y_pred_type = model.predict(X_test)
-        
-        # Map indices -> names
-        y_pred_names = [classes[i] for i in y_pred_type]
+            y_pred_type, _ = context.predict(model_name, model, X_test)
         
         # Convert to binary labels
-        y_pred_label = [to_label(n) for n in y_pred_names]
+        y_pred_label = to_label[np.asarray(y_pred_type, dtype=np.int64)]
         
         # Calculate metrics
-        label_metrics = {
-            'accuracy': float(accuracy_score(y_true_label, y_pred_label)),
-            'precision': float(precision_score(y_true_label, y_pred_label, zero_division=0)),
-            'recall': float(recall_score(y_true_label, y_pred_label, zero_division=0)),
-            'f1': float(f1_score(y_true_label, y_pred_label, zero_division=0))
-        }
-        
-        all_label_metrics[model_name] = label_metrics
+        all_label_metrics[model_name] = binary_metrics(binary_confusion_matrix(y_true_label, y_pred_label))
     
     return all_label_metrics
 
@@ -219,6 +245,9 @@ def print_results(results: Dict[str, Dict[str, object]], traffic_types: list):
         # Clustering metrics for K-means
         if 'silhouette' in metrics:
             print(f"Silhouette Score: {metrics['silhouette']:.4f}")
+        if 'silhouette_ci_low' in metrics:
+            print(f"  95% CI: [{metrics['silhouette_ci_low']:.4f}, {metrics['silhouette_ci_high']:.4f}] "
+                  f"({metrics['silhouette_rounds']} x {metrics['silhouette_sample_size']} rows)")
         if 'calinski_harabasz' in metrics:
             print(f"Calinski-Harabasz Score: {metrics['calinski_harabasz']:.4f}")
         if 'davies_bouldin' in metrics:
@@ -0,0 +1,125 @@
+"""
+Clustering quality metrics that scale past the test sets sklearn's exact silhouette can handle.
+
+Silhouette is O(n^2) in time, so above `sample_size` rows it is estimated on random subsamples
+(sklearn's silhouette_samples computes the pairwise distances in memory-bounded chunks). Rounds
+of fresh subsamples are drawn until `n_rounds` or the time budget is reached, and a bootstrap
+over the per-sample silhouette values gives a confidence interval for the estimate.
+
+Calinski-Harabasz and Davies-Bouldin both only need the cluster centroids and each row's distance
+to its centroid, so they share one chunked pass for the centroids and one for the distances
+(identical to sklearn's definitions, up to floating-point summation order).
+"""
+import time
+from typing import Dict, Optional
+import numpy as np
+from sklearn.metrics import silhouette_samples
+
+from config import (get_cluster_metrics_rounds, get_cluster_metrics_sample_size, get_cluster_metrics_seed,
+                    get_cluster_metrics_time_budget)
+
+
+def _chunks(n: int, chunk_rows: int):
+    for start in range(0, n, chunk_rows):
+        yield slice(start, start + chunk_rows)
+
+
+def centroid_scores(X, labels, chunk_rows: int = 65536) -> Dict[str, float]:
+    """Calinski-Harabasz and Davies-Bouldin from one centroid pass and one row-to-centroid distance pass."""
+    labels = np.asarray(labels)
+    clusters, codes = np.unique(labels, return_inverse=True)
+    n, k = len(labels), len(clusters)
+    if not 1 < k < n:
+        raise ValueError(f"Number of labels is {k}. Valid values are 2 to n_samples - 1 (inclusive)")
+
+    counts = np.bincount(codes, minlength=k).astype(np.float64)
+    sums = np.zeros((k, X.shape[1]), dtype=np.float64)
+    for rows in _chunks(n, chunk_rows):
+        chunk = np.asarray(X[rows], dtype=np.float64)
+        for j in range(chunk.shape[1]):
+            sums[:, j] += np.bincount(codes[rows], weights=chunk[:, j], minlength=k)
+    centroids = sums / counts[:, None]
+
+    within_ss = 0.0
+    dist_sums = np.zeros(k, dtype=np.float64)
+    for rows in _chunks(n, chunk_rows):
+        diff = np.asarray(X[rows], dtype=np.float64) - centroids[codes[rows]]
+        sq = np.einsum('ij,ij->i', diff, diff)
+        within_ss += float(sq.sum())
+        dist_sums += np.bincount(codes[rows], weights=np.sqrt(sq), minlength=k)
+
+    # Calinski-Harabasz: between- vs within-cluster dispersion
+    overall_mean = sums.sum(axis=0) / n
+    between_ss = float((counts * ((centroids - overall_mean) ** 2).sum(axis=1)).sum())
+    calinski_harabasz = 1.0 if within_ss == 0 else between_ss * (n - k) / (within_ss * (k - 1))
+
+    # Davies-Bouldin: mean over clusters of the worst (S_i + S_j) / d(c_i, c_j)
+    intra = dist_sums / counts
+    sq_norms = (centroids ** 2).sum(axis=1)
+    centroid_dists = np.sqrt(np.maximum(sq_norms[:, None] + sq_norms[None, :] - 2 * centroids @ centroids.T, 0))
+    np.fill_diagonal(centroid_dists, 0)
+    if np.allclose(intra, 0) or np.allclose(centroid_dists, 0):
+        davies_bouldin = 0.0
+    else:
+        centroid_dists[centroid_dists == 0] = np.inf
+        davies_bouldin = float(np.mean(np.max((intra[:, None] + intra[None, :]) / centroid_dists, axis=1)))
+
+    return {'calinski_harabasz': float(calinski_harabasz), 'davies_bouldin': davies_bouldin}
+
+
+def silhouette_estimate(X, labels, sample_size: Optional[int] = None, random_state: Optional[int] = None,
+                        time_budget_s: Optional[float] = None, n_rounds: Optional[int] = None,
+                        n_bootstrap: int = 1000, confidence: float = 0.95) -> Dict[str, object]:
+    """
+    Silhouette, exact when the data has at most sample_size rows, otherwise the mean over rounds of
+    random subsamples. A round is only started if the previous one suggests it fits in the time
+    budget (the first always runs). Returns silhouette, silhouette_ci_low / _high (bootstrap
+    percentile interval), silhouette_sample_size and silhouette_rounds; the time taken is printed,
+    not returned, so the result only depends on the data and the seed (unless the budget cuts rounds).
+    Defaults come from config (CLUSTER_METRICS_*).
+    """
+    sample_size = sample_size or get_cluster_metrics_sample_size()
+    random_state = get_cluster_metrics_seed() if random_state is None else random_state
+    time_budget_s = get_cluster_metrics_time_budget() if time_budget_s is None else time_budget_s
+    n_rounds = n_rounds or get_cluster_metrics_rounds()
+
+    labels = np.asarray(labels)
+    n = len(labels)
+    exact = n <= sample_size
+    rng = np.random.default_rng(random_state)
+    start = time.perf_counter()
+    values, rounds = [], 0
+    for _ in range(1 if exact else n_rounds):
+        elapsed = time.perf_counter() - start
+        if rounds and time_budget_s and elapsed + elapsed / rounds > time_budget_s:
+            break
+        rows = np.arange(n) if exact else np.sort(rng.choice(n, sample_size, replace=False))
+        rounds += 1
+        sample_labels = labels[rows]
+        if not 1 < len(np.unique(sample_labels)) < len(rows):
+            continue  # silhouette is undefined for this draw
+        values.append(silhouette_samples(np.asarray(X[rows]), sample_labels))
+
+    result = {
+        'silhouette': float('nan'),
+        'silhouette_ci_low': float('nan'),
+        'silhouette_ci_high': float('nan'),
+        'silhouette_sample_size': int(n if exact else sample_size),
+        'silhouette_rounds': rounds,
+    }
+    print(f"Silhouette: {rounds} x {result['silhouette_sample_size']} rows in {time.perf_counter() - start:.1f}s")
+    if not values:
+        return result
+    pooled = np.concatenate(values)
+    # Bootstrap the mean of the per-sample values, in batches to bound memory
+    means = []
+    for size in np.diff(np.r_[0:n_bootstrap:10, n_bootstrap]):
+        means.append(pooled[rng.integers(0, len(pooled), (size, len(pooled)))].mean(axis=1))
+    low, high = np.quantile(np.concatenate(means), [(1 - confidence) / 2, (1 + confidence) / 2])
+    result.update(silhouette=float(pooled.mean()), silhouette_ci_low=float(low), silhouette_ci_high=float(high))
+    return result
+
+
+def clustering_quality(X, labels, **silhouette_options) -> Dict[str, object]:
+    """Silhouette estimate (see silhouette_estimate) plus Calinski-Harabasz and Davies-Bouldin."""
+    return {**silhouette_estimate(X, labels, **silhouette_options), **centroid_scores(X, labels)}
@@ -0,0 +1,64 @@
+"""
+Compute-once cache of model outputs shared by the evaluation and reporting functions.
+"""
+import hashlib
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+from utils.dbscan_engine import as_dbscan_predictor
+from utils.predict import predict_arrays
+
+
+class EvaluationContext:
+    """
+    Memoizes each model's predictions, probabilities and cluster assignments, keyed by
+    (model name, data fingerprint), so evaluate_models, calculate_label_metrics and export_reports
+    run every model once per dataset instead of once per consumer.
+
+    The fingerprint is a hash of the array contents (computed once per array object), so arrays
+    must not be modified in place while a context is in use.
+    """
+
+    def __init__(self):
+        self._cache: Dict[Tuple[str, str, str], object] = {}
+        self._fingerprints: Dict[int, Tuple[np.ndarray, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, X) -> str:
+        cached = self._fingerprints.get(id(X))
+        if cached is not None and cached[0] is X:
+            return cached[1]
+        arr = np.ascontiguousarray(X)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{arr.shape}|{arr.dtype.str}".encode())
+        h.update(arr.data if arr.dtype != object else repr(arr.tolist()).encode())
+        digest = h.hexdigest()
+        # Keep a reference so the id cannot be reused by another array while cached
+        self._fingerprints[id(X)] = (X, digest)
+        return digest
+
+    def _memo(self, kind: str, name: str, key: str, compute: Callable[[], object]):
+        cache_key = (kind, name, key)
+        if cache_key in self._cache:
+            self.hits += 1
+            return self._cache[cache_key]
+        self.misses += 1
+        value = compute()
+        self._cache[cache_key] = value
+        return value
+
+    def predict(self, name: str, model, X) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """(predictions, probabilities) of a classifier; probabilities is None without predict_proba."""
+        return self._memo('predict', name, self.fingerprint(X), lambda: predict_arrays(model, X))
+
+    def clusters(self, name: str, model, X) -> np.ndarray:
+        """Cluster assignments of a clustering model (DBSCAN assigns to its fitted core samples)."""
+        return self._memo('clusters', name, self.fingerprint(X), lambda: as_dbscan_predictor(model).predict(X))
+
+    def cluster_classes(self, name: str, model, X, y_true, compute: Callable[[np.ndarray], object]):
+        """Result of compute(clusters) for a (model, X, y_true) triple, e.g. the majority-vote class mapping."""
+        key = f"{self.fingerprint(X)}:{self.fingerprint(y_true)}"
+        return self._memo('cluster_classes', name, key, lambda: compute(self.clusters(name, model, X)))
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._cache)}
@@ -4,6 +4,9 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 from sklearn.decomposition import PCA
+from evaluation.context import EvaluationContext
+from evaluation.calc_eval_metrics import cluster_contingency
+from evaluation.report_builder import Deferred, ReportBuilder
 
 import os
 from typing import Dict, List, Optional
@@ -134,52 +137,62 @@ def plot_per_class_metrics(results: Dict[str, Dict[str, float]], traffic_types:
 	
 	# Create plots for each model
 	for model_name in models_with_per_class:
-		metrics_data = results[model_name]
-		precision_per_class = metrics_data['precision_per_class']
-		recall_per_class = metrics_data['recall_per_class']
-		f1_per_class = metrics_data['f1_per_class']
-		
-		# Create DataFrame for plotting
-		df_per_class = pd.DataFrame({
-			'Traffic_Type': traffic_types,
-			'Precision': precision_per_class,
-			'Recall': recall_per_class,
-			'F1_Score': f1_per_class
-		})
-		
-		# Melt for easier plotting
-		df_melted = df_per_class.melt(id_vars=['Traffic_Type'], 
-		                             value_vars=['Precision', 'Recall', 'F1_Score'],
-		                             var_name='Metric', value_name='Score')
-		
-		plt.figure(figsize=(12, 6))
-		sns.barplot(data=df_melted, x='Traffic_Type', y='Score', hue='Metric')
-		plt.title(f'Per-Class Metrics - {model_name.upper()}')
-		plt.xlabel('Traffic Type')
-		plt.ylabel('Score')
-		plt.xticks(rotation=45, ha='right')
-		plt.legend(title='Metric')
-		plt.tight_layout()
-		
-		out_path = os.path.join(out_dir, f'per_class_metrics_{model_name}.png')
-		plt.savefig(out_path, dpi=150)
-		plt.close()
-		paths.append(out_path)
+		paths.append(plot_model_per_class_metrics(model_name, results[model_name], traffic_types, out_dir))
 	
 	return paths
 
+def plot_model_per_class_metrics(model_name: str, metrics_data: Dict[str, object], traffic_types: List[str],
+								out_dir: str = 'evaluation_reports/multiclass') -> str:
+	"""
+		Plot per-class precision / recall / F1 of one model
+	"""
+	precision_per_class = metrics_data['precision_per_class']
+	recall_per_class = metrics_data['recall_per_class']
+	f1_per_class = metrics_data['f1_per_class']
+	
+	# Create DataFrame for plotting
+	df_per_class = pd.DataFrame({
+		'Traffic_Type': traffic_types,
+		'Precision': precision_per_class,
+		'Recall': recall_per_class,
+		'F1_Score': f1_per_class
+	})
+	
+	# Melt for easier plotting
+	df_melted = df_per_class.melt(id_vars=['Traffic_Type'], 
+	                             value_vars=['Precision', 'Recall', 'F1_Score'],
+	                             var_name='Metric', value_name='Score')
+	
+	plt.figure(figsize=(12, 6))
+	sns.barplot(data=df_melted, x='Traffic_Type', y='Score', hue='Metric')
+	plt.title(f'Per-Class Metrics - {model_name.upper()}')
+	plt.xlabel('Traffic Type')
+	plt.ylabel('Score')
+	plt.xticks(rotation=45, ha='right')
+	plt.legend(title='Metric')
+	plt.tight_layout()
+	
+	out_path = os.path.join(out_dir, f'per_class_metrics_{model_name}.png')
+	plt.savefig(out_path, dpi=150)
+	plt.close()
+	return out_path
+
 def export_reports(results: Dict[str, Dict[str, float]], traffic_types: List[str], 
 					label_metrics: Dict[str, Dict[str, float]] = None,
 					models: Dict[str, object] = None,
 					X: np.ndarray = None,
 					y_true: np.ndarray = None,
-					clustering_out_dir: str = 'evaluation_reports/clustering') -> Dict[str, str]:
+					clustering_out_dir: str = 'evaluation_reports/clustering',
+					context: Optional[EvaluationContext] = None,
+					builder: Optional[ReportBuilder] = None) -> Dict[str, str]:
 	"""
 		Export all binary and multiclass reports and clustering visualizations
+		Figures are rendered by a ReportBuilder: in parallel, skipping those whose inputs are unchanged
 	"""
 	paths = {}
 	multiclass_out_dir = os.path.join('evaluation_reports', 'multiclass')
 	binary_label_out_dir = os.path.join('evaluation_reports', 'binary_label')
+	builder = builder or ReportBuilder()
 	
 	# Save multiclass metrics summary CSV
 	paths['Multiclass Summary CSV'] = save_results_csv(results, multiclass_out_dir, 'multiclass_metrics_summary.csv')
@@ -189,31 +202,38 @@ def export_reports(results: Dict[str, Dict[str, float]], traffic_types: List[str
 		paths['Label-from-type CSV'] = save_results_csv(label_metrics, binary_label_out_dir, 'label_from_type_metrics.csv')
 	
 	# Create multiclass visualizations
-	paths['Multiclass Metrics Comparison'] = plot_multiclass_metrics(results, multiclass_out_dir)
+	builder.add('Multiclass Metrics Comparison', os.path.join(multiclass_out_dir, 'multiclass_metrics_comparison.png'),
+				plot_multiclass_metrics, results, multiclass_out_dir)
 	
-	paths['Confusion Matrices'] = plot_confusion_matrices(results, multiclass_out_dir, traffic_types)
+	builder.add('Confusion Matrices', os.path.join(multiclass_out_dir, 'confusion_matrices.png'),
+				plot_confusion_matrices, results, multiclass_out_dir, traffic_types)
 	
-	per_class_paths = plot_per_class_metrics(results, traffic_types, multiclass_out_dir)
-	for i, path in enumerate(per_class_paths):
-		model_name = path.split('_')[-1].replace('.png', '')
-		paths[f'Per-Class Metrics ({model_name})'] = path
+	models_with_per_class = [model_name for model_name, metrics in results.items() if 'precision_per_class' in metrics]
+	if not models_with_per_class:
+		raise ValueError('No per-class metrics available')
+	for model_name in models_with_per_class:
+		builder.add(f'Per-Class Metrics ({model_name})', os.path.join(multiclass_out_dir, f'per_class_metrics_{model_name}.png'),
+					plot_model_per_class_metrics, model_name, results[model_name], traffic_types, multiclass_out_dir)
 	
 	# Optionally include clustering plots if models and data are supplied
 	if models is not None and X is not None and y_true is not None:
-		clustering_paths = export_clustering_reports(models, X, y_true, traffic_types, out_dir=clustering_out_dir)
-		paths.update(clustering_paths)
+		export_clustering_reports(models, X, y_true, traffic_types, out_dir=clustering_out_dir,
+									context=context, builder=builder)
 
+	paths.update(builder.build())
 	return paths
 
 # Clustering reports
 def export_clustering_reports(models: Dict[str, object], X: np.ndarray, y_true: np.ndarray,
-							traffic_types: List[str], out_dir: str = 'evaluation_reports/clustering') -> Dict[str, str]:
+							traffic_types: List[str], out_dir: str = 'evaluation_reports/clustering',
+							context: Optional[EvaluationContext] = None,
+							builder: Optional[ReportBuilder] = None) -> Dict[str, str]:
 	"""Generate clustering plots (PCA + heatmap) for supported clustering models found in models dict.
 
 	Parameters
 	----------
 	models : Dict[str, object]
-		Dictionary of trained models keyed by model name (expects keys like 'kmeans', 'dbscan').
+		Dictionary of trained models keyed by model name (expects keys like 'kmeans', 'minibatch_kmeans', 'dbscan').
 	X : np.ndarray
 		Feature matrix to compute cluster assignments on (typically test set).
 	y_true : np.ndarray
@@ -222,32 +242,45 @@ def export_clustering_reports(models: Dict[str, object], X: np.ndarray, y_true:
 		Class label names.
 	out_dir : str
 		Output directory for plots.
+	context : Optional[EvaluationContext]
+		Shared cache of model outputs; cluster assignments already computed during evaluation are reused.
+	builder : Optional[ReportBuilder]
+		Builder to queue the plots on (the caller builds it); by default the plots are built here.
 
 	Returns
 	-------
 	Dict[str, str]
-		Mapping of plot description to saved file paths.
+		Mapping of plot description to saved file paths (empty when queued on a caller's builder).
 	"""
-	paths = {}
-	for clustering_model in ['kmeans', 'dbscan']:
+	own_builder = builder is None
+	builder = builder or ReportBuilder()
+	context = context or EvaluationContext()
+	# One 2-D projection of X for every scatter plot, computed only if one of them is re-rendered
+	features_2d = Deferred(lambda: pca_projection(X))
+	for clustering_model in ['kmeans', 'minibatch_kmeans', 'dbscan']:
 		if clustering_model in models:
 			model = models[clustering_model]
-			if clustering_model == 'kmeans':
-				y_clusters = model.predict(X)
-			else:
-				y_clusters = model.fit_predict(X)
+			y_clusters = context.clusters(clustering_model, model, X)
 
 			# Generate PCA scatter plot
-			pca_path = plot_clustering_pca_scatter(X, y_clusters, clustering_model, out_dir)
-			paths[f'{clustering_model.upper()} PCA by Cluster'] = pca_path
+			builder.add(f'{clustering_model.upper()} PCA by Cluster',
+						os.path.join(out_dir, f'{clustering_model}_pca_by_cluster.png'),
+						plot_clustering_pca_scatter, None, y_clusters, clustering_model, out_dir, features_2d,
+						inputs=(X, y_clusters, clustering_model, out_dir))
 
 			# Generate cluster-label heatmap
-			heatmap_path = plot_cluster_label_heatmap(y_clusters, y_true, traffic_types, clustering_model, out_dir)
-			paths[f'{clustering_model.upper()} Cluster-Label Heatmap'] = heatmap_path
-	return paths
+			builder.add(f'{clustering_model.upper()} Cluster-Label Heatmap',
+						os.path.join(out_dir, f'{clustering_model}_cluster_label_heatmap.png'),
+						plot_cluster_label_heatmap, y_clusters, y_true, traffic_types, clustering_model, out_dir)
+	return builder.build() if own_builder else {}
 
-def plot_clustering_pca_scatter(X: np.ndarray, y_clusters: np.ndarray, algorithm_name: str,
-								out_dir: str = 'evaluation_reports/clustering') -> str:
+def pca_projection(X: np.ndarray) -> np.ndarray:
+	"""2-D PCA projection of X shared by the cluster scatter plots"""
+	return PCA(n_components=2, random_state=42).fit_transform(X)
+
+def plot_clustering_pca_scatter(X: Optional[np.ndarray], y_clusters: np.ndarray, algorithm_name: str,
+								out_dir: str = 'evaluation_reports/clustering',
+								features_2d: Optional[np.ndarray] = None) -> str:
 	"""Create a PCA scatter plot colored by cluster assignments (reusable for any clustering algorithm).
 
 	Parameters
@@ -260,6 +293,8 @@ def plot_clustering_pca_scatter(X: np.ndarray, y_clusters: np.ndarray, algorithm
 		Name of the clustering algorithm (e.g., 'kmeans', 'dbscan').
 	out_dir : str
 		Directory to save plots.
+	features_2d : Optional[np.ndarray]
+		Precomputed pca_projection(X); X is not used when given.
 
 	Returns
 	-------
@@ -267,8 +302,8 @@ def plot_clustering_pca_scatter(X: np.ndarray, y_clusters: np.ndarray, algorithm
 		Path to the saved plot file.
 	"""
 	# Reduce to 2D with PCA for visualization
-	pca = PCA(n_components=2, random_state=42)
-	features_2d = pca.fit_transform(X)
+	if features_2d is None:
+		features_2d = pca_projection(X)
 
 	# Plot colored by cluster assignments
 	plt.figure(figsize=(8, 6))
@@ -317,30 +352,19 @@ def plot_cluster_label_heatmap(y_clusters: np.ndarray, y_true: np.ndarray, traff
 	str
 		Path to the saved plot file.
 	"""
-	# Ensure integers
-	y_clusters = np.asarray(y_clusters).astype(int)
-	y_true = np.asarray(y_true).astype(int)
+	table = cluster_contingency(y_clusters, y_true, n_classes=len(traffic_types))
 
 	# Handle different clustering algorithms
-	unique_clusters = np.unique(y_clusters)
-	if algorithm_name.lower() == 'dbscan' and -1 in unique_clusters:
-		# DBSCAN: include noise cluster (-1)
-		n_clusters = len(unique_clusters)
-		cluster_labels = [f'C{cluster_id}' if cluster_id != -1 else 'Noise' for cluster_id in unique_clusters]
+	if algorithm_name.lower() == 'dbscan' and table.cluster_ids[0] == -1:
+		# DBSCAN: include noise cluster (-1), only clusters that occur
+		observed = table.counts.any(axis=1)
+		cluster_vs_label_counts = table.counts[observed]
+		cluster_labels = [f'C{cluster_id}' if cluster_id != -1 else 'Noise' for cluster_id in table.cluster_ids[observed]]
 	else:
-		# Standard clustering (K-means, etc.)
-		n_clusters = int(np.max(y_clusters)) + 1
-		cluster_labels = [f'C{cluster_id}' for cluster_id in range(n_clusters)]
-	
-	cluster_vs_label_counts = np.zeros((n_clusters, len(traffic_types)), dtype=int)
-	
-	for row_index, cluster_id in enumerate(unique_clusters):
-		member_indices = np.where(y_clusters == cluster_id)[0]
-		if member_indices.size == 0:
-			continue
-		unique_true_labels, label_counts = np.unique(y_true[member_indices], return_counts=True)
-		for label, count in zip(unique_true_labels, label_counts):
-			cluster_vs_label_counts[row_index, int(label)] = int(count)
+		# Standard clustering (K-means, etc.): rows C0..Cmax
+		cluster_vs_label_counts = table.counts[table.cluster_ids >= 0]
+		cluster_labels = [f'C{cluster_id}' for cluster_id in table.cluster_ids[table.cluster_ids >= 0]]
+	n_clusters = len(cluster_labels)
 
 	plt.figure(figsize=(max(8, len(traffic_types)*0.9), max(5, n_clusters*0.4)))
 	sns.heatmap(cluster_vs_label_counts, annot=False, fmt='d', cmap='Purples', cbar=True,
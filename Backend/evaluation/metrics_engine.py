@@ -0,0 +1,100 @@
+"""
+Classification metrics derived from a single k x k confusion matrix.
+
+The matrix is counted with one np.bincount over true*k + pred; accuracy and the per-class,
+weighted and macro precision / recall / F1 are all read off it, matching sklearn (labels = classes
+present in y_true or y_pred, zero_division=0). Counting is additive, so a ConfusionMatrix can be
+updated chunk by chunk and partial matrices from different chunks or workers merged, which lets
+evaluation run over test sets that do not fit in memory.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+
+
+def confusion_counts(y_true, y_pred, n_classes: int) -> np.ndarray:
+    """(n_classes x n_classes) counts, rows = true class, columns = predicted class."""
+    y_true = np.asarray(y_true, dtype=np.int64).ravel()
+    y_pred = np.asarray(y_pred, dtype=np.int64).ravel()
+    if y_true.shape != y_pred.shape:
+        raise ValueError(f"y_true and y_pred have different lengths ({len(y_true)} vs {len(y_pred)})")
+    if y_true.size and (min(y_true.min(), y_pred.min()) < 0 or max(y_true.max(), y_pred.max()) >= n_classes):
+        raise ValueError(f"Labels must be class indices in [0, {n_classes})")
+    return np.bincount(y_true * n_classes + y_pred, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerator / denominator with 0 where the denominator is 0 (sklearn's zero_division=0)"""
+    out = np.zeros(len(numerator), dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+class ConfusionMatrix:
+    """
+    Mergeable confusion matrix: update() per chunk, merge() partial matrices (e.g. one per worker),
+    metrics() for everything evaluate_classifier / evaluate_clustering report.
+    """
+
+    def __init__(self, n_classes: int):
+        self.n_classes = n_classes
+        self.matrix = np.zeros((n_classes, n_classes), dtype=np.int64)
+
+    @classmethod
+    def from_labels(cls, y_true, y_pred, n_classes: Optional[int] = None) -> 'ConfusionMatrix':
+        if n_classes is None:
+            y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+            n_classes = int(max(y_true.max(initial=-1), y_pred.max(initial=-1))) + 1
+        return cls(n_classes).update(y_true, y_pred)
+
+    def update(self, y_true, y_pred) -> 'ConfusionMatrix':
+        self.matrix += confusion_counts(y_true, y_pred, self.n_classes)
+        return self
+
+    def merge(self, other: 'ConfusionMatrix') -> 'ConfusionMatrix':
+        if other.n_classes != self.n_classes:
+            raise ValueError(f"Cannot merge confusion matrices of {self.n_classes} and {other.n_classes} classes")
+        self.matrix += other.matrix
+        return self
+
+    @property
+    def labels(self) -> np.ndarray:
+        """Classes that occur in y_true or y_pred (sklearn's label set)"""
+        return np.flatnonzero(self.matrix.any(axis=0) | self.matrix.any(axis=1))
+
+    def metrics(self) -> Dict[str, object]:
+        labels = self.labels
+        cm = self.matrix[np.ix_(labels, labels)]
+        tp = np.diag(cm).astype(np.float64)
+        support = cm.sum(axis=1)
+        predicted = cm.sum(axis=0)
+        precision = _divide(tp, predicted)
+        recall = _divide(tp, support)
+        f1 = _divide(2 * tp, support + predicted)
+        total = support.sum()
+
+        def weighted(values: np.ndarray) -> float:
+            return float(np.average(values, weights=support)) if total else 0.0
+
+        def macro(values: np.ndarray) -> float:
+            return float(values.mean()) if len(values) else 0.0
+
+        return {
+            'accuracy': float(tp.sum() / total) if total else 0.0,
+            'precision_weighted': weighted(precision),
+            'recall_weighted': weighted(recall),
+            'f1_weighted': weighted(f1),
+            'precision_macro': macro(precision),
+            'recall_macro': macro(recall),
+            'f1_macro': macro(f1),
+            'confusion_matrix': cm,
+            'precision_per_class': precision.tolist(),
+            'recall_per_class': recall.tolist(),
+            'f1_per_class': f1.tolist(),
+            'support_per_class': support.tolist(),
+        }
+
+
+def iter_chunks(X, y, chunk_rows: int = 65536) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+    """Row slices of (X, y); slices of memory-mapped arrays only read their own pages."""
+    for start in range(0, len(y), chunk_rows):
+        yield np.asarray(X[start:start + chunk_rows]), np.asarray(y[start:start + chunk_rows])
@@ -0,0 +1,189 @@
+"""
+Parallel, incremental rendering of the evaluation report figures.
+
+Every figure is a job: a module-level plot function, its arguments and the file it writes. The
+job's input hash (plot function, source of its module, inputs, output path) is recorded in a
+manifest next to the reports, and a figure whose hash is unchanged and whose file still exists
+is skipped. Stale figures are rendered in a process pool with the Agg backend. Inputs that are
+expensive to compute (e.g. the 2-D PCA projection) can be Deferred: they are computed once, in
+the parent, and only if a job that needs them is stale. The wall time of every run is appended
+to a log.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+import numpy as np
+
+from config import get_report_workers
+from utils.dataset import array_digest
+
+REPORT_MANIFEST_PATH = 'evaluation_reports/report_manifest.json'
+REPORT_LOG_PATH = 'evaluation_reports/report_runs.json'
+
+
+class Deferred:
+    """An input computed on first use and shared by every job that receives it."""
+
+    def __init__(self, compute: Callable[[], object]):
+        self._compute = compute
+        self._value = None
+        self._done = False
+
+    def value(self):
+        if not self._done:
+            self._value, self._done = self._compute(), True
+        return self._value
+
+
+class ReportJob(NamedTuple):
+    name: str           # key in the returned paths dict
+    path: str           # file the plot function writes (and returns)
+    func: Callable      # module-level plot function, picklable for the process pool
+    args: tuple         # positional arguments; Deferred ones are resolved before rendering
+    digest: str         # input hash
+
+
+def _update(h, obj) -> None:
+    """Feed obj into the hash; arrays by content digest (no pickled copy), containers recursively."""
+    if isinstance(obj, np.ndarray) and obj.dtype.hasobject:
+        h.update(b'nd' + pickle.dumps(obj.tolist(), protocol=4))
+    elif isinstance(obj, np.ndarray):
+        h.update(b'nd' + array_digest(obj).encode())
+    elif isinstance(obj, dict):
+        h.update(b'{%d' % len(obj))
+        for key, value in obj.items():
+            _update(h, key)
+            _update(h, value)
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[%d' % len(obj))
+        for item in obj:
+            _update(h, item)
+    else:
+        h.update(pickle.dumps(obj, protocol=4))
+
+
+_source_digests: Dict[str, str] = {}
+
+
+def _source_digest(func: Callable) -> str:
+    """Hash of the plot function's module source, so editing a plot re-renders its figures."""
+    module = func.__module__
+    if module not in _source_digests:
+        path = getattr(sys.modules.get(module), '__file__', None)
+        source = b''
+        if path:
+            with open(path, 'rb') as f:
+                source = f.read()
+        _source_digests[module] = hashlib.blake2b(source, digest_size=16).hexdigest()
+    return _source_digests[module]
+
+
+def job_digest(func: Callable, path: str, inputs) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{func.__module__}.{func.__qualname__}|{_source_digest(func)}|{path}".encode())
+    _update(h, inputs)
+    return h.hexdigest()
+
+
+def _init_worker() -> None:
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render(func: Callable, args: tuple):
+    start = time.perf_counter()
+    path = func(*args)
+    return path, time.perf_counter() - start
+
+
+def _load_json(path: str, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return default
+
+
+def _write_json(path: str, data) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ReportBuilder:
+    """
+    Collect figure jobs with add(), then build() renders the stale ones and returns
+    {name: path} for every job (rendered or skipped), in the order they were added.
+    """
+
+    def __init__(self, manifest_path: Optional[str] = REPORT_MANIFEST_PATH,
+                 log_path: Optional[str] = REPORT_LOG_PATH, max_workers: Optional[int] = None):
+        self.manifest_path = manifest_path
+        self.log_path = log_path
+        self.max_workers = max_workers
+        self.jobs: List[ReportJob] = []
+
+    def add(self, name: str, path: str, func: Callable, *args, inputs=None) -> None:
+        """
+        Queue func(*args), which writes `path`. inputs: what the figure depends on, hashed instead
+        of args (required when args contain a Deferred; defaults to args)
+        """
+        if inputs is None:
+            if any(isinstance(arg, Deferred) for arg in args):
+                raise ValueError(f"Report '{name}' has Deferred arguments; pass the inputs they depend on")
+            inputs = args
+        self.jobs.append(ReportJob(name, path, func, args, job_digest(func, path, inputs)))
+
+    def build(self) -> Dict[str, str]:
+        run_start = time.perf_counter()
+        started_at = datetime.now(timezone.utc).isoformat()
+        manifest = _load_json(self.manifest_path, {}) if self.manifest_path else {}
+        is_stale = [manifest.get(job.path) != job.digest or not os.path.exists(job.path) for job in self.jobs]
+        stale = [job for job, s in zip(self.jobs, is_stale) if s]
+        skipped = [job.name for job, s in zip(self.jobs, is_stale) if not s]
+
+        # Resolve deferred inputs once, in the parent, and only for jobs that are rendered
+        calls = [(job, tuple(arg.value() if isinstance(arg, Deferred) else arg for arg in job.args)) for job in stale]
+
+        workers = self.max_workers or get_report_workers() or os.cpu_count() or 1
+        workers = max(1, min(workers, len(calls)))
+        timings: Dict[str, float] = {}
+        if workers == 1:
+            # No pool to start on a single core (or a single stale figure)
+            _init_worker()
+            for job, args in calls:
+                _, timings[job.name] = _render(job.func, args)
+                manifest[job.path] = job.digest
+        elif calls:
+            # spawn: workers import pyplot fresh and select Agg before their first figure
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker) as pool:
+                futures = [(job, pool.submit(_render, job.func, args)) for job, args in calls]
+                for job, future in futures:
+                    _, timings[job.name] = future.result()
+                    manifest[job.path] = job.digest
+
+        if self.manifest_path:
+            _write_json(self.manifest_path, manifest)
+        wall = time.perf_counter() - run_start
+        print(f"Reports: {len(calls)} rendered, {len(skipped)} unchanged, {workers} worker(s), {wall:.1f}s")
+        if self.log_path:
+            runs = _load_json(self.log_path, [])
+            runs.append({
+                'started_at': started_at,
+                'wall_time_s': round(wall, 3),
+                'workers': workers,
+                'rendered': {name: round(t, 3) for name, t in timings.items()},
+                'skipped': skipped,
+            })
+            _write_json(self.log_path, runs)
+        return {job.name: job.path for job in self.jobs}
@@ -2,19 +2,25 @@ import os
 from evaluation.create_reports import export_reports
 import numpy as np
 import pickle
-from utils.model_io import save_models, load_models
-from train import train_models
+from utils.model_io import ModelCache
+from utils.engines import artifact_path
+from utils.mlp_engine import export_mlp
+from utils.forest_engine import CompiledForest
+from train import MODEL_NAMES, build_model, train_models, training_array_names
+from utils.dataset import Dataset, load_dataset as open_dataset
+from utils.resampling import LazySMOTE
+from config import get_model_cache_max_entries, get_model_cache_max_bytes
 from evaluation.calc_eval_metrics import evaluate_models, print_results, calculate_label_metrics, print_label_results
+from evaluation.context import EvaluationContext
 DATA_PATH = 'data_preprocessing/output'
 
-def load_dataset(npz_path: str = f'{DATA_PATH}/processed_data.npz'):
-    data = np.load(npz_path, allow_pickle=True)
-    X_train_unsupervised = data['X_train_unSMOTE']  # Original X_train before SMOTE for unsupervised learning
-    X_train = data['X_train']
-    X_test = data['X_test']
-    y_train = data['y_train']
-    y_test = data['y_test']
-    return X_train_unsupervised, X_train, X_test, y_train, y_test
+def load_dataset(path: str = f'{DATA_PATH}/processed_data') -> Dataset:
+    """
+    Memory-mapped processed dataset (separate .npy files, see utils/dataset); arrays are only read when used:
+    X_train_unSMOTE (original X_train before SMOTE, for unsupervised learning), X_train, X_test, y_train, y_test;
+    with --smote-lazy y_train_unSMOTE, smote_neighbors and smote_synthetic_counts replace X_train/y_train
+    """
+    return open_dataset(path)
 
 
 def load_feature_metadata(pickle_path: str = f'{DATA_PATH}/feature_metadata.pkl'):
@@ -25,6 +31,19 @@ def load_feature_metadata(pickle_path: str = f'{DATA_PATH}/feature_metadata.pkl'
 		return None
 
 
+def export_inference_artifacts(models, X_check, out_dir: str = 'cache/models'):
+    """
+    Export sklearn-free serving artifacts: the NumPy forward-pass MLP (parity-checked on X_check) and the
+    memory-mappable compiled Random Forest (served with MODEL_ENGINES="random_forest=compiled_forest")
+    """
+    if 'mlp' in models:
+        report = export_mlp(models['mlp'], artifact_path(out_dir, 'mlp', 'numpy_mlp'), X_check=X_check)
+        print(f"Exported NumPy MLP engine (max |proba diff| vs sklearn: {report['max_abs_diff']:.2e})")
+    if 'random_forest' in models:
+        CompiledForest.from_sklearn(models['random_forest']).save(artifact_path(out_dir, 'random_forest', 'compiled_forest'))
+        print("Exported memory-mappable compiled Random Forest")
+
+
 def run_multiclass_classification():
     """Run multiclass classification (traffic types)"""
     print("="*60)
@@ -32,7 +51,8 @@ def run_multiclass_classification():
     print("="*60)
     
     # Load supervised dataset (SMOTE-augmented for supervised models, raw samples for unsupervised models)
-    X_train_unsupervised, X_train_supervised, X_test, y_train_supervised, y_test = load_dataset(f'{DATA_PATH}/processed_data.npz')
+    dataset = load_dataset(f'{DATA_PATH}/processed_data')
+    X_test, y_test = dataset['X_test'], dataset['y_test']
     
     metadata = load_feature_metadata(f'{DATA_PATH}/feature_metadata.pkl')
     
@@ -44,47 +64,58 @@ def run_multiclass_classification():
     traffic_types = metadata['label_encoder'].classes_
     n_classes = len(traffic_types)
     
-    print(f"Supervised dataset (SMOTE): {X_train_supervised.size} training samples")
-    print(f"Unsupervised dataset (unsmote): {X_train_unsupervised.size} training samples")
+    # Saved with --smote-lazy: synthetic rows are drawn per training batch instead of being stored in X_train
+    lazy_smote = 'X_train' not in dataset
+    X_train_supervised = LazySMOTE.from_dataset(dataset) if lazy_smote else dataset['X_train']
+    y_train_supervised = None if lazy_smote else dataset['y_train']
+
+    print(f"Supervised dataset ({'lazy SMOTE' if lazy_smote else 'SMOTE'}): {X_train_supervised.size} training samples")
+    print(f"Unsupervised dataset (unsmote): {dataset['X_train_unSMOTE'].size} training samples")
     print(f"Test dataset: {X_test.size} test samples")
     print(f"Traffic Types: {traffic_types}")
     
-    # Try to load cached models first
-    models = load_models(out_dir='cache/models')
-    
-    if not models:
-        print("No cached models found. Training new models...")
-        models = train_models(X_train_supervised, y_train_supervised, X_train_unsupervised, n_classes)
-        save_models(models, out_dir='cache/models')
+    # Reuse cached models trained on exactly this data, with these params and library versions
+    cache = ModelCache(out_dir='cache/models', max_entries=get_model_cache_max_entries(),
+                       max_bytes=get_model_cache_max_bytes())
+    models = {}
+    keys = {}
+    for name in MODEL_NAMES:
+        # Keyed on the manifest digests, so cache hits never read the training arrays
+        keys[name] = cache.key(build_model(name, n_classes), [dataset.digest(a) for a in training_array_names(name, lazy_smote)])
+        model = cache.get(name, keys[name])
+        if model is not None:
+            models[name] = model
+
+    to_train = [name for name in MODEL_NAMES if name not in models]
+    if to_train:
+        print(f"Missing or stale models: {to_train}. Training...")
+        trained = train_models(X_train_supervised, y_train_supervised, dataset['X_train_unSMOTE'], n_classes, names=to_train)
+        for name, model in trained.items():
+            cache.put(name, keys[name], model)
+        models.update(trained)
         print("Models trained and saved to cache.")
-    else:
-        print(f"Loaded {len(models)} cached models: {list(models.keys())}")
-        # Verify we have all expected models
-        expected_models = ['random_forest', 'mlp', 'kmeans', 'dbscan']
-        missing_models = [m for m in expected_models if m not in models]
-        if missing_models:
-            print(f"Missing models: {missing_models}. Training missing models...")
-            # Train only missing models
-            missing_models_dict = train_models(X_train_supervised, y_train_supervised, X_train_unsupervised, n_classes)
-            for model_name in missing_models:
-                if model_name in missing_models_dict:
-                    models[model_name] = missing_models_dict[model_name]
-            save_models(models, out_dir='cache/models')
-            print("Missing models trained and saved to cache.")
+    print(f"Model cache: {cache.stats()}")
+
+    export_inference_artifacts(models, X_test, out_dir='cache/models')
     
-    results = evaluate_models(models, X_test, y_test, n_classes)
+    # Every model is run once on the test set; metrics and reports below share the outputs
+    context = EvaluationContext()
+
+    results = evaluate_models(models, X_test, y_test, n_classes, context=context)
     print_results(results, traffic_types)
     
     # Calculate Label metrics for all models
-    label_metrics = calculate_label_metrics(models, X_test, y_test, traffic_types)
+    label_metrics = calculate_label_metrics(models, X_test, y_test, traffic_types, context=context)
     print_label_results(label_metrics)
     
     # Export the overall summary (multiclass + clustering)
     paths = export_reports(
         results, traffic_types, label_metrics,
         models=models, X=X_test, y_true=y_test,
-        clustering_out_dir='evaluation_reports/clustering'
+        clustering_out_dir='evaluation_reports/clustering',
+        context=context
     )
+    print(f"Evaluation cache: {context.stats()}")
 
     print('\nMulticlass classification artifacts saved to:')
     for artifact_name, path in paths.items():
@@ -0,0 +1,49 @@
+"""
+Bulk-score a CSV or NDJSON file of raw flow records (same columns as data_preprocessing/input/data.csv).
+
+The file is read and scored in fixed-size chunks, so memory stays flat however large it is.
+Results are written as NDJSON, one line per record, in input order.
+
+    python score.py flows.csv --model random_forest -o predictions.ndjson
+    cat flows.ndjson | python score.py - --format ndjson --model mlp
+"""
+import argparse
+import sys
+from config import get_model_dir, get_feature_metadata_path, get_stream_chunk_size
+from utils.features import build_record_transformer, load_feature_metadata
+from utils.model_io import load_model
+from utils.streaming import iter_record_chunks, score_chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="CSV/NDJSON file of flow records, or '-' for stdin")
+    parser.add_argument('--model', default='random_forest')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default=None,
+                        help='Input format (default: from the file extension, csv for stdin)')
+    parser.add_argument('--chunk-size', type=int, default=get_stream_chunk_size())
+    parser.add_argument('--no-proba', action='store_true', help='Only write predicted classes')
+    parser.add_argument('-o', '--output', default='-', help="Output NDJSON file (default: stdout)")
+    args = parser.parse_args()
+
+    fmt = args.format or ('ndjson' if args.input.endswith(('.ndjson', '.jsonl')) else 'csv')
+    metadata = load_feature_metadata(get_feature_metadata_path())
+    if metadata is None:
+        sys.exit("Error: feature metadata not found. Please run preprocessing first")
+    transformer = build_record_transformer(metadata)
+    model = load_model(args.model, out_dir=get_model_dir())
+
+    src = sys.stdin if args.input == '-' else open(args.input, 'r', newline='')
+    dst = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        for chunk in iter_record_chunks(src, fmt, args.chunk_size):
+            dst.write(score_chunk(model, transformer, chunk, return_proba=not args.no_proba))
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+
+if __name__ == "__main__":
+    main()
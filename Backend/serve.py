@@ -1,20 +1,35 @@
 # uvicorn serve:app --host 0.0.0.0 --port 8000 --reload
 # UI: http://127.0.0.1:8000/docs
+import json
 import os
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from utils.model_io import list_models, load_model
-from config import get_model_dir
-from utils.predict import run_prediction
-import pickle
-import os
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError, model_validator
+from config import (get_model_dir, get_model_reload_interval, get_batch_window_ms, get_batch_max_rows,
+                    get_feature_metadata_path, get_stream_chunk_size, get_model_engines, get_model_mmap,
+                    get_online_models)
+from utils.batching import MicroBatcher
+from utils.encoding import BINARY_CONTENT_TYPES, EncodingError, UnsupportedEncodingError, decode_request, encode_response
+from utils.features import FeatureTransformer, build_record_transformer, load_feature_metadata
+from utils.predict import predict_arrays, run_prediction
+from utils.registry import ModelEntry, ModelRegistry
+from utils.streaming import RecordChunker, aiter_lines, score_chunk
 
 
 class PredictRequest(BaseModel):
     model: str
-    instances: List[List[float]]
+    # Either pre-scaled feature vectors...
+    instances: Optional[List[List[float]]] = None
+    # ...or raw flow records keyed by the data.csv column names
+    records: Optional[List[Dict[str, Any]]] = None
+    return_proba: bool = True
     model_config = {
         "json_schema_extra": {
             "examples": [
@@ -28,6 +43,12 @@ class PredictRequest(BaseModel):
         }
     }
 
+    @model_validator(mode="after")
+    def check_one_input(self):
+        if (self.instances is None) == (self.records is None):
+            raise ValueError("Provide exactly one of 'instances' or 'records'")
+        return self
+
 
 class PredictResponse(BaseModel):
     model: str
@@ -35,7 +56,53 @@ class PredictResponse(BaseModel):
     probabilities: Optional[List[List[float]]] = None
 
 
-app = FastAPI(title="Model Inference API", version="1.0.0")
+class PartialFitRequest(BaseModel):
+    # Same inputs as PredictRequest: pre-scaled feature vectors or raw flow records
+    instances: Optional[List[List[float]]] = None
+    records: Optional[List[Dict[str, Any]]] = None
+
+    @model_validator(mode="after")
+    def check_one_input(self):
+        if (self.instances is None) == (self.records is None):
+            raise ValueError("Provide exactly one of 'instances' or 'records'")
+        return self
+
+
+class PartialFitResponse(BaseModel):
+    model: str
+    n_samples: int
+    updated_at: float
+    update_time_ms: float
+
+
+registry = ModelRegistry(get_model_dir(), reload_interval=get_model_reload_interval(), engines=get_model_engines(),
+                         mmap=get_model_mmap())
+batcher = MicroBatcher(window_ms=get_batch_window_ms(), max_rows=get_batch_max_rows())
+record_transformer: Optional[FeatureTransformer] = None
+
+
+def load_record_transformer() -> Optional[FeatureTransformer]:
+    metadata = load_feature_metadata(get_feature_metadata_path())
+    if metadata is None:
+        return None
+    try:
+        return build_record_transformer(metadata)
+    except ValueError as e:
+        print(f"[WARN] Raw-record scoring disabled: {e}")
+        return None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global record_transformer
+    # Load every model once; requests are then served from memory
+    registry.start()
+    record_transformer = load_record_transformer()
+    yield
+    registry.stop()
+
+
+app = FastAPI(title="Model Inference API", version="1.0.0", lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -62,27 +129,180 @@ def health():
     return {"status": "ok"}
 
 
+def get_record_transformer() -> FeatureTransformer:
+    if record_transformer is None:
+        raise HTTPException(status_code=503, detail="Fitted preprocessing pipeline not available. Re-run data_preprocessing/data_cleaning.py")
+    return record_transformer
+
+
+def get_entry(model_name: str) -> ModelEntry:
+    entry = registry.get(model_name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found")
+    return entry
+
+
+def check_n_features(model: object, X: np.ndarray) -> None:
+    """422 when X does not have the number of columns the model was fitted on."""
+    n_features = getattr(model, "n_features_in_", None)
+    if n_features is not None and X.shape[1] != n_features:
+        raise HTTPException(status_code=422, detail=f"Expected {n_features} features per row, got {X.shape[1]}")
+
+
+def request_features(instances: Optional[List[List[float]]], records: Optional[List[Dict[str, Any]]],
+                     model: object) -> np.ndarray:
+    """
+    Feature matrix of a request for `model`: raw records through the fitted preprocessing, or the
+    instances as given. Bad input (ragged rows, wrong number of features) is answered with a 422.
+    """
+    if records is not None:
+        if not records:
+            raise HTTPException(status_code=422, detail="'records' must be a non-empty list")
+        try:
+            X = get_record_transformer().transform(pd.DataFrame.from_records(records))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    else:
+        try:
+            X = np.asarray(instances, dtype=float)
+        except ValueError:
+            X = None
+        if X is None or X.ndim != 2 or X.shape[0] == 0:
+            raise HTTPException(status_code=422, detail="'instances' must be a non-empty list of equal-length rows")
+    check_n_features(model, X)
+    return X
+
+
 @app.get(f"{API_PREFIX}/models")
 def get_models():
-    return list_models(out_dir=get_model_dir())
+    return registry.describe()
+
+
+@app.post(f"{API_PREFIX}/models/{{model_name}}/partial_fit", response_model=PartialFitResponse)
+async def partial_fit(model_name: str, req: PartialFitRequest):
+    """
+    Update an online model (ONLINE_MODELS, default minibatch_kmeans) with a batch of scored traffic.
+    partial_fit runs on a copy of the served model, which is then saved and swapped in; /predict keeps
+    serving the previous version until then and never refits from scratch.
+    """
+    entry = get_entry(model_name)
+    if model_name not in get_online_models() or not hasattr(entry.model, "partial_fit"):
+        raise HTTPException(status_code=400, detail=f"Model '{model_name}' does not accept online updates")
+    X = request_features(req.instances, req.records, entry.model)
+    try:
+        updated = await run_in_threadpool(registry.update, model_name, lambda model: model.partial_fit(X))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return PartialFitResponse(model=model_name, n_samples=int(X.shape[0]), updated_at=updated.loaded_at,
+                              update_time_ms=round(updated.load_time_ms, 3))
+
+
+@app.get(f"{API_PREFIX}/metrics/batching")
+def get_batching_metrics():
+    return batcher.stats()
 
 
-@app.post(f"{API_PREFIX}/predict", response_model=PredictResponse)
-def predict(req: PredictRequest):
-    models = list_models(out_dir=get_model_dir())
-    if req.model not in models:
-        raise HTTPException(status_code=404, detail=f"Model '{req.model}' not found")
-    model = load_model(req.model, out_dir=get_model_dir())
-    preds, proba = run_prediction(model, req.instances)
+async def predict_binary(request: Request, content_type: str) -> Response:
+    """Bulk scoring path: decode the body with np.frombuffer and answer in the same binary form."""
+    model_name = request.query_params.get("model") or request.headers.get("x-model")
+    if not model_name:
+        raise HTTPException(status_code=422, detail="Binary requests need the model in the 'model' query parameter or 'X-Model' header")
+    model = get_entry(model_name).model
+    return_proba = request.query_params.get("return_proba", "true").lower() not in ("0", "false", "no")
+    try:
+        X = decode_request(content_type, await request.body(), request.headers)
+        check_n_features(model, X)
+        preds, proba = await run_in_threadpool(predict_arrays, model, X, return_proba)
+        body, media_type, headers = encode_response(content_type, preds, proba, X.dtype)
+    except EncodingError as e:
+        raise HTTPException(status_code=415 if isinstance(e, UnsupportedEncodingError) else 422, detail=str(e))
+    headers["X-Model"] = model_name
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+@app.post(
+    f"{API_PREFIX}/predict",
+    response_model=PredictResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": PredictRequest.model_json_schema()},
+                **{ct: {"schema": {"type": "string", "format": "binary"}} for ct in BINARY_CONTENT_TYPES},
+            },
+        }
+    },
+)
+async def predict(request: Request):
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type in BINARY_CONTENT_TYPES:
+        return await predict_binary(request, content_type)
+    if content_type != "application/json":
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type!r}")
+    try:
+        req = PredictRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+    model = get_entry(req.model).model
+    X = request_features(req.instances, req.records, model)
+    if batcher.window_ms > 0:
+        preds, proba = await batcher.submit(model, X, return_proba=req.return_proba)
+    else:
+        preds, proba = await run_in_threadpool(run_prediction, model, X, req.return_proba)
     return PredictResponse(model=req.model, predictions=preds, probabilities=proba)
 
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator is still reading the request body.
+
+    Starlette's StreamingResponse watches for client disconnects by calling receive(), which would
+    swallow request body chunks meant for request.stream(). Here request.stream() already raises
+    ClientDisconnect, so the response is simply streamed.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@app.post(f"{API_PREFIX}/predict/stream")
+async def predict_stream(request: Request, model: str, format: Optional[str] = None,
+                         chunk_size: Optional[int] = None, return_proba: bool = True):
+    """
+    Score a CSV or NDJSON stream of raw flow records (same columns as data_preprocessing/input/data.csv).
+    Records are parsed and scored chunk by chunk and results are streamed back as NDJSON, one line per record.
+    """
+    model_obj = get_entry(model).model
+    transformer = get_record_transformer()
+    if format is None:
+        content_type = request.headers.get("content-type", "text/csv").split(";")[0].strip().lower()
+        format = "ndjson" if content_type in ("application/x-ndjson", "application/jsonl", "application/json") else "csv"
+    try:
+        chunker = RecordChunker(format, chunk_size or get_stream_chunk_size())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    async def results():
+        try:
+            async for line in aiter_lines(request.stream()):
+                chunk = chunker.feed(line)
+                if chunk is not None:
+                    yield await run_in_threadpool(score_chunk, model_obj, transformer, chunk, return_proba)
+            chunk = chunker.flush()
+            if chunk is not None:
+                yield await run_in_threadpool(score_chunk, model_obj, transformer, chunk, return_proba)
+        except ValueError as e:
+            # Headers are already sent, so report bad input as a final NDJSON line
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+
 @app.get(f"{API_PREFIX}/model-architecture/{{model_name}}")
 def get_model_architecture(model_name: str, top_k: int = 5):
-    models = list_models(out_dir=get_model_dir())
-    if model_name not in models:
-        raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found")
-
-    model = load_model(model_name, out_dir=get_model_dir())
+    model = get_entry(model_name).model
 
     if not hasattr(model, "coefs_"):
         raise HTTPException(status_code=400, detail=f"Model '{model_name}' has no accessible architecture")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the Backend modules the way main.py / serve.py do (run from Backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,46 @@
+import warnings
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.neural_network import MLPClassifier
+
+from utils import mlp_engine
+from utils.mlp_engine import NumpyMLP, check_parity, export_mlp
+
+
+def fit_mlp(n_classes: int, activation: str) -> tuple:
+    X, y = make_classification(n_samples=400, n_features=12, n_informative=8, n_classes=n_classes,
+                               random_state=0)
+    model = MLPClassifier(hidden_layer_sizes=(16, 8), activation=activation, max_iter=50, random_state=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        model.fit(X, y)
+    return model, X
+
+
+@pytest.mark.parametrize('activation', ['relu', 'tanh', 'logistic', 'identity'])
+@pytest.mark.parametrize('n_classes', [2, 4])
+def test_exported_mlp_matches_sklearn(tmp_path, n_classes, activation):
+    model, X = fit_mlp(n_classes, activation)
+    path = str(tmp_path / 'mlp.mlp.npz')
+    export_mlp(model, path, X_check=X)
+
+    engine = NumpyMLP.load(path)
+    assert engine.out_activation_ == ('logistic' if n_classes == 2 else 'softmax')
+    report = check_parity(model, engine, X)
+    assert report['prediction_agreement'] == 1.0
+    assert engine.predict_proba(X).shape == (len(X), n_classes)
+
+
+@pytest.mark.parametrize('n_classes', [2, 4])
+def test_large_inputs_run_in_bounded_blocks(monkeypatch, n_classes):
+    monkeypatch.setattr(mlp_engine, 'MAX_BUFFER_ROWS', 64)
+    model, X = fit_mlp(n_classes, 'relu')
+    engine = NumpyMLP.from_sklearn(model)
+    check_parity(model, engine, X)
+    assert engine._local.buffers[0].shape[0] == 64
+
+    out = np.empty((len(X), n_classes), dtype=np.float32)
+    assert engine.predict_proba(X, out=out) is out
+    np.testing.assert_allclose(out, model.predict_proba(X), rtol=1e-4, atol=1e-5)
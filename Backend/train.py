@@ -1,25 +1,48 @@
-from typing import Dict
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.neural_network import MLPClassifier
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
-from sklearn.cluster import DBSCAN
+from sklearn.model_selection import train_test_split
+from threadpoolctl import threadpool_limits
+from config import get_train_cores, get_train_workers
+from utils.dbscan_engine import DBSCANPredictor
+from utils.resampling import LAZY_ARRAYS, LazySMOTE
 
-def train_models(X_train_supervised, y_train_supervised, X_train_unsupervised, n_classes: int) -> Dict[str, object]:
-    """
-    Train models for multiclass classification
-    Uses SMOTE data for supervised models and unsmote data for unsupervised models
-    """
-    models = {
-        'random_forest': RandomForestClassifier(
-            n_estimators=200, 
-            random_state=42, 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODEL_NAMES = ['random_forest', 'mlp', 'kmeans', 'minibatch_kmeans', 'dbscan']
+UNSUPERVISED_MODELS = {'kmeans', 'minibatch_kmeans', 'dbscan'}
+# Fitted with partial_fit over row chunks of the training data (see fit_in_chunks)
+INCREMENTAL_MODELS = {'minibatch_kmeans'}
+MAX_CHUNK_EPOCHS = 100
+TRAIN_LOG_PATH = 'cache/train_runs.json'
+
+
+def build_model(name: str, n_classes: int) -> object:
+    """Unfitted estimator for one of MODEL_NAMES"""
+    if name == 'random_forest':
+        return RandomForestClassifier(
+            n_estimators=200,
+            random_state=42,
             n_jobs=-1,
             class_weight='balanced'  # Handle class imbalance
-        ),
-        'mlp': MLPClassifier(
+        )
+    if name == 'mlp':
+        return MLPClassifier(
             hidden_layer_sizes=(100, 100),
             solver='adam',
             learning_rate_init=1e-3,
@@ -28,19 +51,232 @@ def train_models(X_train_supervised, y_train_supervised, X_train_unsupervised, n
             n_iter_no_change=10,
             tol=1e-4,
             random_state=42
-        ),
+        )
+    if name == 'kmeans':
         # Baseline KMeans with k = num classes (e.g., 8 traffic types → k=8)
-        'kmeans': KMeans(n_clusters=n_classes, random_state=42, n_init=20),
-        'dbscan': DBSCAN(eps=0.5, min_samples=5),
+        return KMeans(n_clusters=n_classes, random_state=42, n_init=20)
+    if name == 'minibatch_kmeans':
+        # Same k, trained chunk by chunk and updatable online (POST /api/v1/models/minibatch_kmeans/partial_fit)
+        return MiniBatchKMeans(n_clusters=n_classes, random_state=42, batch_size=1024)
+    if name == 'dbscan':
+        # DBSCAN that keeps an index of its core samples so new points can be assigned without refitting
+        return DBSCANPredictor(eps=0.5, min_samples=5)
+    raise ValueError(f"Unknown model: {name}")
+
+
+def training_array_names(name: str, lazy_smote: bool = False) -> Tuple[str, ...]:
+    """Arrays of the processed dataset a model is fitted on"""
+    if name in UNSUPERVISED_MODELS:
+        return ('X_train_unSMOTE',)
+    return LAZY_ARRAYS if lazy_smote else ('X_train', 'y_train')
+
+
+def training_data(name: str, X_train_supervised, y_train_supervised, X_train_unsupervised) -> Tuple[object, Optional[object]]:
+    """
+    (X, y) a model is fitted on: unsmote data for clustering, SMOTE data for classifiers
+    (a LazySMOTE training set with y None when the dataset was saved with --smote-lazy)
+    """
+    if name in UNSUPERVISED_MODELS:
+        return X_train_unsupervised, None
+    return X_train_supervised, y_train_supervised
+
+
+def fit_on_batches(model, data: LazySMOTE):
+    """
+    Fit an incremental estimator (partial_fit) on a lazily oversampled training set, with fresh
+    synthetic rows in every batch. Follows MLPClassifier's stopping rule: with early_stopping a
+    stratified validation_fraction of the real rows is held out and scored after every epoch,
+    otherwise the mean training loss is tracked; training stops after n_iter_no_change epochs
+    without a `tol` improvement and the best weights are kept.
+    """
+    params = model.get_params()
+    batch_size = 200 if params.get('batch_size', 'auto') == 'auto' else params['batch_size']
+    rows = np.arange(len(data.y))
+    early_stopping = params.get('early_stopping', False)
+    if early_stopping:
+        # partial_fit rejects early_stopping=True; the held-out scoring below replaces it
+        model.set_params(early_stopping=False)
+        rows, val_rows = train_test_split(rows, test_size=params['validation_fraction'], stratify=data.y,
+                                          random_state=params.get('random_state'))
+        val_rows = np.sort(val_rows)
+        X_val, y_val = np.asarray(data.X[val_rows]), data.y[val_rows]
+
+    best_score, best_weights, no_improvement = -np.inf, None, 0
+    for epoch in range(params.get('max_iter', 200)):
+        losses = []
+        for X_batch, y_batch in data.iter_batches(batch_size, epoch=epoch, real_rows=rows):
+            model.partial_fit(X_batch, y_batch, classes=data.sampler.classes_)
+            losses.append(model.loss_)
+        score = model.score(X_val, y_val) if early_stopping else -float(np.mean(losses))
+        if score > best_score + params.get('tol', 1e-4):
+            best_score, no_improvement = score, 0
+            best_weights = ([c.copy() for c in model.coefs_], [b.copy() for b in model.intercepts_])
+        else:
+            no_improvement += 1
+            if no_improvement >= params.get('n_iter_no_change', 10):
+                break
+    if best_weights is not None:
+        model.coefs_, model.intercepts_ = best_weights
+    model.set_params(early_stopping=early_stopping)
+    return model
+
+
+def fit_in_chunks(model, X, chunk_rows: Optional[int] = None, max_epochs: int = MAX_CHUNK_EPOCHS, tol: float = 1e-3):
+    """
+    Fit an incremental clusterer with partial_fit over row chunks of X (e.g. a memory-mapped array),
+    so only one chunk is in memory at a time. Chunks (default: the model's batch_size rows) are visited
+    in a new order every epoch; training stops once an epoch moves the centers by less than `tol`
+    relative to their norm. inertia_ is then computed over the chunks, as fit() would.
+    """
+    chunk_rows = chunk_rows or model.get_params().get('batch_size', 1024)
+    starts = np.arange(0, X.shape[0], chunk_rows)
+    rng = np.random.default_rng(model.get_params().get('random_state'))
+    previous = None
+    for epoch in range(max_epochs):
+        # The first chunk initializes the centers, so it stays first in the first epoch
+        order = starts if epoch == 0 else rng.permutation(starts)
+        for start in order:
+            model.partial_fit(np.asarray(X[start:start + chunk_rows]))
+        centers = model.cluster_centers_.copy()
+        if previous is not None and np.linalg.norm(centers - previous) <= tol * np.linalg.norm(previous):
+            break
+        previous = centers
+    model.inertia_ = float(sum(-model.score(np.asarray(X[start:start + chunk_rows])) for start in starts))
+    return model
+
+
+def _reset_peak_rss() -> None:
+    """
+    Reset this process's RSS high-water mark (Linux, /proc/self/clear_refs). Spawned workers
+    otherwise report the parent's peak: ru_maxrss is carried across fork + exec.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass  # no /proc (or kernel < 4.0): the peak then includes whatever ran before the fit
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak RSS of this process: VmHWM from /proc/self/status, ru_maxrss where there is no /proc"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024  # kB
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _fit_job(name: str, n_classes: int, n_jobs: int, X, y) -> Tuple[object, Dict[str, object]]:
+    """Runs in a fresh worker process: fit one model within its core budget and measure the fit."""
+    model = build_model(name, n_classes)
+    # Fit within the job's core budget, but keep the configured n_jobs on the saved model for inference
+    params = model.get_params()
+    if 'n_jobs' in params:
+        model.set_params(n_jobs=n_jobs)
+    # The peak then covers this fit only (the training arrays it was handed are already resident)
+    _reset_peak_rss()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()  # all threads of this process (joblib threads, BLAS, OpenMP)
+    # BLAS / OpenMP pools (MLP matmuls, KMeans) are capped as well, not only estimator n_jobs
+    with threadpool_limits(limits=n_jobs):
+        if isinstance(X, LazySMOTE):
+            # Incremental learners never see the whole oversampled set; the others need it in memory
+            if hasattr(model, 'partial_fit'):
+                fit_on_batches(model, X)
+            else:
+                model.fit(*X.materialize())
+        elif name in INCREMENTAL_MODELS:
+            fit_in_chunks(model, X)
+        elif y is None:
+            model.fit(X)
+        else:
+            model.fit(X, y)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    if 'n_jobs' in params:
+        model.set_params(n_jobs=params['n_jobs'])
+    peak_rss_mb = _peak_rss_mb()
+    return model, {
+        'wall_time_s': round(wall, 3),
+        'cpu_time_s': round(cpu, 3),
+        'n_jobs': n_jobs,
+        # Fraction of the job's core budget kept busy during the fit
+        'cpu_utilisation': round(cpu / (wall * n_jobs), 3) if wall > 0 else None,
+        'peak_rss_mb': None if peak_rss_mb is None else round(peak_rss_mb, 1),
+        'n_samples': int(X.shape[0]),
     }
 
-    for name, model in models.items():
-        print(f"Training {name}...")
-        if name == 'kmeans' or name == 'dbscan':  # Unsupervised: clustering - use unsmote data
-            print(f"  Using unsmote data: {X_train_unsupervised.size} samples")
-            model.fit(X_train_unsupervised)
-        else:  # Supervised: classification - use SMOTE data
-            print(f"  Using SMOTE data: {X_train_supervised.size} samples")
-            model.fit(X_train_supervised, y_train_supervised)
 
+def _append_run_log(log_path: str, run: Dict[str, object]) -> None:
+    runs: List[Dict[str, object]] = []
+    if os.path.exists(log_path):
+        try:
+            with open(log_path, 'r', encoding='utf-8') as f:
+                runs = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            runs = []
+    runs.append(run)
+    os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+    with open(log_path, 'w', encoding='utf-8') as f:
+        json.dump(runs, f, indent=2)
+
+
+def train_models(X_train_supervised, y_train_supervised, X_train_unsupervised, n_classes: int,
+                 names: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                 cores: Optional[int] = None, log_path: Optional[str] = TRAIN_LOG_PATH) -> Dict[str, object]:
+    """
+    Train models for multiclass classification
+    Uses SMOTE data for supervised models and unsmote data for unsupervised models
+
+    Only `names` (default: all of MODEL_NAMES) are trained. Independent fits run concurrently in a
+    process pool (TRAIN_WORKERS); the core budget (TRAIN_CORES) is split evenly between them so
+    e.g. the forest's n_jobs no longer takes every core. Each fit runs in its own process, so its
+    wall time, CPU time and peak RSS are measured in isolation and appended to `log_path`.
+    """
+    names = list(MODEL_NAMES if names is None else names)
+    if not names:
+        return {}
+    cores = max(1, cores or get_train_cores())
+    workers = max_workers or get_train_workers() or len(names)
+    workers = max(1, min(workers, len(names), cores))
+    n_jobs = max(1, cores // workers)
+    print(f"Training {names} with {workers} worker(s), {n_jobs} core(s) each")
+
+    run_start = time.perf_counter()
+    started_at = datetime.now(timezone.utc).isoformat()
+    futures = {}
+    # spawn + one task per child: every fit starts from a clean process (no forked BLAS state)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             max_tasks_per_child=1) as pool:
+        for name in names:
+            X, y = training_data(name, X_train_supervised, y_train_supervised, X_train_unsupervised)
+            kind = 'unsmote' if name in UNSUPERVISED_MODELS else 'lazy SMOTE' if isinstance(X, LazySMOTE) else 'SMOTE'
+            print(f"  {name}: using {kind} data: {X.size} samples")
+            futures[name] = pool.submit(_fit_job, name, n_classes, n_jobs, X, y)
+
+        models: Dict[str, object] = {}
+        stats: Dict[str, Dict[str, object]] = {}
+        for name in names:
+            models[name], stats[name] = futures[name].result()
+            s = stats[name]
+            rss = f"{s['peak_rss_mb']:.0f} MB" if s['peak_rss_mb'] is not None else "n/a"
+            print(f"Trained {name}: {s['wall_time_s']:.1f}s wall, {s['cpu_utilisation']:.0%} of {n_jobs} core(s), peak RSS {rss}")
+
+    wall = time.perf_counter() - run_start
+    print(f"Training finished in {wall:.1f}s")
+    if log_path:
+        _append_run_log(log_path, {
+            'started_at': started_at,
+            'wall_time_s': round(wall, 3),
+            'cores': cores,
+            'workers': workers,
+            'models': stats,
+        })
     return models
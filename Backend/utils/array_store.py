@@ -0,0 +1,75 @@
+"""
+Single-file flat layout for a set of named NumPy arrays that can be memory-mapped.
+
+    b'FLATARR1' | uint64 header length | JSON header | padding | array data (each 64-byte aligned)
+
+The header records dtype, shape and byte offset of every array plus free-form metadata. Loading
+with mmap=True maps the file read-only and returns zero-copy views, so every process serving the
+same file shares one page-cache copy instead of holding a private heap copy.
+"""
+import json
+import os
+import struct
+from typing import Dict, Tuple
+import numpy as np
+
+_MAGIC = b'FLATARR1'
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def save_flat_arrays(path: str, arrays: Dict[str, np.ndarray], meta: Dict[str, object] = None) -> None:
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+    for name, arr in arrays.items():
+        if arr.dtype.hasobject:
+            raise ValueError(f"Array '{name}' has an object dtype and cannot be stored flat")
+
+    # Offsets depend on the header length, which depends on the offsets: size the header with
+    # placeholder offsets and reserve room for the real ones (at most 20 digits each)
+    entries = {name: {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': 0} for name, arr in arrays.items()}
+    header = {'arrays': entries, 'meta': meta or {}}
+    header_len = len(json.dumps(header).encode()) + 32 * len(arrays) + 64
+    offset = _aligned(len(_MAGIC) + 8 + header_len)
+    for name, arr in arrays.items():
+        entries[name]['offset'] = offset
+        offset = _aligned(offset + arr.nbytes)
+    header_bytes = json.dumps(header).encode()
+    if len(header_bytes) > header_len:
+        raise ValueError("Flat array header does not fit its reserved size")
+    header_bytes = header_bytes.ljust(header_len)
+
+    # Write then rename so a running server never maps a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(struct.pack('<Q', header_len))
+        f.write(header_bytes)
+        for name, arr in arrays.items():
+            f.seek(entries[name]['offset'])
+            f.write(arr.tobytes(order='C'))
+        f.truncate(offset)
+    os.replace(tmp_path, path)
+
+
+def load_flat_arrays(path: str, mmap: bool = True) -> Tuple[Dict[str, np.ndarray], Dict[str, object]]:
+    """Returns (arrays, meta). With mmap=True the arrays are read-only views of the mapped file."""
+    with open(path, 'rb') as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a flat array file")
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len).decode())
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        dtype = np.dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        start = entry['offset']
+        arrays[name] = buffer[start:start + nbytes].view(dtype).reshape(shape)
+    return arrays, header['meta']
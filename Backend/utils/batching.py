@@ -0,0 +1,129 @@
+import asyncio
+import bisect
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+from utils.predict import predict_arrays, to_response_lists
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style): counts[i] is the number of observations <= bounds[i]."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self._counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative, running = {}, 0
+        for bound, count in zip(self.bounds + [float('inf')], counts):
+            running += count
+            cumulative['+Inf' if bound == float('inf') else str(bound)] = running
+        return {'count': running, 'sum': total, 'buckets': cumulative}
+
+
+class _Pending:
+    __slots__ = ('X', 'return_proba', 'future', 'enqueued_at')
+
+    def __init__(self, X: np.ndarray, return_proba: bool, future: asyncio.Future, enqueued_at: float):
+        self.X = X
+        self.return_proba = return_proba
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+def _run_batch(model: object, pending: List[_Pending]) -> List[Tuple[List[int], Optional[List[List[float]]]]]:
+    """Score the stacked rows once, then split and convert per caller (only building proba lists where asked)."""
+    X = pending[0].X if len(pending) == 1 else np.vstack([item.X for item in pending])
+    preds, proba = predict_arrays(model, X, return_proba=any(item.return_proba for item in pending))
+    results = []
+    offset = 0
+    for item in pending:
+        end = offset + item.X.shape[0]
+        item_proba = proba[offset:end] if (proba is not None and item.return_proba) else None
+        results.append(to_response_lists(preds[offset:end], item_proba))
+        offset = end
+    return results
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests for the same model and runs them as one vectorized call.
+
+    A batch is flushed when `window_ms` has passed since its first request or when it holds
+    `max_rows` rows, whichever comes first. Each caller gets back only its own rows.
+    """
+
+    def __init__(self, window_ms: float = 2.0, max_rows: int = 256):
+        self.window_ms = window_ms
+        self.max_rows = max_rows
+        self._queues: Dict[Hashable, List[_Pending]] = {}
+        self._rows: Dict[Hashable, int] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self.batch_rows = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096])
+        self.batch_requests = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256])
+        self.queue_wait_ms = Histogram([0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250])
+
+    async def submit(self, model: object, X: np.ndarray,
+                     return_proba: bool = True) -> Tuple[List[int], Optional[List[List[float]]]]:
+        loop = asyncio.get_running_loop()
+        # Keyed on the model object itself so a hot-reloaded model never shares a batch with its predecessor
+        key = (id(model), X.shape[1])
+        future = loop.create_future()
+        self._queues.setdefault(key, []).append(_Pending(X, return_proba, future, time.perf_counter()))
+        self._rows[key] = self._rows.get(key, 0) + X.shape[0]
+
+        if self._rows[key] >= self.max_rows:
+            self._flush(key, model)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window_ms / 1000.0, self._flush, key, model)
+        return await future
+
+    def _flush(self, key: Hashable, model: object) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._queues.pop(key, [])
+        self._rows.pop(key, None)
+        if pending:
+            asyncio.get_running_loop().create_task(self._run(model, pending))
+
+    async def _run(self, model: object, pending: List[_Pending]) -> None:
+        started = time.perf_counter()
+        for item in pending:
+            self.queue_wait_ms.observe((started - item.enqueued_at) * 1000.0)
+        self.batch_rows.observe(sum(item.X.shape[0] for item in pending))
+        self.batch_requests.observe(len(pending))
+
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(None, _run_batch, model, pending)
+        except Exception as e:
+            for item in pending:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        for item, result in zip(pending, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'window_ms': self.window_ms,
+            'max_rows': self.max_rows,
+            'batch_rows': self.batch_rows.snapshot(),
+            'batch_requests': self.batch_requests.snapshot(),
+            'queue_wait_ms': self.queue_wait_ms.snapshot(),
+        }
@@ -0,0 +1,127 @@
+"""
+On-disk format of the processed dataset written by data_preprocessing/data_cleaning.py.
+
+Each array is a separate uncompressed `.npy` file in one directory, next to a `manifest.json`
+recording shape, dtype and a content digest per array:
+
+    data_preprocessing/output/processed_data/
+        manifest.json  X_train.npy  X_test.npy  X_train_unSMOTE.npy  y_train.npy  y_test.npy
+
+A dataset saved with --smote-lazy has y_train_unSMOTE.npy, smote_neighbors.npy and
+smote_synthetic_counts.npy instead of X_train.npy / y_train.npy (see utils/resampling.py).
+
+Arrays are memory-mapped on first access, so a stage only reads the arrays (and pages) it uses,
+and nothing is ever unpickled. The manifest digests let callers key caches on the data without
+reading it. The legacy `processed_data.npz` is still readable (eagerly, without pickle).
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional
+import numpy as np
+
+MANIFEST = 'manifest.json'
+
+
+def array_digest(arr: np.ndarray, chunk_rows: int = 65536) -> str:
+    """blake2b of shape, dtype and contents; hashed in row chunks so memory-mapped arrays are not loaded at once."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{arr.shape}|{arr.dtype.str}|".encode())
+    if arr.ndim == 0:
+        h.update(np.ascontiguousarray(arr).tobytes())
+    for start in range(0, len(arr) if arr.ndim else 0, chunk_rows):
+        h.update(np.ascontiguousarray(arr[start:start + chunk_rows]).tobytes())
+    return h.hexdigest()
+
+
+def save_dataset(out_dir: str, arrays: Dict[str, np.ndarray]) -> str:
+    """Write every array as {out_dir}/{name}.npy plus the manifest; returns the manifest path."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, arr in arrays.items():
+        arr = np.asarray(arr)
+        if arr.dtype.hasobject:
+            raise ValueError(f"Array '{name}' has an object dtype; the dataset format does not store pickles")
+        path = os.path.join(out_dir, f"{name}.npy")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, arr, allow_pickle=False)
+        os.replace(tmp_path, path)
+    return write_manifest(out_dir, list(arrays))
+
+
+def write_manifest(out_dir: str, names: Iterable[str]) -> str:
+    """
+    (Re)write the manifest for {out_dir}/{name}.npy files that are already on disk, e.g. arrays
+    filled in place through np.lib.format.open_memmap. Returns the manifest path.
+    """
+    entries = {}
+    for name in names:
+        arr = np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+        entries[name] = {'file': f"{name}.npy", 'shape': list(arr.shape), 'dtype': arr.dtype.str,
+                         'digest': array_digest(arr)}
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    # The manifest is written last: a dataset is only complete once it exists
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'arrays': entries}, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+
+class Dataset:
+    """Read-only mapping of array name -> array, loaded lazily (memory-mapped for the .npy format)."""
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.mmap = mmap
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._digests: Dict[str, str] = {}
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.isdir(path) and os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)['arrays']
+            self._npz = None
+        else:
+            legacy = path if path.endswith('.npz') else f"{path}.npz"
+            if not os.path.exists(legacy):
+                raise FileNotFoundError(f"No processed dataset at {path} (run data_preprocessing/data_cleaning.py)")
+            self._npz = legacy
+            with np.load(legacy, allow_pickle=False) as data:
+                self._entries = {name: {} for name in data.files}
+
+    def keys(self) -> Iterable[str]:
+        return self._entries.keys()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._entries:
+            raise KeyError(f"Dataset {self.path} has no array '{name}' (available: {list(self._entries)})")
+        if name not in self._arrays:
+            if self._npz is not None:
+                with np.load(self._npz, allow_pickle=False) as data:
+                    self._arrays[name] = data[name]
+            else:
+                path = os.path.join(self.path, self._entries[name]['file'])
+                self._arrays[name] = np.load(path, mmap_mode='r' if self.mmap else None, allow_pickle=False)
+        return self._arrays[name]
+
+    def digest(self, name: str) -> str:
+        """Content digest from the manifest (computed from the data for the legacy .npz)."""
+        digest: Optional[str] = self._entries.get(name, {}).get('digest')
+        if digest is None:
+            if name not in self._digests:
+                self._digests[name] = array_digest(self[name])
+            digest = self._digests[name]
+        return digest
+
+    def verify(self) -> None:
+        """Re-hash every array against the manifest; raises ValueError on a mismatch."""
+        for name, entry in self._entries.items():
+            if 'digest' in entry and array_digest(self[name]) != entry['digest']:
+                raise ValueError(f"Array '{name}' in {self.path} does not match its manifest digest")
+
+
+def load_dataset(path: str, mmap: bool = True) -> Dataset:
+    return Dataset(path, mmap=mmap)
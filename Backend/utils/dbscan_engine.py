@@ -0,0 +1,59 @@
+from typing import Optional
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import NearestNeighbors
+
+
+class DBSCANPredictor(DBSCAN):
+    """
+    DBSCAN that can assign new points to the clusters it found during fit.
+
+    The fitted core samples are indexed once (KD-tree / ball tree, picked by NearestNeighbors
+    the same way DBSCAN picks its own index). A new point joins the cluster of its nearest core
+    sample if that sample is within `eps` (the same reachability rule DBSCAN uses for border
+    points) and is noise (-1) otherwise. The training run is therefore reused instead of
+    re-clustering every evaluation set with fit_predict.
+    """
+
+    def fit(self, X, y=None, sample_weight=None):
+        super().fit(X, y=y, sample_weight=sample_weight)
+        self._build_index()
+        return self
+
+    @classmethod
+    def from_dbscan(cls, model: DBSCAN) -> 'DBSCANPredictor':
+        """Wrap an already fitted DBSCAN (e.g. an older cached model) without refitting it."""
+        predictor = cls(**model.get_params())
+        for attr in ('core_sample_indices_', 'components_', 'labels_', 'n_features_in_', 'feature_names_in_'):
+            if hasattr(model, attr):
+                setattr(predictor, attr, getattr(model, attr))
+        predictor._build_index()
+        return predictor
+
+    def _build_index(self) -> None:
+        self.core_labels_ = self.labels_[self.core_sample_indices_]
+        self.core_index_: Optional[NearestNeighbors] = None
+        if len(self.components_):
+            self.core_index_ = NearestNeighbors(
+                n_neighbors=1, algorithm=self.algorithm, leaf_size=self.leaf_size, metric=self.metric,
+                metric_params=self.metric_params, p=self.p, n_jobs=self.n_jobs,
+            ).fit(self.components_)
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but DBSCAN is expecting {self.n_features_in_} features as input.")
+        labels = np.full(X.shape[0], -1, dtype=self.labels_.dtype)
+        if self.core_index_ is None or X.shape[0] == 0:
+            return labels
+        distances, nearest = self.core_index_.kneighbors(X, n_neighbors=1)
+        within = distances[:, 0] <= self.eps
+        labels[within] = self.core_labels_[nearest[within, 0]]
+        return labels
+
+
+def as_dbscan_predictor(model: object) -> object:
+    """Return a DBSCANPredictor for a plain fitted DBSCAN; any other model is returned unchanged."""
+    if isinstance(model, DBSCAN) and not isinstance(model, DBSCANPredictor) and hasattr(model, 'core_sample_indices_'):
+        return DBSCANPredictor.from_dbscan(model)
+    return model
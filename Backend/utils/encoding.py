@@ -0,0 +1,151 @@
+"""
+Binary request/response encodings for /predict.
+
+Supported content types:
+  - application/octet-stream: raw little-endian float32/float64 row-major matrix.
+    Shape and dtype come from the `X-Shape: <rows>,<cols>` and `X-Dtype: float32|float64` headers.
+    The response body is the int64 predictions followed by the probability matrix
+    (in the request dtype), described by X-Predictions-* / X-Probabilities-* headers.
+  - application/x-npy: a single 2-D `.npy` array. The response is an uncompressed `.npz`
+    holding `predictions` and (optionally) `probabilities`.
+  - application/vnd.apache.arrow.stream: Arrow IPC stream with one numeric column per feature.
+    The response is an Arrow IPC stream with a `prediction` column and `proba_<i>` columns.
+    Requires the optional `pyarrow` package.
+
+Decoding of the raw and `.npy` formats is zero-copy (np.frombuffer over the request body).
+"""
+import io
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+RAW_CONTENT_TYPE = 'application/octet-stream'
+NPY_CONTENT_TYPE = 'application/x-npy'
+NPZ_CONTENT_TYPE = 'application/x-npz'
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+BINARY_CONTENT_TYPES = (RAW_CONTENT_TYPE, NPY_CONTENT_TYPE, ARROW_CONTENT_TYPE)
+
+_RAW_DTYPES = {'float32': np.dtype('<f4'), 'float64': np.dtype('<f8')}
+
+
+class EncodingError(ValueError):
+    """Raised when a binary request body cannot be decoded."""
+
+
+class UnsupportedEncodingError(EncodingError):
+    """Raised for content types this server cannot handle (unknown, or missing optional dependency)."""
+
+
+def _parse_shape(value: Optional[str]) -> Tuple[int, int]:
+    if not value:
+        raise EncodingError("Missing 'X-Shape' header (expected '<rows>,<cols>')")
+    try:
+        rows, cols = (int(part) for part in value.split(','))
+    except ValueError:
+        raise EncodingError(f"Invalid 'X-Shape' header: {value!r} (expected '<rows>,<cols>')")
+    if rows <= 0 or cols <= 0:
+        raise EncodingError(f"Invalid 'X-Shape' header: {value!r}")
+    return rows, cols
+
+
+def decode_raw(body: bytes, shape_header: Optional[str], dtype_header: Optional[str]) -> np.ndarray:
+    dtype_name = (dtype_header or 'float64').lower()
+    if dtype_name not in _RAW_DTYPES:
+        raise EncodingError(f"Unsupported 'X-Dtype': {dtype_header!r} (expected float32 or float64)")
+    dtype = _RAW_DTYPES[dtype_name]
+    rows, cols = _parse_shape(shape_header)
+    if len(body) != rows * cols * dtype.itemsize:
+        raise EncodingError(f"Body has {len(body)} bytes, expected {rows * cols * dtype.itemsize} for shape ({rows}, {cols}) {dtype_name}")
+    return np.frombuffer(body, dtype=dtype).reshape(rows, cols)
+
+
+def decode_npy(body: bytes) -> np.ndarray:
+    fp = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(fp)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+    except ValueError as e:
+        raise EncodingError(f"Invalid .npy payload: {e}")
+    if dtype.hasobject or dtype.kind not in 'fiu':
+        raise EncodingError(f"Unsupported .npy dtype: {dtype}")
+    if len(shape) != 2:
+        raise EncodingError(f".npy array must be 2-D, got shape {shape}")
+    count = int(np.prod(shape))
+    if len(body) - fp.tell() != count * dtype.itemsize:
+        raise EncodingError(".npy payload is truncated")
+    X = np.frombuffer(body, dtype=dtype, count=count, offset=fp.tell())
+    return X.reshape(shape, order='F' if fortran_order else 'C')
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.ipc  # type: ignore  # noqa: F401
+    except ImportError:
+        raise UnsupportedEncodingError(f"'{ARROW_CONTENT_TYPE}' requires the optional 'pyarrow' package")
+    return pa
+
+
+def decode_arrow(body: bytes) -> np.ndarray:
+    pa = _import_pyarrow()
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise EncodingError(f"Invalid Arrow IPC stream: {e}")
+    if table.num_columns == 0 or table.num_rows == 0:
+        raise EncodingError("Arrow table has no rows or columns")
+    # Columns are zero-copy views; stacking them into a row-major matrix is the one copy
+    return np.column_stack([column.to_numpy() for column in table.columns]).astype(float, copy=False)
+
+
+def decode_request(content_type: str, body: bytes, headers: Dict[str, str]) -> np.ndarray:
+    """Decode a binary /predict body into a 2-D feature matrix."""
+    if content_type == RAW_CONTENT_TYPE:
+        return decode_raw(body, headers.get('x-shape'), headers.get('x-dtype'))
+    if content_type == NPY_CONTENT_TYPE:
+        return decode_npy(body)
+    if content_type == ARROW_CONTENT_TYPE:
+        return decode_arrow(body)
+    raise UnsupportedEncodingError(f"Unsupported content type: {content_type!r}")
+
+
+def encode_response(content_type: str, preds: np.ndarray, proba: Optional[np.ndarray],
+                    input_dtype: np.dtype) -> Tuple[bytes, str, Dict[str, str]]:
+    """Encode predictions in the same binary form as the request. Returns (body, media_type, headers)."""
+    preds = np.ascontiguousarray(preds, dtype='<i8')
+    if proba is not None:
+        out_dtype = _RAW_DTYPES['float32'] if input_dtype == np.float32 else _RAW_DTYPES['float64']
+        proba = np.ascontiguousarray(proba, dtype=out_dtype)
+
+    if content_type == RAW_CONTENT_TYPE:
+        headers = {'X-Predictions-Shape': str(preds.shape[0]), 'X-Predictions-Dtype': 'int64'}
+        body = preds.tobytes()
+        if proba is not None:
+            headers['X-Probabilities-Shape'] = f'{proba.shape[0]},{proba.shape[1]}'
+            headers['X-Probabilities-Dtype'] = proba.dtype.name
+            body += proba.tobytes()
+        return body, RAW_CONTENT_TYPE, headers
+
+    if content_type == NPY_CONTENT_TYPE:
+        buf = io.BytesIO()
+        arrays = {'predictions': preds}
+        if proba is not None:
+            arrays['probabilities'] = proba
+        np.savez(buf, **arrays)
+        return buf.getvalue(), NPZ_CONTENT_TYPE, {}
+
+    if content_type == ARROW_CONTENT_TYPE:
+        pa = _import_pyarrow()
+        columns = {'prediction': pa.array(preds)}
+        if proba is not None:
+            for i in range(proba.shape[1]):
+                columns[f'proba_{i}'] = pa.array(proba[:, i])
+        table = pa.table(columns)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), ARROW_CONTENT_TYPE, {}
+
+    raise UnsupportedEncodingError(f"Unsupported content type: {content_type!r}")
@@ -0,0 +1,89 @@
+"""
+Alternative inference engines that a served model can be converted to after loading.
+
+Select them per model with MODEL_ENGINES, e.g. MODEL_ENGINES="random_forest=compiled_forest".
+Every engine exposes the same predict / predict_proba / classes_ surface the prediction code uses.
+
+Some engines also have an exported artifact format (e.g. `mlp.mlp.npz` next to `mlp.joblib`).
+When one exists it is loaded directly, without unpickling the sklearn model: by default for the
+engines marked as served by default, otherwise when MODEL_ENGINES selects that engine.
+"""
+import os
+from typing import Callable, Dict, Optional, Tuple
+
+
+def _sklearn(model):
+    return model
+
+
+def _compiled_forest(model):
+    from utils.forest_engine import CompiledForest
+    return CompiledForest.from_sklearn(model)
+
+
+def _numpy_mlp(model):
+    from utils.mlp_engine import NumpyMLP
+    return NumpyMLP.from_sklearn(model)
+
+
+def _load_numpy_mlp(path: str):
+    from utils.mlp_engine import NumpyMLP
+    return NumpyMLP.load(path)
+
+
+def _load_compiled_forest(path: str):
+    from utils.forest_engine import CompiledForest
+    return CompiledForest.load(path, mmap=True)
+
+
+ENGINES: Dict[str, Callable[[object], object]] = {
+    'sklearn': _sklearn,
+    'compiled_forest': _compiled_forest,
+    'numpy_mlp': _numpy_mlp,
+}
+
+# engine -> (artifact file suffix, loader, served without MODEL_ENGINES selecting it)
+ARTIFACTS: Dict[str, Tuple[str, Callable[[str], object], bool]] = {
+    'numpy_mlp': ('.mlp.npz', _load_numpy_mlp, True),
+    # Memory-mapped, so all workers share one copy; opt-in because sklearn is faster on very large batches
+    'compiled_forest': ('.forest.flat', _load_compiled_forest, False),
+}
+
+
+def build_engine(model: object, engine: str) -> object:
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine '{engine}' (available: {sorted(ENGINES)})")
+    return ENGINES[engine](model)
+
+
+def artifact_path(out_dir: str, name: str, engine: str) -> str:
+    return os.path.join(out_dir, f"{name}{ARTIFACTS[engine][0]}")
+
+
+def list_artifacts(out_dir: str) -> Dict[str, Dict[str, str]]:
+    """{model_name: {engine: path}} for every exported artifact in out_dir."""
+    found: Dict[str, Dict[str, str]] = {}
+    if not os.path.exists(out_dir):
+        return found
+    for fname in os.listdir(out_dir):
+        for engine, (suffix, _, _) in ARTIFACTS.items():
+            if fname.endswith(suffix):
+                found.setdefault(fname[:-len(suffix)], {})[engine] = os.path.join(out_dir, fname)
+    return found
+
+
+def find_artifact(artifacts: Dict[str, str], engine: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Pick the exported artifact to serve a model from: the one for the configured engine, or a
+    served-by-default artifact when no engine is configured. Returns (engine, path) or None.
+    """
+    if engine is not None:
+        return (engine, artifacts[engine]) if engine in artifacts else None
+    for candidate, path in sorted(artifacts.items()):
+        if ARTIFACTS[candidate][2]:
+            return candidate, path
+    return None
+
+
+def load_artifact(path: str, engine: str) -> object:
+    return ARTIFACTS[engine][1](path)
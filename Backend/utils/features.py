@@ -0,0 +1,180 @@
+import pickle
+from typing import Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+
+def load_feature_metadata(pickle_path: str) -> Optional[Dict[str, object]]:
+    try:
+        with open(pickle_path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class RecordTransformer:
+    """
+    Turns raw flow records (same columns as data_preprocessing/input/data.csv) into the
+    model's feature space: round -> fitted ColumnTransformer -> top-k feature selection.
+    Extra columns (Flow ID, IPs, labels, dropped correlated features, ...) are ignored.
+    """
+
+    def __init__(self, metadata: Dict[str, object]):
+        if 'preprocessor' not in metadata or 'top_feature_indices' not in metadata:
+            raise ValueError("Feature metadata has no fitted preprocessor. Re-run data_preprocessing/data_cleaning.py")
+        self.preprocessor = metadata['preprocessor']
+        self.top_feature_indices = np.asarray(metadata['top_feature_indices'], dtype=int)
+        self.round_decimals = metadata.get('round_decimals', 3)
+        self.columns: List[str] = list(self.preprocessor.feature_names_in_)
+        self.feature_names: List[str] = list(metadata.get('feature_names', []))
+
+    def transform(self, records: pd.DataFrame) -> np.ndarray:
+        missing = [c for c in self.columns if c not in records.columns]
+        if missing:
+            raise ValueError(f"Records are missing {len(missing)} required column(s): {missing[:5]}")
+        X = records[self.columns]
+        if self.round_decimals is not None:
+            X = X.round(self.round_decimals)
+        return self.preprocessor.transform(X)[:, self.top_feature_indices]
+
+
+def _compile_column_transformer(preprocessor, top_feature_indices: np.ndarray) -> Dict[str, list]:
+    """
+    Trace each selected output feature of a fitted ColumnTransformer back to its raw input column
+    and collect the constants applied to it (impute fill, scaler mean/scale, one-hot category).
+    Supports pipelines built from SimpleImputer, VarianceThreshold, StandardScaler and OneHotEncoder
+    (what data_cleaning.py uses); raises ValueError for anything else so callers can fall back to
+    the sklearn transform.
+    """
+    outputs: List[Dict[str, object]] = []
+    for _, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) or len(columns) == 0:
+            if transformer == 'passthrough' and len(columns) > 0:
+                raise ValueError("passthrough columns are not supported")
+            continue
+        steps = [step for _, step in transformer.steps] if hasattr(transformer, 'steps') else [transformer]
+        # One dict per feature currently flowing through the pipeline
+        features = [{'column': col, 'fill': np.nan, 'mean': 0.0, 'scale': 1.0, 'category': None} for col in columns]
+        for step in steps:
+            kind = type(step).__name__
+            if kind == 'SimpleImputer':
+                if step.add_indicator:
+                    raise ValueError("SimpleImputer(add_indicator=True) is not supported")
+                kept = []
+                for feature, stat in zip(features, step.statistics_):
+                    # All-missing columns are dropped by the imputer unless keep_empty_features is set
+                    if isinstance(stat, float) and np.isnan(stat) and not step.keep_empty_features:
+                        continue
+                    kept.append(dict(feature, fill=stat))
+                features = kept
+            elif kind == 'VarianceThreshold':
+                features = [f for f, keep in zip(features, step.get_support()) if keep]
+            elif kind == 'StandardScaler':
+                # mean_ is fitted even with with_mean=False, but only applied when with_mean is set
+                for pos, feature in enumerate(features):
+                    if step.with_mean:
+                        feature['mean'] = step.mean_[pos]
+                    if step.with_std:
+                        feature['scale'] = step.scale_[pos]
+            elif kind == 'OneHotEncoder':
+                if step.drop is not None or getattr(step, 'infrequent_categories_', None) is not None:
+                    raise ValueError("OneHotEncoder with drop/infrequent categories is not supported")
+                features = [dict(f, category=cat) for f, cats in zip(features, step.categories_) for cat in cats]
+            else:
+                raise ValueError(f"Unsupported preprocessing step: {kind}")
+        outputs.extend(features)
+
+    if len(outputs) != len(preprocessor.get_feature_names_out()):
+        raise ValueError("Could not trace every transformed feature back to an input column")
+    selected = [outputs[int(idx)] for idx in top_feature_indices]
+    return {key: [f[key] for f in selected] for key in ('column', 'fill', 'mean', 'scale', 'category')}
+
+
+def compile_transform_spec(preprocessor, top_feature_indices) -> Dict[str, list]:
+    """Public form of the compiled spec, stored as metadata['transform_spec'] by data_cleaning.py."""
+    return _compile_column_transformer(preprocessor, np.asarray(top_feature_indices, dtype=int))
+
+
+class CompiledRecordTransformer:
+    """
+    Vectorized equivalent of RecordTransformer.
+
+    Only the raw columns behind the selected features are read (15 of the ~80 in a record);
+    each is rounded, imputed, one-hot compared (categorical features) and standardized with the
+    constants extracted from the fitted preprocessor, giving bit-identical output to the sklearn path.
+    The constants come from metadata['transform_spec'] when present (the streaming preprocessing
+    computes them without fitting a sklearn preprocessor), otherwise they are traced from the preprocessor.
+    """
+
+    def __init__(self, metadata: Dict[str, object]):
+        if 'transform_spec' in metadata:
+            spec = metadata['transform_spec']
+        elif 'preprocessor' in metadata and 'top_feature_indices' in metadata:
+            spec = compile_transform_spec(metadata['preprocessor'], metadata['top_feature_indices'])
+        else:
+            raise ValueError("Feature metadata has no fitted preprocessor. Re-run data_preprocessing/data_cleaning.py")
+        self.round_decimals = metadata.get('round_decimals', 3)
+        self.feature_names: List[str] = list(metadata.get('feature_names', []))
+        self.source_columns: List[str] = list(spec['column'])
+        # Read every distinct source column once, even if several outputs (one-hot) share it
+        self.columns: List[str] = list(dict.fromkeys(self.source_columns))
+        self._source_pos = np.array([self.columns.index(c) for c in self.source_columns], dtype=int)
+        self._categorical = np.array([c is not None for c in spec['category']], dtype=bool)
+        self._categories = spec['category']
+        self._fill = spec['fill']
+        self._mean = np.asarray(spec['mean'], dtype=float)
+        self._scale = np.asarray(spec['scale'], dtype=float)
+        if not self._categorical.any():
+            self._fill_array = np.asarray(self._fill, dtype=float)
+
+    def transform(self, records: pd.DataFrame) -> np.ndarray:
+        missing = [c for c in self.columns if c not in records.columns]
+        if missing:
+            raise ValueError(f"Records are missing {len(missing)} required column(s): {missing[:5]}")
+        if self._categorical.any():
+            return self._transform_mixed(records)
+
+        X = records[self.columns].to_numpy(dtype=float)[:, self._source_pos]
+        if self.round_decimals is not None:
+            X = np.round(X, self.round_decimals)
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float64').")
+        nan_mask = np.isnan(X)
+        if nan_mask.any():
+            X = np.where(nan_mask, self._fill_array, X)
+        X -= self._mean
+        X /= self._scale
+        return X
+
+    def _transform_mixed(self, records: pd.DataFrame) -> np.ndarray:
+        out = np.empty((len(records), len(self.source_columns)), dtype=float)
+        for j, column in enumerate(self.source_columns):
+            values = records[column]
+            if self._categorical[j]:
+                values = values.where(values.notna(), self._fill[j])
+                col = (values.to_numpy() == self._categories[j]).astype(float)
+            else:
+                col = values.to_numpy(dtype=float)
+                if self.round_decimals is not None:
+                    col = np.round(col, self.round_decimals)
+                if np.isinf(col).any():
+                    raise ValueError("Input X contains infinity or a value too large for dtype('float64').")
+                col = np.where(np.isnan(col), self._fill[j], col)
+            out[:, j] = col
+        out -= self._mean
+        out /= self._scale
+        return out
+
+
+FeatureTransformer = Union[RecordTransformer, CompiledRecordTransformer]
+
+
+def build_record_transformer(metadata: Dict[str, object]) -> FeatureTransformer:
+    """Compiled transform when the fitted preprocessor can be traced, otherwise the sklearn one."""
+    try:
+        return CompiledRecordTransformer(metadata)
+    except (ValueError, KeyError, AttributeError) as e:
+        if 'preprocessor' not in metadata:
+            raise
+        print(f"[WARN] Falling back to the sklearn preprocessing path: {e}")
+        return RecordTransformer(metadata)
@@ -0,0 +1,169 @@
+from typing import Optional
+import numpy as np
+from utils.array_store import load_flat_arrays, save_flat_arrays
+
+
+class CompiledForest:
+    """
+    Flattened, NumPy-only inference form of a fitted RandomForestClassifier.
+
+    All trees are packed into contiguous node arrays (feature, threshold, left/right child,
+    leaf class probabilities). A batch is evaluated level by level: every (tree, row) pair
+    still inside a tree advances one node per step with a few vectorized gathers, instead of
+    one Python/joblib call per tree. Pairs drop out of the active set as they reach a leaf
+    (leaves are stored as nodes whose children point to themselves).
+
+    Probabilities are bit-for-bit identical to sklearn's predict_proba: inputs are cast to
+    float32 and compared against float64 thresholds exactly like sklearn's tree code, and the
+    per-tree leaf values are summed in tree order before dividing by the number of trees
+    (sklearn sums in whatever order its worker threads finish, so with n_jobs != 1 it can
+    itself differ from run to run in the last ulp).
+    """
+
+    # Rows scored per traversal block; bounds the (rows x trees) index arrays
+    block_rows = 8192
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, max_depth: int, classes: np.ndarray,
+                 n_features_in: int, missing_go_to_left: Optional[np.ndarray] = None,
+                 children: Optional[np.ndarray] = None, is_leaf: Optional[np.ndarray] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        # Derived arrays can be passed in (e.g. memory-mapped by load) so nothing is rebuilt per process
+        self.children = np.column_stack([left, right]) if children is None else children
+        self.is_leaf = left == np.arange(len(left)) if is_leaf is None else is_leaf
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_classes_ = len(classes)
+        self.n_features_in_ = int(n_features_in)
+        self.missing_go_to_left = missing_go_to_left
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, forest) -> 'CompiledForest':
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+        n_classes = int(forest.n_classes_)
+        features, thresholds, lefts, rights, values, roots, missing = [], [], [], [], [], [], []
+        has_missing = False
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            ids = np.arange(n_nodes, dtype=np.intp) + offset
+            is_leaf = tree.children_left == -1
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, ids, tree.children_left + offset).astype(np.intp))
+            rights.append(np.where(is_leaf, ids, tree.children_right + offset).astype(np.intp))
+
+            leaf_value = tree.value[:, 0, :n_classes].astype(np.float64)
+            # sklearn >= 1.4 stores class fractions; older versions store weighted counts and
+            # normalise in DecisionTreeClassifier.predict_proba, so replicate that here
+            normalizer = leaf_value.sum(axis=1)
+            if not np.allclose(normalizer[is_leaf], 1.0):
+                normalizer[normalizer == 0.0] = 1.0
+                leaf_value /= normalizer[:, np.newaxis]
+            values.append(leaf_value)
+
+            mgl = getattr(tree, 'missing_go_to_left', None)
+            if mgl is not None and np.any(mgl):
+                has_missing = True
+            missing.append(np.zeros(n_nodes, dtype=bool) if mgl is None else np.asarray(mgl, dtype=bool))
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(forest.classes_),
+            n_features_in=forest.n_features_in_,
+            missing_go_to_left=np.concatenate(missing) if has_missing else None,
+        )
+
+    def save(self, path: str) -> None:
+        """Write the node arrays in the flat layout of utils/array_store (memory-mappable by load)."""
+        arrays = {
+            'feature': self.feature, 'threshold': self.threshold, 'children': self.children,
+            'is_leaf': self.is_leaf, 'value': self.value, 'roots': self.roots, 'classes': self.classes_,
+        }
+        if self.missing_go_to_left is not None:
+            arrays['missing_go_to_left'] = self.missing_go_to_left
+        save_flat_arrays(path, arrays, {'max_depth': self.max_depth, 'n_features_in': self.n_features_in_})
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'CompiledForest':
+        """
+        Load a saved forest. With mmap=True the node arrays stay in the page cache and are shared
+        by every process that loads the same file, instead of being copied into each worker's heap.
+        """
+        arrays, meta = load_flat_arrays(path, mmap=mmap)
+        children = arrays['children']
+        return cls(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            left=children[:, 0],
+            right=children[:, 1],
+            value=arrays['value'],
+            roots=arrays['roots'],
+            max_depth=meta['max_depth'],
+            classes=arrays['classes'],
+            n_features_in=meta['n_features_in'],
+            missing_go_to_left=arrays.get('missing_go_to_left'),
+            children=children,
+            is_leaf=arrays['is_leaf'],
+        )
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node id reached by every (tree, row) pair, shape (n_trees, n_rows)."""
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        X_flat = X.ravel()
+        node = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        # Only pairs that have not reached a leaf yet are advanced at each level
+        active = np.flatnonzero(~self.is_leaf[node])
+        while active.size:
+            current = node[active]
+            x = X_flat[row_offset[active] + self.feature[current]]
+            go_right = ~(x <= self.threshold[current])
+            if self.missing_go_to_left is not None:
+                nan_mask = np.isnan(x)
+                go_right[nan_mask] = ~self.missing_go_to_left[current[nan_mask]]
+            nxt = self.children[current, go_right.view(np.int8)]
+            node[active] = nxt
+            active = active[~self.is_leaf[nxt]]
+        return node.reshape(n_trees, n_rows)
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the forest expects {self.n_features_in_} features as input.")
+        proba = np.zeros((X.shape[0], self.n_classes_), dtype=np.float64)
+        for start in range(0, X.shape[0], self.block_rows):
+            stop = start + self.block_rows
+            leaves = self._leaves(X[start:stop])
+            out = proba[start:stop]
+            # Tree-order accumulation, matching sklearn's `out += tree.predict_proba(X)` loop
+            for tree_leaves in leaves:
+                out += self.value[tree_leaves]
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
@@ -0,0 +1,148 @@
+"""
+Exported NumPy inference form of a fitted MLPClassifier.
+
+The exported `.mlp.npz` file only holds float32 weight/bias arrays plus a few scalars, so it can be
+loaded and evaluated without importing scikit-learn (which also makes worker startup cheaper).
+Only export_mlp needs the original sklearn model.
+"""
+import os
+import threading
+from typing import Dict, Optional
+import numpy as np
+
+
+def _relu(x: np.ndarray) -> None:
+    np.maximum(x, 0, out=x)
+
+
+def _tanh(x: np.ndarray) -> None:
+    np.tanh(x, out=x)
+
+
+def _logistic(x: np.ndarray) -> None:
+    np.negative(x, out=x)
+    np.exp(x, out=x)
+    x += 1
+    np.reciprocal(x, out=x)
+
+
+def _identity(x: np.ndarray) -> None:
+    pass
+
+
+def _softmax(x: np.ndarray) -> None:
+    x -= x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+
+
+_ACTIVATIONS = {'relu': _relu, 'tanh': _tanh, 'logistic': _logistic, 'identity': _identity, 'softmax': _softmax}
+# Larger inputs are run in blocks of this many rows, which bounds the per-thread hidden buffers
+MAX_BUFFER_ROWS = 8192
+
+
+class NumpyMLP:
+    """
+    Forward pass of an MLPClassifier on preallocated float32 buffers.
+
+    Hidden-layer buffers are kept per thread and grown on demand up to MAX_BUFFER_ROWS rows (larger
+    inputs are run block by block), so steady-state requests do no allocations apart from the
+    returned probability matrix (pass `out=` to reuse that as well).
+    """
+
+    def __init__(self, coefs, intercepts, classes: np.ndarray, activation: str = 'relu',
+                 out_activation: str = 'softmax'):
+        if activation not in _ACTIVATIONS or out_activation not in _ACTIVATIONS:
+            raise ValueError(f"Unsupported activation: {activation!r} / {out_activation!r}")
+        self.coefs_ = [np.ascontiguousarray(w, dtype=np.float32) for w in coefs]
+        self.intercepts_ = [np.ascontiguousarray(b, dtype=np.float32) for b in intercepts]
+        self.classes_ = np.asarray(classes)
+        self.activation = activation
+        self.out_activation_ = out_activation
+        self.n_layers_ = len(self.coefs_) + 1
+        self.hidden_layer_sizes = tuple(w.shape[1] for w in self.coefs_[:-1])
+        self.n_features_in_ = self.coefs_[0].shape[0]
+        self._local = threading.local()
+
+    @classmethod
+    def from_sklearn(cls, model) -> 'NumpyMLP':
+        return cls(model.coefs_, model.intercepts_, model.classes_, model.activation, model.out_activation_)
+
+    def save(self, path: str) -> None:
+        arrays = {f'coef_{i}': w for i, w in enumerate(self.coefs_)}
+        arrays.update({f'intercept_{i}': b for i, b in enumerate(self.intercepts_)})
+        # Write then rename so a running server never reloads a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, classes=self.classes_, activation=np.array(self.activation),
+                     out_activation=np.array(self.out_activation_), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyMLP':
+        with np.load(path, allow_pickle=False) as data:
+            n_layers = sum(1 for key in data.files if key.startswith('coef_'))
+            return cls([data[f'coef_{i}'] for i in range(n_layers)],
+                       [data[f'intercept_{i}'] for i in range(n_layers)],
+                       data['classes'], str(data['activation']), str(data['out_activation']))
+
+    def _buffers(self, n_rows: int):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None or buffers[0].shape[0] < n_rows:
+            capacity = min(max(n_rows, 64), MAX_BUFFER_ROWS)
+            buffers = [np.empty((capacity, w.shape[1]), dtype=np.float32) for w in self.coefs_[:-1]]
+            self._local.buffers = buffers
+        return [buf[:n_rows] for buf in buffers]
+
+    def _forward(self, X: np.ndarray, proba: np.ndarray) -> None:
+        """Probabilities of at most MAX_BUFFER_ROWS rows, written into proba."""
+        hidden = _ACTIVATIONS[self.activation]
+        activation = X
+        for W, b, buf in zip(self.coefs_[:-1], self.intercepts_[:-1], self._buffers(X.shape[0])):
+            np.matmul(activation, W, out=buf)
+            buf += b
+            hidden(buf)
+            activation = buf
+
+        # Binary problems have a single logistic output: P(class 1), expanded to [P(class 0), P(class 1)]
+        logits = proba if self.coefs_[-1].shape[1] > 1 else proba[:, 1:]
+        np.matmul(activation, self.coefs_[-1], out=logits)
+        logits += self.intercepts_[-1]
+        _ACTIVATIONS[self.out_activation_](logits)
+        if logits is not proba:
+            np.subtract(1, proba[:, 1], out=proba[:, 0])
+
+    def predict_proba(self, X, out: Optional[np.ndarray] = None) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the MLP expects {self.n_features_in_} features as input.")
+        n_rows = X.shape[0]
+        proba = out if out is not None else np.empty((n_rows, max(self.coefs_[-1].shape[1], 2)), dtype=np.float32)
+        for start in range(0, n_rows, MAX_BUFFER_ROWS):
+            self._forward(X[start:start + MAX_BUFFER_ROWS], proba[start:start + MAX_BUFFER_ROWS])
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def check_parity(model, engine: NumpyMLP, X: np.ndarray, rtol: float = 1e-4, atol: float = 1e-5) -> Dict[str, float]:
+    """
+    Compare the NumPy engine against sklearn's predict_proba on X.
+    Raises ValueError when probabilities differ beyond the float32 tolerance.
+    """
+    expected = model.predict_proba(X)
+    actual = engine.predict_proba(X)
+    max_abs_diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    if not np.allclose(actual, expected, rtol=rtol, atol=atol):
+        raise ValueError(f"NumPy MLP engine deviates from sklearn (max abs diff {max_abs_diff:.3g})")
+    agreement = float(np.mean(engine.predict(X) == model.predict(X))) if len(X) else 1.0
+    return {'max_abs_diff': max_abs_diff, 'prediction_agreement': agreement}
+
+
+def export_mlp(model, path: str, X_check: Optional[np.ndarray] = None) -> Dict[str, float]:
+    """Export a fitted MLPClassifier to `path` (.mlp.npz), verifying parity on X_check first."""
+    engine = NumpyMLP.from_sklearn(model)
+    report = check_parity(model, engine, X_check) if X_check is not None else {}
+    engine.save(path)
+    return report
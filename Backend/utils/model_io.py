@@ -1,23 +1,41 @@
+import hashlib
+import json
 import os
-from typing import Dict
-from sklearn.base import BaseEstimator
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.neural_network import MLPClassifier
+import platform
+import time
+from typing import Dict, Optional, Sequence, Union
+import numpy as np
 import joblib  # type: ignore
 
 def save_models(models: Dict[str, object], out_dir: str = "cache/models") -> None:
+    # Imported here so that loading / listing models (the serving path) does not pull in sklearn
+    from sklearn.base import BaseEstimator
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.neural_network import MLPClassifier
     for name, model in models.items():
         if isinstance(model, (RandomForestClassifier, MLPClassifier)) or isinstance(model, BaseEstimator):
             model_path = os.path.join(out_dir, f"{name}.joblib")
-            joblib.dump(model, model_path)
+            # Write then rename so a running server never reloads a half-written file
+            tmp_path = f"{model_path}.tmp"
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, model_path)
         else:
             raise ValueError(f"Unsupported model type for saving: {type(model)}")
 
 
-def load_model(name: str, out_dir: str = "cache/models") -> object:
+def load_model(name: str, out_dir: str = "cache/models", mmap_mode: Optional[str] = None) -> object:
+    """
+    mmap_mode='r' memory-maps the numpy arrays joblib stored uncompressed (read-only, shared between
+    processes). Estimators that copy their arrays on unpickling (e.g. sklearn trees) still get a private copy.
+    """
     model_path = os.path.join(out_dir, f"{name}.joblib")
     if os.path.exists(model_path):
-        return joblib.load(model_path)
+        model = joblib.load(model_path, mmap_mode=mmap_mode)
+        if type(model).__name__ == 'DBSCAN':
+            # Caches written before DBSCANPredictor hold a bare DBSCAN, which cannot assign new points
+            from utils.dbscan_engine import as_dbscan_predictor
+            model = as_dbscan_predictor(model)
+        return model
     raise FileNotFoundError(f"Model '{name}' not found in {out_dir}")
 
 
@@ -48,3 +66,189 @@ def list_models(out_dir: str = "cache/models") -> Dict[str, str]:
     return models
 
 
+# Estimator params that do not change the fitted model
+_RUNTIME_PARAMS = {'n_jobs', 'verbose'}
+
+
+def _hash_array(h, arr) -> None:
+    arr = np.ascontiguousarray(arr)
+    h.update(f"{arr.shape}|{arr.dtype.str}|".encode())
+    h.update(arr.data if arr.dtype != object else repr(arr.tolist()).encode())
+
+
+def _library_versions() -> Dict[str, str]:
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'joblib': joblib.__version__,
+    }
+
+
+class ModelCache:
+    """
+    Content-addressed cache of fitted models.
+
+    A model is stored under a key that hashes its training arrays, its estimator class and
+    params, and the library versions, so a cached model is only reused when retraining would
+    produce the same model. Entries live in `{out_dir}/store/{key}.joblib` and are tracked in
+    `{out_dir}/manifest.json`; the entry currently in use for a name is also published as
+    `{out_dir}/{name}.joblib` (what load_models / the server read). Old entries are evicted
+    least-recently-used first once the store exceeds max_entries or max_bytes.
+
+    Online updates (the server's partial_fit) are stored by put_update() as entries derived from
+    the trained one (`base_key`); while such an update is published, get() with the training key
+    returns it, so evaluation sees the model that is being served.
+    """
+
+    def __init__(self, out_dir: str = "cache/models", max_entries: int = 16, max_bytes: int = 2 * 1024 ** 3):
+        self.out_dir = out_dir
+        self.store_dir = os.path.join(out_dir, "store")
+        self.manifest_path = os.path.join(out_dir, "manifest.json")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self) -> Dict[str, Dict[str, object]]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            manifest = {}
+        manifest.setdefault('entries', {})
+        manifest.setdefault('published', {})
+        return manifest
+
+    def _write_manifest(self) -> None:
+        os.makedirs(self.out_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def key(self, estimator: object, arrays: Sequence[Union[np.ndarray, str]]) -> str:
+        """
+        Hash of the training arrays, the estimator class + params and the library versions.
+        An array can be given as its precomputed content digest (see utils/dataset) to avoid reading it.
+        """
+        h = hashlib.blake2b(digest_size=20)
+        for arr in arrays:
+            if isinstance(arr, str):
+                h.update(f"digest:{arr}|".encode())
+            else:
+                _hash_array(h, arr)
+        params = {k: v for k, v in estimator.get_params().items() if k not in _RUNTIME_PARAMS}
+        h.update(f"{type(estimator).__module__}.{type(estimator).__qualname__}".encode())
+        h.update(json.dumps(params, sort_keys=True, default=repr).encode())
+        h.update(json.dumps(_library_versions(), sort_keys=True).encode())
+        return h.hexdigest()
+
+    def _store_path(self, key: str) -> str:
+        return os.path.join(self.store_dir, f"{key}.joblib")
+
+    def _publish(self, name: str, key: str) -> None:
+        model_path = os.path.join(self.out_dir, f"{name}.joblib")
+        tmp_path = f"{model_path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(self._store_path(key), tmp_path)
+        except OSError:
+            import shutil
+            shutil.copyfile(self._store_path(key), tmp_path)
+        # Rename so a running server never reloads a half-written file
+        os.replace(tmp_path, model_path)
+        self.manifest['published'][name] = key
+
+    def get(self, name: str, key: str) -> Optional[object]:
+        """The cached model for key (published as {name}.joblib), or None on a miss."""
+        entries = self.manifest['entries']
+        published = self.manifest['published'].get(name)
+        update = published != key and entries.get(published, {}).get('base_key') == key
+        if update and os.path.exists(self._store_path(published)):
+            # The published model is an online update of this training run (see put_update)
+            key = published
+        entry = entries.get(key)
+        path = self._store_path(key)
+        if entry is None or not os.path.exists(path):
+            self.misses += 1
+            print(f"[CACHE] miss {name} ({key[:12]})")
+            return None
+        model = joblib.load(path)
+        entry['last_used'] = time.time()
+        if published != key or not os.path.exists(os.path.join(self.out_dir, f"{name}.joblib")):
+            self._publish(name, key)
+        self._write_manifest()
+        self.hits += 1
+        print(f"[CACHE] hit {name} ({key[:12]}{', online update' if 'base_key' in entry else ''})")
+        return model
+
+    def put(self, name: str, key: str, model: object, **info) -> None:
+        """
+        Store a freshly trained model, publish it as {name}.joblib and evict old entries.
+        info: extra fields recorded in its manifest entry
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self._store_path(key)
+        tmp_path = f"{path}.tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+        now = time.time()
+        self.manifest['entries'][key] = {
+            'name': name,
+            'type': type(model).__name__,
+            'created_at': now,
+            'last_used': now,
+            'size_bytes': os.path.getsize(path),
+            'versions': _library_versions(),
+            **info,
+        }
+        self._publish(name, key)
+        self._evict()
+        self._write_manifest()
+
+    def put_update(self, name: str, model: object) -> str:
+        """
+        Store and publish an online update of the published `name`. The entry records the training
+        key it derives from as base_key, so main.py keeps using (and reporting) the updated model
+        until the training data or params change. Returns the new key.
+        """
+        # The manifest may have been rewritten by another process (main.py) since it was read
+        self.manifest = self._read_manifest()
+        parent = self.manifest['published'].get(name)
+        base_key = self.manifest['entries'].get(parent, {}).get('base_key', parent)
+        key = hashlib.blake2b(f"{parent}|update|{time.time_ns()}".encode(), digest_size=20).hexdigest()
+        self.put(name, key, model, base_key=base_key, updated_from=parent)
+        return key
+
+    def _evict(self) -> None:
+        entries = self.manifest['entries']
+        in_use = set(self.manifest['published'].values())
+        total = sum(e['size_bytes'] for e in entries.values())
+        # Least recently used first; published entries are never evicted
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if len(entries) <= self.max_entries and total <= self.max_bytes:
+                break
+            if key in in_use:
+                continue
+            total -= entries[key]['size_bytes']
+            del entries[key]
+            try:
+                os.remove(self._store_path(key))
+            except FileNotFoundError:
+                pass
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, int]:
+        entries = self.manifest['entries']
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evicted': self.evicted,
+            'entries': len(entries),
+            'size_bytes': sum(e['size_bytes'] for e in entries.values()),
+        }
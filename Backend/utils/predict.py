@@ -1,29 +1,43 @@
 from typing import List, Optional, Tuple
 import numpy as np
 
-def run_prediction(model, instances: List[List[float]]) -> Tuple[List[int], Optional[List[List[float]]]]:
+def predict_arrays(model, X: np.ndarray, return_proba: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+	"""
+    Run the model once and return (preds, proba) as numpy arrays.
+
+    For models with predict_proba and classes_ (RandomForest, MLP) the class is the argmax of the
+    probabilities, which is exactly what their predict() computes, so the trees / forward pass are
+    only evaluated once. Other models (e.g. KMeans) fall back to predict() and proba is None.
+    proba is also None when return_proba is False.
+    """
+	if hasattr(model, "predict_proba") and hasattr(model, "classes_"):
+		try:
+			proba = model.predict_proba(X)
+		except Exception as e:
+			print(f"[WARN] predict_proba failed: {e}")
+		else:
+			preds = np.asarray(model.classes_).take(np.argmax(proba, axis=1), axis=0)
+			return preds, (proba if return_proba else None)
+	return model.predict(X), None
+
+def to_response_lists(preds: np.ndarray, proba: Optional[np.ndarray]) -> Tuple[List[int], Optional[List[List[float]]]]:
+	"""Convert prediction arrays to the plain python lists used in JSON responses."""
+	return preds.tolist(), (proba.tolist() if isinstance(proba, np.ndarray) else None)
+
+def run_prediction(model, instances: List[List[float]], return_proba: bool = True) -> Tuple[List[int], Optional[List[List[float]]]]:
 	"""
     Run prediction and return:
       - preds: list[int] (class indices)
       - proba: Optional[List[List[float]]] (shape: n_samples x n_classes) when predict_proba exists
+        and return_proba is True
 
     This function:
       - converts instances to a numpy array
       - if model expects a specific number of features, it DOES NOT try to pad/trim here.
         (If desired, padding can be added earlier in the pipeline.)
-      - returns full predict_proba matrix (converted to python lists) when available.
+      - evaluates the model once (see predict_arrays) and only builds the n x k nested
+        probability list when return_proba is True.
     """
-	X = np.array(instances, dtype=float)
-	preds = model.predict(X).tolist()
-
-	proba = None
-	if hasattr(model, "predict_proba"):
-		try:
-			proba_vals = model.predict_proba(X)
-			if isinstance(proba_vals, np.ndarray):
-				proba = proba_vals.tolist()
-		except Exception as e:
-			print(f"[WARN] predict_proba failed: {e}")
-			proba = None
-
-	return preds, proba
\ No newline at end of file
+	X = np.asarray(instances, dtype=float)
+	preds, proba = predict_arrays(model, X, return_proba=return_proba)
+	return to_response_lists(preds, proba)
@@ -0,0 +1,180 @@
+import copy
+import os
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional, Tuple
+from utils.engines import build_engine, find_artifact, list_artifacts, load_artifact
+from config import get_model_cache_max_bytes, get_model_cache_max_entries
+from utils.model_io import ModelCache, list_models, load_model
+
+
+class ModelEntry:
+    """A loaded model plus the bookkeeping the registry needs to serve and reload it."""
+
+    __slots__ = ("name", "model", "engine", "path", "file_signature", "loaded_at", "load_time_ms", "memory_bytes")
+
+    def __init__(self, name: str, model: object, engine: str, path: str, file_signature: Tuple[int, int],
+                 loaded_at: float, load_time_ms: float, memory_bytes: Optional[int]):
+        self.name = name
+        self.model = model
+        self.engine = engine
+        self.path = path
+        self.file_signature = file_signature
+        self.loaded_at = loaded_at
+        self.load_time_ms = load_time_ms
+        self.memory_bytes = memory_bytes
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "type": type(self.model).__name__,
+            "engine": self.engine,
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "load_time_ms": round(self.load_time_ms, 3),
+            "memory_bytes": self.memory_bytes,
+        }
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class ModelRegistry:
+    """
+    Keeps every model in `model_dir` loaded in memory.
+
+    Requests read `self._entries` once and work with the entry they got, so a reload
+    (which builds a new dict and swaps the reference) never affects an in-flight request.
+    """
+
+    def __init__(self, model_dir: str, reload_interval: float = 2.0, engines: Optional[Dict[str, str]] = None,
+                 mmap: bool = False):
+        self.model_dir = model_dir
+        self.reload_interval = reload_interval
+        self.engines = engines or {}
+        self.mmap = mmap
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.Lock()  # serialises reloads, never taken on the request path
+        self._update_lock = threading.Lock()  # serialises online updates, so none is lost
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def _resolve(self, name: str, artifacts: Dict[str, str]) -> Tuple[str, str, bool]:
+        """(engine, path, is_artifact) the model should be served from."""
+        configured = self.engines.get(name)
+        artifact = find_artifact(artifacts, configured)
+        if artifact is not None:
+            return artifact[0], artifact[1], True
+        return configured or 'sklearn', os.path.join(self.model_dir, f"{name}.joblib"), False
+
+    def _load_entry(self, name: str, engine: str, path: str, is_artifact: bool) -> ModelEntry:
+        signature = _file_signature(path)
+        # tracemalloc sees numpy buffers, so the traced peak is the model's private heap footprint
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            if is_artifact:
+                # Exported artifacts are loaded directly, without unpickling (or importing) sklearn
+                model = load_artifact(path, engine)
+            else:
+                # The engine conversion is part of the load: only the converted model stays resident
+                model = build_engine(load_model(name, out_dir=self.model_dir, mmap_mode='r' if self.mmap else None), engine)
+        finally:
+            load_time_ms = (time.perf_counter() - start) * 1000.0
+            after, _ = tracemalloc.get_traced_memory()
+            if not already_tracing:
+                tracemalloc.stop()
+        return ModelEntry(name, model, engine, path, signature, time.time(), load_time_ms, max(0, after - before))
+
+    def refresh(self) -> Dict[str, str]:
+        """
+        Load new models, reload changed ones and drop deleted ones.
+        Returns {model_name: action} for everything that changed.
+        """
+        changes: Dict[str, str] = {}
+        with self._lock:
+            current = self._entries
+            updated = dict(current)
+            artifacts = list_artifacts(self.model_dir)
+            on_disk = set(list_models(out_dir=self.model_dir)) | set(artifacts)
+            for name in sorted(on_disk):
+                entry = current.get(name)
+                try:
+                    engine, path, is_artifact = self._resolve(name, artifacts.get(name, {}))
+                    if entry is not None and entry.path == path and _file_signature(path) == entry.file_signature:
+                        continue
+                    updated[name] = self._load_entry(name, engine, path, is_artifact)
+                    changes[name] = "loaded" if entry is None else "reloaded"
+                except Exception as e:
+                    # Keep serving the previous version (if any) when a file is mid-write or corrupt
+                    print(f"[WARN] Could not load model '{name}': {e}")
+            for name in current:
+                if name not in on_disk:
+                    del updated[name]
+                    changes[name] = "removed"
+            if changes:
+                self._entries = updated
+        return changes
+
+    def update(self, name: str, update_fn: Callable[[object], object]) -> ModelEntry:
+        """
+        Online update: update_fn gets a private copy of the served model and returns the new one,
+        which is stored in the model cache and published (so other server processes reload it and
+        main.py evaluates it, see ModelCache.put_update) and swapped in.
+        The copy and update run without blocking reloads; the lock is only held to save and swap,
+        and the update is redone on the reloaded model if the file changed in the meantime.
+        In-flight requests keep the model they started with.
+        """
+        with self._update_lock:
+            while True:
+                entry = self._entries.get(name)
+                if entry is None:
+                    raise KeyError(name)
+                start = time.perf_counter()
+                model = update_fn(copy.deepcopy(entry.model))
+                with self._lock:
+                    if self._entries.get(name) is not entry:
+                        continue
+                    ModelCache(self.model_dir, max_entries=get_model_cache_max_entries(),
+                               max_bytes=get_model_cache_max_bytes()).put_update(name, model)
+                    path = os.path.join(self.model_dir, f"{name}.joblib")
+                    # The new file signature keeps the watcher from reloading what is already in memory.
+                    # memory_bytes is not measured: tracemalloc is process-wide and reloads may run alongside
+                    updated = ModelEntry(name, model, entry.engine, path, _file_signature(path), time.time(),
+                                         (time.perf_counter() - start) * 1000.0, None)
+                    self._entries = {**self._entries, name: updated}
+                return updated
+
+    def get(self, name: str) -> Optional[ModelEntry]:
+        return self._entries.get(name)
+
+    def entries(self) -> Dict[str, ModelEntry]:
+        return self._entries
+
+    def describe(self) -> Dict[str, Dict[str, object]]:
+        return {name: entry.describe() for name, entry in self._entries.items()}
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.reload_interval):
+            changes = self.refresh()
+            for name, action in changes.items():
+                print(f"[INFO] Model '{name}' {action}")
+
+    def start(self) -> None:
+        """Load every model, then poll the model directory for changes in a daemon thread."""
+        self.refresh()
+        if self.reload_interval > 0 and self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.reload_interval + 1)
+            self._watcher = None
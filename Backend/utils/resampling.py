@@ -0,0 +1,162 @@
+"""
+SMOTE oversampling that can be materialized once or generated lazily per training batch.
+
+SMOTESampler.fit finds the k nearest same-class neighbours of every training row (NearestNeighbors
+with n_jobs) and decides how many synthetic rows each class gets: up to the largest class size,
+optionally capped per class. A synthetic row is `x + u * (x_nn - x)` for a random row x of the
+class, one of its k neighbours x_nn and u ~ U(0, 1), as in imblearn's SMOTE.
+
+The fitted state is only the (rows x k) neighbour table and the per-class counts, so it can be
+stored in the processed dataset instead of the oversampled X_train (see to_arrays/from_arrays),
+and LazySMOTE.iter_batches draws fresh synthetic rows for every training batch.
+"""
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+
+# Dataset arrays of a lazily oversampled training set (instead of X_train / y_train)
+LAZY_ARRAYS = ('X_train_unSMOTE', 'y_train_unSMOTE', 'smote_neighbors', 'smote_synthetic_counts')
+
+
+class SMOTESampler:
+    def __init__(self, k_neighbors: int = 5, max_synthetic_per_class: Optional[int] = None,
+                 n_jobs: int = -1, random_state: int = 42):
+        self.k_neighbors = k_neighbors
+        self.max_synthetic_per_class = max_synthetic_per_class
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> 'SMOTESampler':
+        from sklearn.neighbors import NearestNeighbors
+
+        y = np.asarray(y)
+        self.classes_, counts = np.unique(y, return_counts=True)
+        k = self.k_neighbors
+        if counts.min() <= k:
+            raise ValueError(f"SMOTE needs more than k_neighbors={k} samples per class, smallest class has {counts.min()}")
+        synthetic = counts.max() - counts
+        if self.max_synthetic_per_class is not None:
+            synthetic = np.minimum(synthetic, self.max_synthetic_per_class)
+        self.synthetic_counts_ = synthetic.astype(np.int64)
+
+        # Neighbour table in global row indices; rows of classes without synthetic rows are never used
+        self.neighbors_ = np.full((len(y), k), -1, dtype=np.int32)
+        for cls, n_synthetic in zip(self.classes_, self.synthetic_counts_):
+            if n_synthetic == 0:
+                continue
+            rows = np.flatnonzero(y == cls)
+            nn = NearestNeighbors(n_neighbors=k + 1, n_jobs=self.n_jobs).fit(X[rows])
+            # The first neighbour of a row is the row itself
+            self.neighbors_[rows] = rows[nn.kneighbors(X[rows], return_distance=False)[:, 1:]]
+        return self
+
+    def class_rows(self, y: np.ndarray) -> Dict[object, np.ndarray]:
+        """Row indices of every class that gets synthetic rows."""
+        return {cls: np.flatnonzero(y == cls) for cls, n in zip(self.classes_, self.synthetic_counts_) if n}
+
+    def generate(self, X: np.ndarray, rows: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+        """n new synthetic rows from the rows (indices) of one class."""
+        base = rows[rng.integers(0, len(rows), n)]
+        neighbor = self.neighbors_[base, rng.integers(0, self.neighbors_.shape[1], n)]
+        gap = rng.random(n, dtype=np.float64)[:, None]
+        out = X[neighbor] - X[base]
+        out *= gap
+        out += X[base]
+        return out.astype(X.dtype, copy=False)
+
+    def resample(self, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Materialized oversampled set: the real rows followed by the synthetic rows of each class."""
+        rng = np.random.default_rng(self.random_state)
+        X_parts, y_parts = [np.asarray(X)], [np.asarray(y)]
+        synthetic = dict(zip(self.classes_, self.synthetic_counts_))
+        for cls, rows in self.class_rows(y_parts[0]).items():
+            X_parts.append(self.generate(X, rows, int(synthetic[cls]), rng))
+            y_parts.append(np.full(synthetic[cls], cls, dtype=y_parts[0].dtype))
+        return np.concatenate(X_parts), np.concatenate(y_parts)
+
+    def memory_report(self, X: np.ndarray, y: np.ndarray) -> Dict[str, float]:
+        """MB of the oversampled X/y, uncapped (oversampling to the largest class) and as fitted, vs the lazy state."""
+        row_bytes = X.shape[1] * X.dtype.itemsize + np.asarray(y).dtype.itemsize
+        counts = np.unique(y, return_counts=True)[1]
+        uncapped_rows = len(counts) * int(counts.max())
+        fitted_rows = len(y) + int(self.synthetic_counts_.sum())
+        mb = 1.0 / 2**20
+        return {
+            'uncapped_rows': uncapped_rows,
+            'uncapped_mb': round(uncapped_rows * row_bytes * mb, 2),
+            'resampled_rows': fitted_rows,
+            'resampled_mb': round(fitted_rows * row_bytes * mb, 2),
+            'synthetic_mb': round((fitted_rows - len(y)) * row_bytes * mb, 2),
+            'lazy_state_mb': round((self.neighbors_.nbytes + self.synthetic_counts_.nbytes) * mb, 2),
+        }
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {'smote_neighbors': self.neighbors_, 'smote_synthetic_counts': self.synthetic_counts_}
+
+    @classmethod
+    def from_arrays(cls, y: np.ndarray, neighbors: np.ndarray, synthetic_counts: np.ndarray,
+                    random_state: int = 42) -> 'SMOTESampler':
+        sampler = cls(k_neighbors=neighbors.shape[1], random_state=random_state)
+        sampler.classes_ = np.unique(y)
+        sampler.neighbors_ = np.asarray(neighbors)
+        sampler.synthetic_counts_ = np.asarray(synthetic_counts, dtype=np.int64)
+        return sampler
+
+
+class LazySMOTE:
+    """
+    Oversampled training set that is never materialized: real rows plus synthetic rows drawn
+    on the fly, batch by batch. `len()` and `shape` describe the virtual oversampled set.
+    """
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, sampler: SMOTESampler):
+        self.X = X
+        self.y = np.asarray(y)
+        self.sampler = sampler
+        self._rows = sampler.class_rows(self.y)
+
+    @classmethod
+    def from_dataset(cls, dataset, random_state: int = 42) -> 'LazySMOTE':
+        y = np.asarray(dataset['y_train_unSMOTE'])
+        sampler = SMOTESampler.from_arrays(y, dataset['smote_neighbors'], dataset['smote_synthetic_counts'],
+                                           random_state=random_state)
+        return cls(dataset['X_train_unSMOTE'], y, sampler)
+
+    def __len__(self) -> int:
+        return len(self.y) + int(self.sampler.synthetic_counts_.sum())
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self), self.X.shape[1]
+
+    @property
+    def size(self) -> int:
+        return len(self) * self.X.shape[1]
+
+    def materialize(self) -> Tuple[np.ndarray, np.ndarray]:
+        """In-memory (X, y) for estimators that need the whole training set at once."""
+        return self.sampler.resample(np.asarray(self.X), self.y)
+
+    def iter_batches(self, batch_size: int, epoch: int = 0,
+                     real_rows: Optional[np.ndarray] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        One shuffled pass over the virtual set in batches: each batch mixes real rows (restricted
+        to real_rows if given) with synthetic rows generated for it. Different every epoch,
+        reproducible for a given random_state and epoch.
+        """
+        rng = np.random.default_rng([self.sampler.random_state, epoch])
+        real = np.arange(len(self.y)) if real_rows is None else np.asarray(real_rows)
+        counts = self.sampler.synthetic_counts_
+        # Virtual ids: [0, len(real)) are real rows, then a block of synthetic slots per class
+        order = rng.permutation(len(real) + int(counts.sum()))
+        class_ends = len(real) + np.cumsum(counts)
+        X = self.X
+        for start in range(0, len(order), batch_size):
+            ids = order[start:start + batch_size]
+            real_ids = real[ids[ids < len(real)]]
+            X_parts, y_parts = [np.asarray(X[np.sort(real_ids)])], [self.y[np.sort(real_ids)]]
+            synthetic_class = np.searchsorted(class_ends, ids[ids >= len(real)], side='right')
+            for pos, n in zip(*np.unique(synthetic_class, return_counts=True)):
+                cls = self.sampler.classes_[pos]
+                X_parts.append(self.sampler.generate(X, self._rows[cls], int(n), rng))
+                y_parts.append(np.full(n, cls, dtype=self.y.dtype))
+            yield np.concatenate(X_parts), np.concatenate(y_parts)
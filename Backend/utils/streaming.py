@@ -0,0 +1,83 @@
+"""
+Chunked parsing and scoring of raw flow records (CSV or NDJSON).
+
+Input is consumed line by line and parsed `chunk_size` rows at a time, so memory stays flat
+however large the input is. Each scored chunk is rendered as NDJSON lines
+({"prediction": ..., "probabilities": [...]}) in input order.
+"""
+import io
+import json
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Union
+import pandas as pd
+from utils.features import FeatureTransformer
+from utils.predict import predict_arrays, to_response_lists
+
+STREAM_FORMATS = ('csv', 'ndjson')
+
+
+class RecordChunker:
+    """Accumulates input lines and emits a DataFrame every `chunk_size` records."""
+
+    def __init__(self, fmt: str, chunk_size: int):
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported stream format: {fmt!r} (expected one of {STREAM_FORMATS})")
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self._header: Optional[str] = None
+        self._lines: List[str] = []
+
+    def feed(self, line: Union[str, bytes]) -> Optional[pd.DataFrame]:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            return None
+        if not line.endswith('\n'):
+            line += '\n'
+        if self.fmt == 'csv' and self._header is None:
+            self._header = line
+            return None
+        self._lines.append(line)
+        if len(self._lines) >= self.chunk_size:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[pd.DataFrame]:
+        if not self._lines:
+            return None
+        lines, self._lines = self._lines, []
+        if self.fmt == 'csv':
+            # round_trip parsing gives the same floats as json.loads, so CSV and NDJSON inputs score identically
+            return pd.read_csv(io.StringIO(self._header + ''.join(lines)), index_col=False, float_precision='round_trip')
+        return pd.DataFrame.from_records([json.loads(line) for line in lines])
+
+
+def iter_record_chunks(lines: Iterable[Union[str, bytes]], fmt: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    chunker = RecordChunker(fmt, chunk_size)
+    for line in lines:
+        chunk = chunker.feed(line)
+        if chunk is not None:
+            yield chunk
+    chunk = chunker.flush()
+    if chunk is not None:
+        yield chunk
+
+
+async def aiter_lines(byte_stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split an async stream of arbitrary byte blocks (e.g. a request body) into lines."""
+    pending = b''
+    async for block in byte_stream:
+        pending += block
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+def score_chunk(model, transformer: FeatureTransformer, records: pd.DataFrame, return_proba: bool = True) -> str:
+    """Transform and score one chunk of raw records; returns its NDJSON lines."""
+    X = transformer.transform(records)
+    preds, proba = to_response_lists(*predict_arrays(model, X, return_proba=return_proba))
+    if proba is None:
+        return ''.join(json.dumps({'prediction': p}) + '\n' for p in preds)
+    return ''.join(json.dumps({'prediction': p, 'probabilities': pr}) + '\n' for p, pr in zip(preds, proba))